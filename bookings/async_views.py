@@ -0,0 +1,37 @@
+#/bookings/async_views.py
+
+"""
+Lecturas asíncronas de citas (ver doctorapp.async_api).
+"""
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotAuthenticated, NotFound
+
+from doctorapp.async_api import async_api_view, paginate, render
+from doctorapp.lean import lean_serializer
+from patients.models import Patient
+
+from .models import Appointment
+from .serializers import AppointmentSerializer
+from .views import AppointmentViewSet
+
+
+@async_api_view(throttle_scope='bookings')
+async def my_appointments(request):
+    """
+    Citas del paciente autenticado, en el orden del calendario y con el
+    mismo formato que `GET /api/bookings/`.
+    """
+    if not request.user.is_authenticated:
+        raise NotAuthenticated()
+    patient_id = await (
+        Patient.objects.filter(user=request.user).values_list('pk', flat=True).afirst()
+    )
+    if patient_id is None:
+        raise NotFound(_("Perfil de paciente no encontrado."))
+    return render(await paginate(
+        request,
+        Appointment.objects.filter(patient_id=patient_id),
+        lean_serializer(AppointmentSerializer),
+        ordering=AppointmentViewSet.ordering,
+    ))
@@ -0,0 +1,121 @@
+#/bookings/care.py
+
+"""
+Mantenimiento de CareRelationship a partir de las citas.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from .models import Appointment, CareRelationship
+
+CHUNK_SIZE = 2000
+
+_deferred = threading.local()
+
+
+def _aggregate(queryset):
+    return (
+        queryset
+        .values('doctor_id', 'patient_id')
+        .order_by()
+        .annotate(
+            count=Count('id'),
+            first=Min('appointment_date'),
+            last=Max('appointment_date'),
+        )
+    )
+
+
+def _relationship(row):
+    return CareRelationship(
+        doctor_id=row['doctor_id'],
+        patient_id=row['patient_id'],
+        first_seen=row['first'],
+        last_seen=row['last'],
+        appointment_count=row['count'],
+    )
+
+
+def refresh_care_relationships(pairs):
+    """
+    Recalcula, a partir de sus citas, la relación de cada par
+    (doctor_id, patient_id): la crea, la actualiza o la borra si ya no quedan
+    citas. Cuesta unas pocas consultas por lote, no por par.
+    """
+    pairs = sorted(set(pairs))
+    for start in range(0, len(pairs), CHUNK_SIZE):
+        batch = pairs[start:start + CHUNK_SIZE]
+        wanted = set(batch)
+        rows = [
+            row for row in _aggregate(
+                Appointment.objects.filter(
+                    doctor_id__in={doctor_id for doctor_id, _ in batch},
+                    patient_id__in={patient_id for _, patient_id in batch},
+                )
+            )
+            if (row['doctor_id'], row['patient_id']) in wanted
+        ]
+        with transaction.atomic():
+            CareRelationship.objects.bulk_create(
+                [_relationship(row) for row in rows],
+                update_conflicts=True,
+                unique_fields=['doctor', 'patient'],
+                update_fields=['first_seen', 'last_seen', 'appointment_count'],
+            )
+            gone = wanted - {(row['doctor_id'], row['patient_id']) for row in rows}
+            for doctor_id, patient_id in gone:
+                CareRelationship.objects.filter(
+                    doctor_id=doctor_id, patient_id=patient_id
+                ).delete()
+
+
+@contextmanager
+def deferred_care_refresh():
+    """
+    Dentro del bloque las señales de Appointment sólo anotan los pares
+    afectados; al salir se recalculan todos juntos. Pensado para operaciones
+    masivas (p. ej. `QuerySet.delete()`, que emite una señal por fila).
+    """
+    if getattr(_deferred, 'pairs', None) is not None:
+        # Anidado: el bloque exterior se encarga del recálculo.
+        yield
+        return
+    _deferred.pairs = set()
+    try:
+        yield
+        pairs = _deferred.pairs
+    finally:
+        _deferred.pairs = None
+    refresh_care_relationships(pairs)
+
+
+def schedule_care_refresh(pairs):
+    """
+    Recalcula `pairs` ahora o, dentro de `deferred_care_refresh`, al salir.
+    """
+    pending = getattr(_deferred, 'pairs', None)
+    if pending is None:
+        refresh_care_relationships(pairs)
+    else:
+        pending.update(pairs)
+
+
+@transaction.atomic
+def rebuild_care_relationships():
+    """
+    Reconstruye la tabla completa desde cero. Devuelve cuántas relaciones hay.
+    """
+    CareRelationship.objects.all().delete()
+    batch, total = [], 0
+    for row in _aggregate(Appointment.objects.all()).iterator(chunk_size=CHUNK_SIZE):
+        batch.append(_relationship(row))
+        if len(batch) >= CHUNK_SIZE:
+            CareRelationship.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    CareRelationship.objects.bulk_create(batch)
+    return total + len(batch)
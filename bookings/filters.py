@@ -0,0 +1,75 @@
+#/bookings/filters.py
+
+"""
+Filtros de citas por ventana de calendario (django-filter).
+
+`date_from`/`date_to` acotan `appointment_date` (ambos incluidos), `doctor`
+filtra por la columna `doctor_id` sin cargar el doctor y `status` por valor
+exacto. Con o sin doctor, la consulta resultante recorre un índice compuesto
+ya en el orden del cursor: `appt_doctor_slot_idx` (doctor, fecha, hora) o
+`appt_calendar_idx` (fecha, hora, id).
+"""
+
+import datetime
+
+import django_filters
+from django import forms
+from rest_framework.exceptions import ValidationError
+
+from .models import Appointment, AppointmentStatus
+
+# Rango máximo (en días) de una vista de calendario.
+CALENDAR_MAX_DAYS = 31
+
+
+class AppointmentFilterForm(forms.Form):
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_to < date_from:
+            raise forms.ValidationError("`date_to` no puede ser anterior a `date_from`.")
+        return cleaned_data
+
+
+class AppointmentFilter(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name='appointment_date', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='appointment_date', lookup_expr='lte')
+    doctor = django_filters.NumberFilter(field_name='doctor_id')
+    status = django_filters.ChoiceFilter(field_name='status', choices=AppointmentStatus.choices)
+
+    class Meta:
+        model = Appointment
+        fields = ['date_from', 'date_to', 'doctor', 'status']
+        form = AppointmentFilterForm
+
+
+class CalendarFilter(AppointmentFilter):
+    """
+    Como `AppointmentFilter`, pero siempre sobre una ventana acotada: por
+    defecto la semana actual (de lunes a domingo) o los 7 días desde
+    `date_from` (o hasta `date_to`), y nunca más de `CALENDAR_MAX_DAYS`.
+    """
+
+    def filter_queryset(self, queryset):
+        data = self.form.cleaned_data
+        week = datetime.timedelta(days=6)
+        if data.get('date_to') and not data.get('date_from'):
+            data['date_from'] = data['date_to'] - week
+        if not data.get('date_from'):
+            today = datetime.date.today()
+            data['date_from'] = today - datetime.timedelta(days=today.weekday())
+        if not data.get('date_to'):
+            data['date_to'] = data['date_from'] + week
+        if (data['date_to'] - data['date_from']).days >= CALENDAR_MAX_DAYS:
+            raise ValidationError(
+                f"El rango de fechas no puede superar {CALENDAR_MAX_DAYS} días."
+            )
+        return super().filter_queryset(queryset)
+
+    @property
+    def window(self):
+        """
+        (date_from, date_to) efectivos; sólo tras evaluar `qs`.
+        """
+        return self.form.cleaned_data['date_from'], self.form.cleaned_data['date_to']
@@ -0,0 +1,302 @@
+#/bookings/generators.py
+
+"""
+Generación masiva de datos sintéticos (doctores, pacientes, citas y sus
+datos asociados) con `bulk_create` por lotes y semilla reproducible, para
+pruebas de capacidad y benchmarks. A diferencia de la población de ejemplo
+de `populate_db`, no hace consultas fila a fila.
+
+Las distribuciones imitan una consulta real:
+
+- Popularidad de doctores tipo Zipf: unos pocos concentran muchas citas.
+- Cada paciente tiene un doctor de cabecera; la mayoría de sus citas son
+  con él y el resto con cualquier otro.
+- Unos pacientes vienen mucho más que otros (pesos log-normales).
+- Más citas entre semana y a media mañana que en sábado o a última hora.
+- El estado depende de la fecha: el pasado está casi todo completado y el
+  futuro programado, con una fracción de cancelaciones en ambos.
+"""
+
+import bisect
+import datetime
+import heapq
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db.models import Max
+
+from doctors.models import Department, Doctor, DoctorAvailability
+from patients.models import Insurance, MedicalRecord, Patient
+
+from .care import rebuild_care_relationships
+from .models import Appointment, AppointmentStatus
+from .summaries import rebuild_appointment_summaries
+
+# Agenda de cada doctor: bloques de 30 minutos entre las 08:00 y las 18:00.
+SLOT_TIMES = [datetime.time(8 + i // 2, (i % 2) * 30) for i in range(20)]
+
+# Peso relativo de cada bloque horario (pico a media mañana) y de cada día
+# de la semana (lunes=0; el domingo no se atiende).
+TIME_WEIGHTS = [3, 4, 5, 6, 6, 6, 5, 4, 2, 2, 3, 4, 4, 4, 3, 3, 2, 2, 1, 1]
+WEEKDAY_WEIGHTS = [10, 10, 10, 10, 9, 3, 0]
+
+# Exponente de la ley de Zipf para la popularidad de doctores.
+DOCTOR_POPULARITY = 0.8
+# Probabilidad de que una cita sea con el doctor de cabecera del paciente.
+HOME_DOCTOR_SHARE = 0.8
+VACATION_SHARE = 0.03
+DOCTORS_PER_DEPARTMENT = 25
+PROVIDERS = ["Sura", "Colsanitas", "Sanitas", "Compensar", "Nueva EPS"]
+
+
+def allocate(total, weights, capacity):
+    """
+    Reparte `total` unidades proporcionalmente a `weights` sin superar
+    `capacity` por posición; lo que sobra de las posiciones llenas se
+    redistribuye entre las demás.
+    """
+    counts = [0] * len(weights)
+    open_ = set(range(len(weights)))
+    remaining = total
+    while remaining > 0 and open_:
+        weight = sum(weights[i] for i in open_)
+        given = 0
+        for i in sorted(open_):
+            share = min(capacity - counts[i], int(remaining * weights[i] / weight))
+            counts[i] += share
+            given += share
+        if given == 0:
+            # Restos por redondeo: uno a uno a los de más peso.
+            for i in sorted(open_, key=lambda i: -weights[i])[:remaining]:
+                counts[i] += 1
+                given += 1
+        remaining -= given
+        open_ = {i for i in open_ if counts[i] < capacity}
+    return counts
+
+
+class DatasetGenerator:
+    """
+    Genera un conjunto de datos sintético reproducible a partir de `seed`.
+
+    Las citas de un mismo doctor nunca comparten fecha y hora: se reparten
+    muestreando sin reemplazo (ponderado) los huecos de su agenda.
+    """
+    def __init__(self, seed=0, chunk_size=5000, start_date=None, days=455, log=None):
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.start_date = start_date or datetime.date.today() - datetime.timedelta(days=365)
+        self.days = days
+        self.log = log or (lambda message: None)
+        self.today = datetime.date.today()
+
+    def run(self, doctors, patients, appointments):
+        doctor_ids = self.create_doctors(doctors)
+        patient_ids = self.create_patients(patients)
+        self.create_availabilities(doctor_ids)
+        self.create_patient_records(patient_ids)
+        self.create_appointments(doctor_ids, patient_ids, appointments)
+        # bulk_create no dispara señales: los modelos derivados se reconstruyen.
+        rebuild_care_relationships()
+        rebuild_appointment_summaries()
+        return doctor_ids, patient_ids
+
+    def bulk_create(self, model, objs, keep=True):
+        """
+        Inserta `objs` (un iterable) por lotes. Devuelve las instancias, o
+        sólo cuántas son con `keep=False` para no retenerlas en memoria.
+        """
+        created, total = [], 0
+        objs = iter(objs)
+        while batch := list(itertools.islice(objs, self.chunk_size)):
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            if keep:
+                created.extend(batch)
+        return created if keep else total
+
+    def create_users(self, count, role):
+        """
+        Usuarios sin contraseña utilizable, en el grupo de su rol; el
+        prefijo evita choques con usuarios de ejecuciones anteriores.
+        """
+        offset = (User.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        password = make_password(None)
+        users = self.bulk_create(User, (
+            User(
+                username=f"{role}{offset + i}",
+                first_name=f"{role.capitalize()}{offset + i}",
+                last_name="Demo",
+                email=f"{role}{offset + i}@example.com",
+                password=password,
+            )
+            for i in range(count)
+        ))
+        group = Group.objects.get_or_create(name=role)[0]
+        self.bulk_create(User.groups.through, (
+            User.groups.through(user_id=user.id, group_id=group.id) for user in users
+        ))
+        return users
+
+    def create_doctors(self, count):
+        departments = self.bulk_create(Department, (
+            Department(name=f"Departamento {i + 1}", description="Generado")
+            for i in range(max(1, count // DOCTORS_PER_DEPARTMENT))
+        ))
+        ids = [doctor.id for doctor in self.bulk_create(Doctor, (
+            Doctor(
+                user=user,
+                first_name=user.first_name,
+                last_name=user.last_name,
+                qualification="MD",
+                contact_number="+57 300000000",
+                email=user.email,
+                address="Calle Falsa 123",
+                biography="Especialista en medicina general.",
+                is_on_vacation=self.rng.random() < VACATION_SHARE,
+                department=self.rng.choice(departments),
+            )
+            for user in self.create_users(count, "doctor")
+        ))]
+        self.log(f"  • {len(ids)} doctores en {len(departments)} departamentos")
+        return ids
+
+    def create_patients(self, count):
+        ids = [patient.id for patient in self.bulk_create(Patient, (
+            Patient(
+                user=user,
+                first_name=user.first_name,
+                last_name=user.last_name,
+                date_of_birth=datetime.date(1940, 1, 1)
+                + datetime.timedelta(days=self.rng.randrange(365 * 80)),
+                contact_number="+57 310000000",
+                email=user.email,
+                address="Avenida Demo 1",
+                medical_history="Sin antecedentes.",
+            )
+            for user in self.create_users(count, "patient")
+        ))]
+        self.log(f"  • {len(ids)} pacientes")
+        return ids
+
+    def create_availabilities(self, doctor_ids):
+        """
+        Una ventana por doctor que cubre todo el periodo en horario de
+        agenda; algunos sólo atienden por la mañana.
+        """
+        last_day = self.start_date + datetime.timedelta(days=self.days - 1)
+        created = self.bulk_create(DoctorAvailability, (
+            DoctorAvailability(
+                doctor_id=doctor_id,
+                start_date=self.start_date,
+                end_date=last_day,
+                start_time=SLOT_TIMES[0],
+                end_time=datetime.time(13) if self.rng.random() < 0.2 else datetime.time(18),
+            )
+            for doctor_id in doctor_ids
+        ))
+        self.log(f"  • {len(created)} ventanas de disponibilidad")
+
+    def create_patient_records(self, patient_ids):
+        """
+        Un seguro por paciente y entre cero y tres registros médicos.
+        """
+        self.bulk_create(Insurance, (
+            Insurance(
+                patient_id=patient_id,
+                provider=self.rng.choice(PROVIDERS),
+                policy_number=f"POL{patient_id:08d}",
+                expiration_date=self.today + datetime.timedelta(days=self.rng.randrange(30, 730)),
+            )
+            for patient_id in patient_ids
+        ))
+        records = self.bulk_create(MedicalRecord, (
+            MedicalRecord(
+                patient_id=patient_id,
+                date=date,
+                diagnosis="Chequeo general",
+                treatment="Ninguno",
+                follow_up_date=date + datetime.timedelta(days=30),
+            )
+            for patient_id in patient_ids
+            for date in self.random_dates(self.rng.choice((0, 1, 1, 2, 3)))
+        ))
+        self.log(f"  • {len(patient_ids)} seguros y {len(records)} registros médicos")
+
+    def random_dates(self, count):
+        return [
+            self.start_date + datetime.timedelta(days=self.rng.randrange(self.days))
+            for _ in range(count)
+        ]
+
+    # -- Citas --------------------------------------------------------------
+
+    def slot_weights(self):
+        """
+        Peso de cada hueco (día, bloque) de la agenda, en el orden en que se
+        numeran: slot = día * len(SLOT_TIMES) + bloque.
+        """
+        weights = []
+        for day in range(self.days):
+            weekday = (self.start_date + datetime.timedelta(days=day)).weekday()
+            weights.extend(WEEKDAY_WEIGHTS[weekday] * w for w in TIME_WEIGHTS)
+        return weights
+
+    def status_for(self, date):
+        roll = self.rng.random()
+        if roll < 0.1:
+            return AppointmentStatus.CANCELED
+        return AppointmentStatus.COMPLETED if date < self.today else AppointmentStatus.SCHEDULED
+
+    def iter_appointments(self, doctor_ids, patient_ids, count):
+        """
+        Reparte `count` citas entre los doctores y genera instancias sin
+        guardar, doctor por doctor, para mantener la memoria acotada.
+        """
+        weights = self.slot_weights()
+        usable = [slot for slot, weight in enumerate(weights) if weight]
+        popularity = [1 / (rank + 1) ** DOCTOR_POPULARITY for rank in range(len(doctor_ids))]
+        self.rng.shuffle(popularity)
+        per_doctor = allocate(count, popularity, len(usable))
+
+        # Frecuencia de visita de cada paciente (log-normal) y doctor de
+        # cabecera según la popularidad. Los pacientes se eligen con
+        # búsqueda binaria sobre los pesos acumulados.
+        activity = [self.rng.lognormvariate(0, 1) for _ in patient_ids]
+        homes = self.rng.choices(doctor_ids, weights=popularity, k=len(patient_ids))
+        panels = {doctor_id: ([], []) for doctor_id in doctor_ids}
+        for patient_id, doctor_id, weight in zip(patient_ids, homes, activity):
+            ids, cumulative = panels[doctor_id]
+            ids.append(patient_id)
+            cumulative.append((cumulative[-1] if cumulative else 0) + weight)
+        everyone = (patient_ids, list(itertools.accumulate(activity)))
+
+        def pick(population):
+            ids, cumulative = population
+            return ids[bisect.bisect(cumulative, self.rng.random() * cumulative[-1])]
+
+        for doctor_id, n in zip(doctor_ids, per_doctor):
+            # Muestreo ponderado sin reemplazo (Efraimidis–Spirakis).
+            keys = {slot: self.rng.random() ** (1 / weights[slot]) for slot in usable}
+            panel = panels[doctor_id]
+            for slot in heapq.nlargest(n, usable, key=keys.__getitem__):
+                day, time_index = divmod(slot, len(SLOT_TIMES))
+                date = self.start_date + datetime.timedelta(days=day)
+                at_home = panel[0] and self.rng.random() < HOME_DOCTOR_SHARE
+                yield Appointment(
+                    doctor_id=doctor_id,
+                    patient_id=pick(panel if at_home else everyone),
+                    appointment_date=date,
+                    appointment_time=SLOT_TIMES[time_index],
+                    notes="Cita generada",
+                    status=self.status_for(date),
+                )
+
+    def create_appointments(self, doctor_ids, patient_ids, count):
+        created = self.bulk_create(
+            Appointment, self.iter_appointments(doctor_ids, patient_ids, count), keep=False
+        )
+        self.log(f"  • {created} citas")
+        return created
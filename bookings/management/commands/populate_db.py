@@ -2,8 +2,9 @@
 
 import random
 import datetime
+import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User, Group
 
 from doctors.models import (
@@ -11,13 +12,32 @@ from doctors.models import (
     MedicalNote as DoctorNote
 )
 from patients.models import Patient, Insurance, MedicalRecord
-from bookings.models import Appointment, MedicalNote as BookingNote
+from bookings.generators import DatasetGenerator
+from bookings.models import Appointment, AppointmentStatus, MedicalNote as BookingNote
 
 
 class Command(BaseCommand):
-    help = "Puebla la base de datos con datos de prueba para doctors, patients y bookings."
+    help = (
+        "Puebla la base de datos con datos de prueba para doctors, patients y bookings. "
+        "Con --doctors/--patients/--appointments genera en cambio un conjunto masivo "
+        "con distribuciones realistas (p. ej. --doctors 5000 --patients 500000 "
+        "--appointments 10000000)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, help="Doctores a generar.")
+        parser.add_argument('--patients', type=int, help="Pacientes a generar.")
+        parser.add_argument('--appointments', type=int, help="Citas a generar.")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Semilla: la misma semilla produce los mismos datos.")
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Filas por INSERT en la generación masiva.")
 
     def handle(self, *args, **options):
+        scale = [options[name] for name in ('doctors', 'patients', 'appointments')]
+        if any(value is not None for value in scale):
+            return self.generate(*(value or 0 for value in scale), options)
+
         self.stdout.write("🔄 Iniciando población de datos…\n")
 
         self.create_groups()
@@ -35,6 +55,21 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS("\n✅ ¡Datos de prueba insertados con éxito!"))
 
+    def generate(self, doctors, patients, appointments, options):
+        if appointments and not (doctors and patients):
+            raise CommandError("Para generar citas hacen falta doctores y pacientes.")
+        self.stdout.write(
+            f"🔄 Generando {doctors} doctores, {patients} pacientes y "
+            f"{appointments} citas (semilla {options['seed']})…"
+        )
+        started = time.perf_counter()
+        DatasetGenerator(
+            seed=options['seed'], chunk_size=options['chunk_size'], log=self.stdout.write
+        ).run(doctors, patients, appointments)
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Datos generados en {time.perf_counter() - started:.1f} s."
+        ))
+
     def create_groups(self):
         for name in ("doctor", "patient"):
             grp, created = Group.objects.get_or_create(name=name)
@@ -185,14 +220,19 @@ class Command(BaseCommand):
         for i in range(1, 11):
             date_ = datetime.date.today() + datetime.timedelta(days=i)
             time_ = datetime.time((9 + i) % 24, 0)
+            # Se busca por el hueco (único entre citas activas), no por el
+            # paciente: al repetir el comando el paciente elegido cambia.
             appt, created = Appointment.objects.get_or_create(
-                patient=random.choice(patients),
                 doctor=random.choice(doctors),
                 appointment_date=date_,
                 appointment_time=time_,
                 defaults={
+                    "patient": random.choice(patients),
                     "notes": f"Cita #{i}",
-                    "status": random.choice(["scheduled", "completed", "canceled"])
+                    "status": random.choice([
+                        AppointmentStatus.SCHEDULED, AppointmentStatus.COMPLETED,
+                        AppointmentStatus.CANCELED,
+                    ])
                 }
             )
             status = "creada" if created else "existía"
@@ -0,0 +1,14 @@
+# bookings/management/commands/rebuild_appointment_summaries.py
+
+from django.core.management.base import BaseCommand
+
+from bookings.summaries import rebuild_appointment_summaries
+
+
+class Command(BaseCommand):
+    help = "Reconstruye en bloque los resúmenes de citas de los paneles de doctor y paciente."
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Reconstruyendo resúmenes de citas…")
+        total = rebuild_appointment_summaries()
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} resúmenes reconstruidos."))
@@ -0,0 +1,14 @@
+# bookings/management/commands/rebuild_care_relationships.py
+
+from django.core.management.base import BaseCommand
+
+from bookings.care import rebuild_care_relationships
+
+
+class Command(BaseCommand):
+    help = "Reconstruye en bloque la tabla de relaciones doctor–paciente a partir de las citas."
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Reconstruyendo relaciones doctor–paciente…")
+        total = rebuild_care_relationships()
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} relaciones reconstruidas."))
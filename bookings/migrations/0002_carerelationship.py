@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def populate_care_relationships(apps, schema_editor):
+    Appointment = apps.get_model('bookings', 'Appointment')
+    CareRelationship = apps.get_model('bookings', 'CareRelationship')
+    rows = (
+        Appointment.objects
+        .values('doctor_id', 'patient_id')
+        .order_by()
+        .annotate(
+            count=Count('id'),
+            first=Min('appointment_date'),
+            last=Max('appointment_date'),
+        )
+    )
+    CareRelationship.objects.bulk_create(
+        (
+            CareRelationship(
+                doctor_id=row['doctor_id'],
+                patient_id=row['patient_id'],
+                first_seen=row['first'],
+                last_seen=row['last'],
+                appointment_count=row['count'],
+            )
+            for row in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+        ('doctors', '0002_doctor_department'),
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CareRelationship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_seen', models.DateField()),
+                ('last_seen', models.DateField()),
+                ('appointment_count', models.PositiveIntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='care_relationships', to='doctors.doctor')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='care_relationships', to='patients.patient')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'patient'), name='unique_care_relationship')],
+            },
+        ),
+        migrations.RunPython(populate_care_relationships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:46
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def cancel_double_bookings(apps, schema_editor):
+    """
+    Deja una sola cita activa por hueco (doctor, fecha, hora) antes de añadir
+    `unique_active_doctor_slot`: se conserva la de menor id y las demás pasan
+    a 'canceled'. Determinista y sin borrar datos.
+    """
+    Appointment = apps.get_model('bookings', 'Appointment')
+    active = Appointment.objects.exclude(status='canceled')
+    clashes = (
+        active
+        .values('doctor_id', 'appointment_date', 'appointment_time')
+        .order_by()
+        .annotate(count=Count('id'), keep=Min('id'))
+        .filter(count__gt=1)
+    )
+    for slot in clashes.iterator():
+        (
+            active
+            .filter(
+                doctor_id=slot['doctor_id'],
+                appointment_date=slot['appointment_date'],
+                appointment_time=slot['appointment_time'],
+            )
+            .exclude(id=slot['keep'])
+            .update(status='canceled')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_carerelationship'),
+        ('doctors', '0002_doctor_department'),
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'appointment_date', 'appointment_time'], name='appt_doctor_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'appointment_date'], name='appt_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status'], name='appt_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'appointment_time', 'id'], name='appt_calendar_idx'),
+        ),
+        migrations.RunPython(cancel_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'canceled'), _negated=True), fields=('doctor', 'appointment_date', 'appointment_time'), name='unique_active_doctor_slot'),
+        ),
+    ]
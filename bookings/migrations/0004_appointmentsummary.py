@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Value
+from django.db.models.functions import Concat
+
+
+def populate_appointment_summaries(apps, schema_editor):
+    Appointment = apps.get_model('bookings', 'Appointment')
+    AppointmentSummary = apps.get_model('bookings', 'AppointmentSummary')
+    rows = (
+        Appointment.objects
+        .values(
+            'id', 'doctor_id', 'patient_id', 'appointment_date', 'appointment_time', 'status'
+        )
+        .order_by()
+        .annotate(
+            doctor_name=Concat('doctor__first_name', Value(' '), 'doctor__last_name'),
+            patient_name=Concat('patient__first_name', Value(' '), 'patient__last_name'),
+            note_count=Count('medical_notes'),
+            last_note_date=Max('medical_notes__date'),
+        )
+    )
+    AppointmentSummary.objects.bulk_create(
+        (
+            AppointmentSummary(appointment_id=row.pop('id'), **row)
+            for row in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_appointment_indexes'),
+        ('doctors', '0003_updated_at'),
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSummary',
+            fields=[
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='bookings.appointment')),
+                ('appointment_date', models.DateField()),
+                ('appointment_time', models.TimeField()),
+                ('status', models.CharField(max_length=10)),
+                ('doctor_name', models.CharField(max_length=201)),
+                ('patient_name', models.CharField(max_length=201)),
+                ('note_count', models.PositiveIntegerField(default=0)),
+                ('last_note_date', models.DateField(blank=True, null=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_summaries', to='doctors.doctor')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_summaries', to='patients.patient')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor', 'appointment_date', 'appointment_time', 'appointment'], name='summary_doctor_idx'), models.Index(fields=['patient', 'appointment_date', 'appointment_time', 'appointment'], name='summary_patient_idx'), models.Index(fields=['appointment_date', 'appointment_time', 'appointment'], name='summary_calendar_idx')],
+            },
+        ),
+        migrations.RunPython(populate_appointment_summaries, migrations.RunPython.noop),
+    ]
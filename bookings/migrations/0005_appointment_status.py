@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+STATUSES = ('scheduled', 'pending', 'completed', 'canceled')
+
+# Variantes conocidas del texto libre anterior.
+ALIASES = {
+    'cancelled': 'canceled',
+    'cancelada': 'canceled',
+    'programada': 'scheduled',
+    'pendiente': 'pending',
+    'completada': 'completed',
+    'done': 'completed',
+}
+
+
+def normalize_statuses(apps, schema_editor):
+    """
+    Lleva cada estado a uno de STATUSES antes de añadir la restricción: en
+    minúsculas y sin espacios, con los alias conocidos; el resto queda como
+    'pending' para revisarlo a mano. Una UPDATE por valor distinto.
+    """
+    for name in ('Appointment', 'AppointmentSummary'):
+        model = apps.get_model('bookings', name)
+        values = model.objects.exclude(status__in=STATUSES).values_list('status', flat=True)
+        for value in set(values):
+            cleaned = value.strip().lower()
+            cleaned = ALIASES.get(cleaned, cleaned)
+            model.objects.filter(status=value).update(
+                status=cleaned if cleaned in STATUSES else 'pending'
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_appointmentsummary'),
+        ('doctors', '0003_updated_at'),
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_statuses, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_status_idx',
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Programada'), ('pending', 'Pendiente'), ('completed', 'Completada'), ('canceled', 'Cancelada')], default='scheduled', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='appointmentsummary',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Programada'), ('pending', 'Pendiente'), ('completed', 'Completada'), ('canceled', 'Cancelada')], max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'scheduled')), fields=['appointment_date', 'appointment_time', 'status'], name='appt_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'scheduled')), fields=['doctor', 'appointment_date', 'appointment_time'], name='appt_doctor_scheduled_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.CheckConstraint(condition=models.Q(('status__in', ['scheduled', 'pending', 'completed', 'canceled'])), name='appt_status_valid'),
+        ),
+    ]
@@ -5,6 +5,13 @@ from doctors.models import Doctor
 from patients.models import Patient
 
 
+class AppointmentStatus(models.TextChoices):
+    SCHEDULED = 'scheduled', 'Programada'
+    PENDING = 'pending', 'Pendiente'
+    COMPLETED = 'completed', 'Completada'
+    CANCELED = 'canceled', 'Cancelada'
+
+
 class Appointment(models.Model):
     patient = models.ForeignKey(
         Patient, related_name='appointments', on_delete=models.CASCADE
@@ -15,7 +22,51 @@ class Appointment(models.Model):
     appointment_date = models.DateField()
     appointment_time = models.TimeField()
     notes = models.TextField()
-    status = models.CharField(max_length=10)
+    status = models.CharField(
+        max_length=10, choices=AppointmentStatus.choices, default=AppointmentStatus.SCHEDULED
+    )
+
+    class Meta:
+        indexes = [
+            # Agenda de un doctor: huecos libres, conflictos, semana de calendario.
+            models.Index(
+                fields=['doctor', 'appointment_date', 'appointment_time'],
+                name='appt_doctor_slot_idx'
+            ),
+            # Historial de un paciente.
+            models.Index(fields=['patient', 'appointment_date'], name='appt_patient_date_idx'),
+            # Citas programadas, el subconjunto caliente (recordatorios,
+            # agenda pendiente): índices parciales sin las completadas ni
+            # las canceladas. `status` (constante) al final hace que contar
+            # las programadas no tenga que leer la tabla.
+            models.Index(
+                fields=['appointment_date', 'appointment_time', 'status'],
+                condition=models.Q(status=AppointmentStatus.SCHEDULED),
+                name='appt_scheduled_idx'
+            ),
+            models.Index(
+                fields=['doctor', 'appointment_date', 'appointment_time'],
+                condition=models.Q(status=AppointmentStatus.SCHEDULED),
+                name='appt_doctor_scheduled_idx'
+            ),
+            # Orden del cursor de paginación.
+            models.Index(
+                fields=['appointment_date', 'appointment_time', 'id'],
+                name='appt_calendar_idx'
+            ),
+        ]
+        constraints = [
+            # Un doctor no puede tener dos citas activas en el mismo horario.
+            models.UniqueConstraint(
+                fields=['doctor', 'appointment_date', 'appointment_time'],
+                condition=~models.Q(status=AppointmentStatus.CANCELED),
+                name='unique_active_doctor_slot'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(status__in=AppointmentStatus.values),
+                name='appt_status_valid'
+            ),
+        ]
 
 
 class MedicalNote(models.Model):
@@ -23,4 +74,76 @@ class MedicalNote(models.Model):
         Appointment, related_name='medical_notes', on_delete=models.CASCADE
     )
     note = models.TextField()
-    date = models.DateField()
\ No newline at end of file
+    date = models.DateField()
+
+
+class CareRelationship(models.Model):
+    """
+    Relación doctor–paciente materializada a partir de las citas.
+
+    Responde "¿este doctor atiende a este paciente?" con una búsqueda
+    indexada. Se mantiene con señales sobre Appointment (ver signals.py) y se
+    reconstruye con `manage.py rebuild_care_relationships`.
+    """
+    doctor = models.ForeignKey(
+        Doctor, related_name='care_relationships', on_delete=models.CASCADE
+    )
+    patient = models.ForeignKey(
+        Patient, related_name='care_relationships', on_delete=models.CASCADE
+    )
+    first_seen = models.DateField()
+    last_seen = models.DateField()
+    appointment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['doctor', 'patient'], name='unique_care_relationship'
+            ),
+        ]
+
+
+class AppointmentSummary(models.Model):
+    """
+    Fila de lectura desnormalizada de una cita para los paneles de doctor y
+    paciente: nombres, estado y resumen de notas, sin JOINs ni agregados.
+
+    Se mantiene con señales sobre Appointment, MedicalNote, Doctor y Patient
+    (ver signals.py) y se reconstruye con
+    `manage.py rebuild_appointment_summaries`.
+    """
+    appointment = models.OneToOneField(
+        Appointment, primary_key=True, related_name='summary', on_delete=models.CASCADE
+    )
+    doctor = models.ForeignKey(
+        Doctor, related_name='appointment_summaries', on_delete=models.CASCADE
+    )
+    patient = models.ForeignKey(
+        Patient, related_name='appointment_summaries', on_delete=models.CASCADE
+    )
+    appointment_date = models.DateField()
+    appointment_time = models.TimeField()
+    status = models.CharField(max_length=10, choices=AppointmentStatus.choices)
+    doctor_name = models.CharField(max_length=201)
+    patient_name = models.CharField(max_length=201)
+    note_count = models.PositiveIntegerField(default=0)
+    last_note_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Panel del doctor y del paciente: filtro por persona y rango de
+            # fechas, ya en el orden del cursor.
+            models.Index(
+                fields=['doctor', 'appointment_date', 'appointment_time', 'appointment'],
+                name='summary_doctor_idx'
+            ),
+            models.Index(
+                fields=['patient', 'appointment_date', 'appointment_time', 'appointment'],
+                name='summary_patient_idx'
+            ),
+            # Panel de staff: todas las citas.
+            models.Index(
+                fields=['appointment_date', 'appointment_time', 'appointment'],
+                name='summary_calendar_idx'
+            ),
+        ]
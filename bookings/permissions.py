@@ -2,6 +2,25 @@
 
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+
+def _booking(obj):
+    """
+    Cita a la que pertenece `obj`: la propia cita o la de una nota médica.
+    """
+    return getattr(obj, 'appointment', obj)
+
+
+def _is_booking_patient(user, obj):
+    # Se comparan ids: no hace falta cargar el paciente de la cita.
+    patient = getattr(user, 'patient', None)
+    return patient is not None and _booking(obj).patient_id == patient.id
+
+
+def _is_booking_doctor(user, obj):
+    doctor = getattr(user, 'doctor', None)
+    return doctor is not None and _booking(obj).doctor_id == doctor.id
+
+
 class IsBookingOrReadOnly(BasePermission):
     """
     - SAFE_METHODS (GET, HEAD, OPTIONS):
@@ -33,9 +52,9 @@ class IsBookingOrReadOnly(BasePermission):
             if request.user.is_staff:
                 return True
             if hasattr(request.user, 'patient'):
-                return obj.patient.user == request.user
+                return _is_booking_patient(request.user, obj)
             if hasattr(request.user, 'doctor'):
-                return obj.doctor.user == request.user
+                return _is_booking_doctor(request.user, obj)
             return False
 
         # Escritura (PUT/PATCH/DELETE): delegamos a OwnerOrAdmin
@@ -58,11 +77,27 @@ class IsBookingOwnerOrAdmin(BasePermission):
             return True
 
         # Paciente dueño de la cita
-        if hasattr(user, 'patient') and obj.patient.user == user:
+        if _is_booking_patient(user, obj):
             return True
 
         # Doctor asociado a la cita
-        if hasattr(user, 'doctor') and obj.doctor.user == user:
+        if _is_booking_doctor(user, obj):
             return True
 
-        return False
\ No newline at end of file
+        return False
+
+
+class IsNoteDoctorOrAdmin(BasePermission):
+    """
+    Escritura de notas médicas: sólo el doctor de la cita o un admin. El
+    paciente de la cita puede leerlas (IsBookingOrReadOnly), no modificarlas.
+    """
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        return user.is_staff or hasattr(user, 'doctor')
+
+    def has_object_permission(self, request, view, obj):
+        user = request.user
+        return user.is_staff or _is_booking_doctor(user, obj)
@@ -1,16 +1,70 @@
 #/bookings/serializaers.py
 
+import datetime
+
 from rest_framework import serializers
-from .models import Appointment, MedicalNote
+from .models import Appointment, AppointmentStatus, AppointmentSummary, MedicalNote
 
 
 class AppointmentSerializer(serializers.ModelSerializer):
+    """
+    Sin el validador de unicidad que DRF deriva de `unique_active_doctor_slot`:
+    los conflictos de horario los resuelve `book_appointment` con la agenda
+    bloqueada (409), no una consulta previa que otra petición puede adelantar.
+    """
+    class Meta:
+        model = Appointment
+        fields = '__all__'
+        validators = []
+
+
+class AppointmentBulkSerializer(serializers.ModelSerializer):
+    """
+    Elemento de los endpoints masivos. Las FKs se validan como enteros y su
+    existencia se comprueba en bloque (ver doctorapp.bulk); la disponibilidad y
+    los solapes también, con `slot_conflicts`, en lugar de consultas por cita.
+    """
+    patient = serializers.IntegerField(source='patient_id')
+    doctor = serializers.IntegerField(source='doctor_id')
+
     class Meta:
         model = Appointment
         fields = '__all__'
+        validators = []
 
 
 class MedicalNoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = MedicalNote
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    def validate_appointment(self, value):
+        user = self.context['request'].user
+        if user.is_staff:
+            return value
+        doctor = getattr(user, 'doctor', None)
+        if doctor is None or value.doctor_id != doctor.id:
+            raise serializers.ValidationError("No puedes escribir notas en citas de otro doctor.")
+        return value
+
+
+class AppointmentSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AppointmentSummary
+        fields = '__all__'
+
+
+class DashboardQuerySerializer(serializers.Serializer):
+    """
+    Parámetros del panel de citas. Por defecto: desde hoy, sin límite.
+    """
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(required=False, choices=AppointmentStatus.choices)
+
+    def validate(self, attrs):
+        attrs['date_from'] = attrs.get('date_from') or datetime.date.today()
+        date_to = attrs.get('date_to')
+        if date_to is not None and date_to < attrs['date_from']:
+            raise serializers.ValidationError("`date_to` no puede ser anterior a `date_from`.")
+        return attrs
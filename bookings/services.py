@@ -0,0 +1,244 @@
+#/bookings/services.py
+
+"""
+Reglas de negocio de las citas compartidas por las vistas.
+"""
+
+import bisect
+import datetime
+import threading
+from contextlib import ExitStack, contextmanager
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from doctors.availability import appointment_minutes
+from doctors.models import Doctor, DoctorAvailability
+
+from .models import Appointment, AppointmentStatus
+
+# Campos que definen el hueco que ocupa una cita.
+SLOT_FIELDS = ('doctor', 'appointment_date', 'appointment_time', 'status')
+
+# Candados para bases de datos sin SELECT ... FOR UPDATE (SQLite): un número
+# fijo, repartidos por `doctor_id % DOCTOR_LOCK_STRIPES`, para que la memoria
+# no crezca con el número de doctores. Dos doctores pueden compartir candado;
+# sólo se esperan entre sí, nunca se mezclan sus agendas.
+DOCTOR_LOCK_STRIPES = 64
+_doctor_locks = [threading.Lock() for _ in range(DOCTOR_LOCK_STRIPES)]
+
+
+class BookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "El doctor ya tiene una cita que se solapa con ese horario."
+    default_code = 'booking_conflict'
+
+
+def scope_appointments(queryset, user):
+    """
+    Restringe `queryset` a las citas que `user` puede ver una a una (ver
+    IsBookingOrReadOnly): todas para staff, las suyas para doctores y
+    pacientes, ninguna para el resto.
+    """
+    if user.is_staff:
+        return queryset
+    if hasattr(user, 'doctor'):
+        return queryset.filter(doctor=user.doctor)
+    if hasattr(user, 'patient'):
+        return queryset.filter(patient=user.patient)
+    return queryset.none()
+
+
+def slot_conflicts(appointments):
+    """
+    Las reglas de `check_booking` aplicadas a un lote de citas, con dos
+    consultas: una para las ventanas de disponibilidad y otra para las citas
+    ya reservadas de los doctores del lote; el resto se comprueba en memoria.
+
+    `appointments` es {índice: Appointment} (nuevas o ya modificadas). Cada
+    cita activa (no cancelada) debe caber en una ventana de su doctor y no
+    solaparse con otra activa suya, dentro del lote o en la base de datos.
+    Las citas del lote que ya existen se comparan con su estado nuevo, no con
+    el guardado. Devuelve {índice: mensaje}.
+    """
+    duration = datetime.timedelta(minutes=appointment_minutes())
+    conflicts, starts = {}, {}
+    for i in sorted(appointments):
+        appointment = appointments[i]
+        if appointment.status == AppointmentStatus.CANCELED:
+            continue
+        start = datetime.datetime.combine(appointment.appointment_date, appointment.appointment_time)
+        if (start + duration).date() != appointment.appointment_date:
+            conflicts[i] = "La cita no puede pasar de medianoche."
+        else:
+            starts[i] = start
+    if not starts:
+        return conflicts
+
+    doctor_ids = {appointments[i].doctor_id for i in starts}
+    dates = [start.date() for start in starts.values()]
+    first, last = min(dates), max(dates)
+
+    windows = {}
+    rows = DoctorAvailability.objects.filter(
+        doctor_id__in=doctor_ids, start_date__lte=last, end_date__gte=first
+    ).values_list('doctor_id', 'start_date', 'end_date', 'start_time', 'end_time')
+    for doctor_id, *window in rows:
+        windows.setdefault(doctor_id, []).append(window)
+
+    # Inicios ocupados por (doctor, fecha), ordenados; -1 marca las citas de
+    # la base de datos y un índice las del lote ya aceptadas.
+    taken = {}
+    rows = (
+        Appointment.objects
+        .filter(doctor_id__in=doctor_ids, appointment_date__range=(first, last))
+        .exclude(status=AppointmentStatus.CANCELED)
+        .exclude(pk__in=[a.pk for a in appointments.values() if a.pk is not None])
+        .values_list('doctor_id', 'appointment_date', 'appointment_time')
+    )
+    for doctor_id, date, time in rows:
+        taken.setdefault((doctor_id, date), []).append((datetime.datetime.combine(date, time), -1))
+    for day in taken.values():
+        day.sort()
+
+    for i, start in starts.items():
+        doctor_id, date = appointments[i].doctor_id, start.date()
+        time, end = start.time(), (start + duration).time()
+        if not any(
+            start_date <= date <= end_date and start_time <= time and end_time >= end
+            for start_date, end_date, start_time, end_time in windows.get(doctor_id, ())
+        ):
+            conflicts[i] = "El horario está fuera de la disponibilidad del doctor."
+            continue
+
+        # Basta con mirar los inicios vecinos: hay solape si alguno está a
+        # menos de `duration`.
+        day = taken.setdefault((doctor_id, date), [])
+        position = bisect.bisect_left(day, (start, -1))
+        neighbours = day[max(position - 1, 0):position + 1]
+        clash = next((j for other, j in neighbours if abs(other - start) < duration), None)
+        if clash is None:
+            day.insert(position, (start, i))
+        elif clash < 0:
+            conflicts[i] = "El doctor ya tiene una cita que se solapa con ese horario."
+        else:
+            conflicts[i] = f"El doctor ya tiene una cita que se solapa con ese horario (elemento {clash})."
+    return conflicts
+
+
+@contextmanager
+def doctor_schedule_lock(doctor_id):
+    """
+    Transacción con la agenda del doctor bloqueada: las reservas del mismo
+    doctor se serializan y las de doctores distintos no se esperan.
+
+    Con soporte de `select_for_update` se bloquea la fila del doctor hasta el
+    commit. En SQLite (sin bloqueo de filas) se usa un candado del proceso
+    (uno de `DOCTOR_LOCK_STRIPES`, según el doctor) hasta después del commit:
+    sólo serializa las reservas dentro de un mismo proceso. Entre procesos
+    queda la restricción `unique_active_doctor_slot` como última barrera.
+    """
+    with doctor_schedule_locks([doctor_id]):
+        yield
+
+
+@contextmanager
+def doctor_schedule_locks(doctor_ids):
+    """
+    Como `doctor_schedule_lock`, para las agendas de varios doctores a la vez
+    (p. ej. un lote). Los bloqueos se toman siempre en el mismo orden para
+    que dos lotes que comparten doctores no se bloqueen mutuamente.
+    """
+    doctor_ids = sorted(set(doctor_ids))
+    if connection.features.has_select_for_update:
+        with transaction.atomic():
+            list(
+                Doctor.objects.select_for_update()
+                .filter(pk__in=doctor_ids).order_by('pk').values_list('pk')
+            )
+            yield
+        return
+
+    with ExitStack() as stack:
+        for stripe in sorted({doctor_id % DOCTOR_LOCK_STRIPES for doctor_id in doctor_ids}):
+            stack.enter_context(_doctor_locks[stripe])
+        with transaction.atomic():
+            yield
+
+
+def check_booking(doctor_id, date, time, exclude_pk=None):
+    """
+    Comprueba que la cita de `appointment_minutes()` que empieza en
+    date/time cabe en una ventana de disponibilidad del doctor (400 si no) y
+    que no se solapa con otra cita activa suya (409). Dos consultas sobre
+    índices del doctor.
+    """
+    duration = datetime.timedelta(minutes=appointment_minutes())
+    start = datetime.datetime.combine(date, time)
+    if (start + duration).date() != date:
+        raise ValidationError({"appointment_time": ["La cita no puede pasar de medianoche."]})
+    end = (start + duration).time()
+
+    available = DoctorAvailability.objects.filter(
+        doctor_id=doctor_id,
+        start_date__lte=date, end_date__gte=date,
+        start_time__lte=time, end_time__gte=end,
+    ).exists()
+    if not available:
+        raise ValidationError({
+            "appointment_time": ["El horario está fuera de la disponibilidad del doctor."]
+        })
+
+    # Dos citas se solapan si una empieza menos de `duration` antes o
+    # después que la otra.
+    earliest = start - duration
+    after = (
+        Q(appointment_time__gt=earliest.time()) if earliest.date() == date
+        else Q(appointment_time__gte=datetime.time(0))
+    )
+    overlapping = (
+        Appointment.objects
+        .filter(after, doctor_id=doctor_id, appointment_date=date, appointment_time__lt=end)
+        .exclude(status=AppointmentStatus.CANCELED)
+    )
+    if exclude_pk is not None:
+        overlapping = overlapping.exclude(pk=exclude_pk)
+    if overlapping.exists():
+        raise BookingConflict()
+
+
+def book_appointment(serializer, **extra):
+    """
+    Crea o modifica una cita con `serializer.save(**extra)` garantizando
+    que el doctor no queda con dos citas activas solapadas, aunque lleguen
+    reservas concurrentes para el mismo horario.
+
+    Sólo se comprueba la agenda si cambia el hueco (doctor, fecha, hora o
+    estado) y la cita queda activa; una cancelación nunca choca.
+    """
+    instance = serializer.instance
+    values = {**serializer.validated_data, **extra}
+    slot = {
+        field: values[field] if field in values else getattr(instance, field, None)
+        for field in SLOT_FIELDS
+    }
+    changed = instance is None or any(
+        slot[field] != getattr(instance, field) for field in SLOT_FIELDS
+    )
+    if not changed or slot['status'] == AppointmentStatus.CANCELED:
+        return serializer.save(**extra)
+
+    doctor = slot['doctor']
+    with doctor_schedule_lock(doctor.pk):
+        check_booking(
+            doctor.pk, slot['appointment_date'], slot['appointment_time'],
+            exclude_pk=getattr(instance, 'pk', None)
+        )
+        try:
+            # Punto de guardado: un IntegrityError no invalida la transacción.
+            with transaction.atomic():
+                return serializer.save(**extra)
+        except IntegrityError:
+            raise BookingConflict()
@@ -0,0 +1,89 @@
+#/bookings/signals.py
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from doctors.models import Doctor
+from patients.models import Patient
+
+from .care import schedule_care_refresh
+from .models import Appointment, AppointmentSummary, MedicalNote
+from .summaries import display_name, refresh_appointment_summaries
+
+
+@receiver(post_init, sender=Appointment)
+def remember_care_pair(sender, instance, **kwargs):
+    # Se lee de __dict__ para no disparar consultas con campos diferidos.
+    instance._care_pair = (
+        instance.__dict__.get('doctor_id'), instance.__dict__.get('patient_id')
+    )
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def update_care_relationship(sender, instance, **kwargs):
+    """
+    Mantiene CareRelationship al crear, modificar o borrar una cita. Si la
+    cita cambió de doctor o de paciente también se recalcula el par anterior.
+    """
+    pairs = {(instance.doctor_id, instance.patient_id)}
+    previous = getattr(instance, '_care_pair', (None, None))
+    if None not in previous:
+        pairs.add(previous)
+    schedule_care_refresh(pairs)
+    instance._care_pair = (instance.doctor_id, instance.patient_id)
+
+
+@receiver(post_save, sender=Appointment)
+def update_appointment_summary(sender, instance, **kwargs):
+    # Al borrar la cita su resumen se borra en cascada.
+    refresh_appointment_summaries([instance.pk])
+
+
+@receiver(post_init, sender=MedicalNote)
+def remember_note_appointment(sender, instance, **kwargs):
+    instance._summary_appointment = instance.__dict__.get('appointment_id')
+
+
+@receiver(post_save, sender=MedicalNote)
+@receiver(post_delete, sender=MedicalNote)
+def update_note_summary(sender, instance, origin=None, **kwargs):
+    """
+    Recalcula el número de notas y la fecha de la última en el resumen de la
+    cita (y en el de la anterior si la nota cambió de cita).
+    """
+    if kwargs.get('signal') is post_delete and not (
+        isinstance(origin, MedicalNote) or getattr(origin, 'model', None) is MedicalNote
+    ):
+        # Borrado en cascada desde la cita: su resumen también desaparece.
+        return
+    ids = {instance.appointment_id, getattr(instance, '_summary_appointment', None)}
+    ids.discard(None)
+    refresh_appointment_summaries(ids)
+    instance._summary_appointment = instance.appointment_id
+
+
+@receiver(post_init, sender=Doctor)
+@receiver(post_init, sender=Patient)
+def remember_display_name(sender, instance, **kwargs):
+    fields = instance.__dict__
+    instance._display_name = (fields.get('first_name'), fields.get('last_name'))
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_save, sender=Patient)
+def update_summary_names(sender, instance, created, **kwargs):
+    """
+    Propaga un cambio de nombre a los resúmenes con un único UPDATE.
+    """
+    previous = getattr(instance, '_display_name', (None, None))
+    current = (instance.first_name, instance.last_name)
+    instance._display_name = current
+    if created or previous == current:
+        return
+    if sender is Doctor:
+        summaries = AppointmentSummary.objects.filter(doctor_id=instance.pk)
+        summaries.update(doctor_name=display_name(instance))
+    else:
+        summaries = AppointmentSummary.objects.filter(patient_id=instance.pk)
+        summaries.update(patient_name=display_name(instance))
@@ -0,0 +1,95 @@
+#/bookings/summaries.py
+
+"""
+Mantenimiento de AppointmentSummary a partir de las citas y sus notas.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Max, Value
+from django.db.models.functions import Concat
+
+from .models import Appointment, AppointmentSummary
+
+CHUNK_SIZE = 2000
+
+UPDATE_FIELDS = [
+    'doctor', 'patient', 'appointment_date', 'appointment_time', 'status',
+    'doctor_name', 'patient_name', 'note_count', 'last_note_date',
+]
+
+
+def display_name(person):
+    """
+    Nombre que muestran los paneles para un Doctor o un Patient.
+    """
+    return f'{person.first_name} {person.last_name}'
+
+
+def _aggregate(queryset):
+    return (
+        queryset
+        .values(
+            'id', 'doctor_id', 'patient_id', 'appointment_date', 'appointment_time', 'status'
+        )
+        .order_by()
+        .annotate(
+            doctor_name=Concat('doctor__first_name', Value(' '), 'doctor__last_name'),
+            patient_name=Concat('patient__first_name', Value(' '), 'patient__last_name'),
+            note_count=Count('medical_notes'),
+            last_note_date=Max('medical_notes__date'),
+        )
+    )
+
+
+def _summary(row):
+    return AppointmentSummary(
+        appointment_id=row['id'],
+        doctor_id=row['doctor_id'],
+        patient_id=row['patient_id'],
+        appointment_date=row['appointment_date'],
+        appointment_time=row['appointment_time'],
+        status=row['status'],
+        doctor_name=row['doctor_name'],
+        patient_name=row['patient_name'],
+        note_count=row['note_count'],
+        last_note_date=row['last_note_date'],
+    )
+
+
+def refresh_appointment_summaries(appointment_ids):
+    """
+    Recalcula el resumen de cada cita de `appointment_ids`: lo crea, lo
+    actualiza o lo borra si la cita ya no existe. Unas pocas consultas por
+    lote, no por cita.
+    """
+    appointment_ids = sorted(set(appointment_ids))
+    for start in range(0, len(appointment_ids), CHUNK_SIZE):
+        batch = appointment_ids[start:start + CHUNK_SIZE]
+        rows = list(_aggregate(Appointment.objects.filter(id__in=batch)))
+        with transaction.atomic():
+            AppointmentSummary.objects.bulk_create(
+                [_summary(row) for row in rows],
+                update_conflicts=True,
+                unique_fields=['appointment'],
+                update_fields=UPDATE_FIELDS,
+            )
+            gone = set(batch) - {row['id'] for row in rows}
+            if gone:
+                AppointmentSummary.objects.filter(appointment_id__in=gone).delete()
+
+
+@transaction.atomic
+def rebuild_appointment_summaries():
+    """
+    Reconstruye la tabla completa desde cero. Devuelve cuántos resúmenes hay.
+    """
+    AppointmentSummary.objects.all().delete()
+    batch, total = [], 0
+    for row in _aggregate(Appointment.objects.all()).iterator(chunk_size=CHUNK_SIZE):
+        batch.append(_summary(row))
+        if len(batch) >= CHUNK_SIZE:
+            AppointmentSummary.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    AppointmentSummary.objects.bulk_create(batch)
+    return total + len(batch)
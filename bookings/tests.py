@@ -1,3 +1,950 @@
+import csv
+import datetime
+import importlib
+import io
+import json
+import random
+import threading
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from rest_framework.views import APIView
+
+from doctors.models import Doctor, DoctorAvailability
+from patients.models import Patient
+from bookings.care import refresh_care_relationships
+from bookings.generators import DatasetGenerator, allocate
+from doctorapp.pagination import keyset_filter
+from bookings.models import (
+    Appointment, AppointmentStatus, AppointmentSummary, CareRelationship, MedicalNote
+)
+from bookings.summaries import refresh_appointment_summaries
+
+
+class BookingsTestMixin:
+    """
+    Datos base reutilizados por los tests de bookings.
+    """
+    def create_doctor(self, username="doctor"):
+        user = User.objects.create_user(username=username, password="doctorpass")
+        return Doctor.objects.create(
+            user=user,
+            first_name="Gregory",
+            last_name="House",
+            qualification="MD",
+            contact_number="1234567890",
+            email=f"{username}@example.com",
+            address="Princeton Plainsboro",
+            biography="Diagnostic genius.",
+            is_on_vacation=False
+        )
+
+    def create_patient(self, username="patient"):
+        user = User.objects.create_user(username=username, password="patientpass")
+        return Patient.objects.create(
+            user=user,
+            first_name="John",
+            last_name="Doe",
+            date_of_birth="1990-01-01",
+            contact_number="3000000000",
+            email=f"{username}@example.com",
+            address="Dirección genérica",
+            medical_history="Sin antecedentes"
+        )
+
+    def authenticate(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+
+
+class AppointmentPaginationTestCase(BookingsTestMixin, APITestCase):
+    def setUp(self):
+        doctors = [self.create_doctor(), self.create_doctor("doctor2")]
+        self.patient = self.create_patient()
+
+        # Varias citas (de doctores distintos) comparten fecha y hora para
+        # forzar desempates por id.
+        start = datetime.date(2025, 1, 1)
+        for i in range(23):
+            Appointment.objects.create(
+                patient=self.patient,
+                doctor=doctors[i // 12],
+                appointment_date=start + datetime.timedelta(days=(22 - i) % 4),
+                appointment_time=datetime.time(9 + i % 3, 0),
+                notes=f"Cita {i}",
+                status="scheduled"
+            )
+        self.expected = list(
+            Appointment.objects
+            .order_by('appointment_date', 'appointment_time', 'id')
+            .values_list('id', flat=True)
+        )
+        self.authenticate(self.patient.user)
+
+    def walk(self, url):
+        """
+        Recorre todas las páginas siguiendo `next` y devuelve ids y consultas.
+        """
+        ids, queries = [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            queries.append(len(ctx.captured_queries))
+            url = response.data['next']
+        return ids, queries
+
+    def test_list_is_paginated(self):
+        response = self.client.get('/api/bookings/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'next', 'previous', 'results'})
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(len(response.data['results']), 23)
+
+    def test_cursor_walk_follows_keyset_order(self):
+        ids, _ = self.walk('/api/bookings/?page_size=5')
+        self.assertEqual(ids, self.expected)
+
+    def test_query_count_is_constant_per_page(self):
+        _, queries = self.walk('/api/bookings/?page_size=4')
+        self.assertEqual(len(queries), 6)
+        self.assertEqual(len(set(queries)), 1, queries)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get('/api/bookings/?page_size=5')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in first.data['results']]
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/bookings/?cursor=bm90LWEtY3Vyc29y')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CareRelationshipTestCase(BookingsTestMixin, APITestCase):
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.other_doctor = self.create_doctor("doctor2")
+        self.patient = self.create_patient()
+
+    def book(self, date, doctor=None):
+        return Appointment.objects.create(
+            patient=self.patient,
+            doctor=doctor or self.doctor,
+            appointment_date=date,
+            appointment_time="10:00",
+            notes="Control",
+            status="scheduled"
+        )
+
+    def relationship(self, doctor=None):
+        return CareRelationship.objects.get(doctor=doctor or self.doctor, patient=self.patient)
+
+    def test_maintained_on_create(self):
+        self.book("2025-02-01")
+        self.book("2025-01-01")
+        relationship = self.relationship()
+        self.assertEqual(relationship.appointment_count, 2)
+        self.assertEqual(str(relationship.first_seen), "2025-01-01")
+        self.assertEqual(str(relationship.last_seen), "2025-02-01")
+
+    def test_maintained_on_doctor_change_and_delete(self):
+        appointment = self.book("2025-01-01")
+        appointment.doctor = self.other_doctor
+        appointment.save()
+        self.assertFalse(CareRelationship.objects.filter(doctor=self.doctor).exists())
+        self.assertEqual(self.relationship(self.other_doctor).appointment_count, 1)
+
+        Appointment.objects.get(pk=appointment.pk).delete()
+        self.assertFalse(CareRelationship.objects.exists())
+
+    def test_refresh_after_bulk_create(self):
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient=self.patient, doctor=doctor, appointment_date="2025-01-01",
+                appointment_time="10:00", notes="Importada", status="scheduled"
+            )
+            for doctor in (self.doctor, self.other_doctor)
+        ])
+        self.assertFalse(CareRelationship.objects.exists())
+        # Agregado + upsert, más el SAVEPOINT de la transacción anidada.
+        with self.assertNumQueries(4):
+            refresh_care_relationships([
+                (self.doctor.id, self.patient.id),
+                (self.other_doctor.id, self.patient.id),
+            ])
+        self.assertEqual(CareRelationship.objects.count(), 2)
+
+    def test_rebuild_command(self):
+        self.book("2025-01-01")
+        self.book("2025-01-02", doctor=self.other_doctor)
+        expected = sorted(CareRelationship.objects.values_list(
+            'doctor_id', 'patient_id', 'first_seen', 'last_seen', 'appointment_count'
+        ))
+        CareRelationship.objects.all().delete()
+        call_command('rebuild_care_relationships', stdout=io.StringIO())
+        self.assertEqual(sorted(CareRelationship.objects.values_list(
+            'doctor_id', 'patient_id', 'first_seen', 'last_seen', 'appointment_count'
+        )), expected)
+
+    def test_doctor_scoped_patient_list(self):
+        self.book("2025-01-01")
+        self.book("2025-01-02")
+        self.create_patient("stranger")
+        self.doctor.user.groups.add(Group.objects.create(name="doctor"))
+        self.authenticate(User.objects.get(pk=self.doctor.user_id))
+        response = self.client.get('/api/patients/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], [self.patient.id]
+        )
+
+
+
+class MedicalNotePermissionTestCase(BookingsTestMixin, APITestCase):
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.patient = self.create_patient()
+        appointment = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, appointment_date="2025-01-01",
+            appointment_time="10:00", notes="Control", status="scheduled"
+        )
+        self.note = MedicalNote.objects.create(appointment=appointment, note="Dolor", date="2025-01-01")
+        self.url = f'/api/bookings/notes/{self.note.id}/'
+
+    def test_patient_can_read_but_not_modify(self):
+        self.authenticate(User.objects.get(pk=self.patient.user_id))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        response = self.client.patch(self.url, {"note": "Sin dolor"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.delete(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.note, "Dolor")
+
+    def test_doctor_cannot_write_on_another_doctors_appointment(self):
+        other = self.create_doctor("doctor2")
+        own = Appointment.objects.create(
+            patient=self.patient, doctor=other, appointment_date="2025-01-02",
+            appointment_time="10:00", notes="Control", status="scheduled"
+        )
+        own_note = MedicalNote.objects.create(appointment=own, note="Propia", date="2025-01-02")
+        self.authenticate(User.objects.get(pk=other.user_id))
+
+        response = self.client.post('/api/bookings/notes/', {
+            "appointment": self.note.appointment_id, "note": "Ajena", "date": "2025-01-01"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('appointment', response.data)
+
+        response = self.client.patch(
+            f'/api/bookings/notes/{own_note.id}/',
+            {"appointment": self.note.appointment_id}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        own_note.refresh_from_db()
+        self.assertEqual(own_note.appointment_id, own.id)
+
+    def test_doctor_can_modify(self):
+        self.authenticate(User.objects.get(pk=self.doctor.user_id))
+        response = self.client.patch(self.url, {"note": "Mejoría"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(self.url).status_code, status.HTTP_204_NO_CONTENT)
+
+
+class AppointmentIndexTestCase(BookingsTestMixin, TestCase):
+    """
+    Regresión de planes de ejecución: las consultas calientes sobre citas
+    deben seguir usando sus índices compuestos (SQLite y PostgreSQL).
+    """
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest("EXPLAIN sólo se verifica en SQLite y PostgreSQL.")
+        if connection.vendor == 'postgresql':
+            # Con tablas pequeñas PostgreSQL preferiría un seq scan.
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+        self.doctor = self.create_doctor()
+        self.patient = self.create_patient()
+        for day in range(1, 4):
+            Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor,
+                appointment_date=f"2025-01-0{day}", appointment_time="10:00",
+                notes="Control", status="scheduled"
+            )
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} no aparece en el plan:\n{plan}")
+
+    def test_doctor_slot_lookup(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(
+                doctor=self.doctor, appointment_date="2025-01-01", appointment_time="10:00"
+            ),
+            'appt_doctor_slot_idx'
+        )
+
+    def test_doctor_date_range(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(
+                doctor=self.doctor,
+                appointment_date__range=("2025-01-01", "2025-01-07")
+            ),
+            'appt_doctor_slot_idx'
+        )
+
+    def test_patient_history(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(
+                patient=self.patient, appointment_date__gte="2025-01-01"
+            ),
+            'appt_patient_date_idx'
+        )
+
+    def test_scheduled_partial_indexes(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(
+                status=AppointmentStatus.SCHEDULED,
+                appointment_date__range=("2025-01-01", "2025-01-07")
+            ),
+            'appt_scheduled_idx'
+        )
+        self.assertUsesIndex(
+            Appointment.objects.filter(
+                doctor=self.doctor, status=AppointmentStatus.SCHEDULED,
+                appointment_date__gte="2025-01-01"
+            ),
+            'appt_doctor_scheduled_idx'
+        )
+
+    def test_keyset_page(self):
+        ordering = ('appointment_date', 'appointment_time', 'id')
+        self.assertUsesIndex(
+            Appointment.objects.order_by(*ordering)[:50], 'appt_calendar_idx'
+        )
+        self.assertUsesIndex(
+            Appointment.objects
+            .filter(keyset_filter(ordering, [datetime.date(2025, 1, 2), datetime.time(10), 2]))
+            .order_by(*ordering)[:50],
+            'appt_calendar_idx'
+        )
+
+
+
+class AppointmentSummaryTestCase(BookingsTestMixin, APITestCase):
+    FIELDS = (
+        'appointment_id', 'doctor_id', 'patient_id', 'appointment_date', 'appointment_time',
+        'status', 'doctor_name', 'patient_name', 'note_count', 'last_note_date'
+    )
+
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.patient = self.create_patient()
+        self.today = datetime.date.today()
+
+    def book(self, days=0, time="10:00", doctor=None):
+        return Appointment.objects.create(
+            patient=self.patient,
+            doctor=doctor or self.doctor,
+            appointment_date=self.today + datetime.timedelta(days=days),
+            appointment_time=time,
+            notes="Control",
+            status="scheduled"
+        )
+
+    def summaries(self):
+        return sorted(AppointmentSummary.objects.values_list(*self.FIELDS))
+
+    def test_maintained_incrementally(self):
+        appointment = self.book()
+        summary = appointment.summary
+        self.assertEqual(
+            (summary.doctor_name, summary.patient_name, summary.status, summary.note_count),
+            ("Gregory House", "John Doe", "scheduled", 0)
+        )
+
+        note = MedicalNote.objects.create(appointment=appointment, note="Dolor", date="2025-03-01")
+        MedicalNote.objects.create(appointment=appointment, note="Control", date="2025-03-08")
+        appointment.status = "completed"
+        appointment.save()
+        summary.refresh_from_db()
+        self.assertEqual((summary.note_count, str(summary.last_note_date)), (2, "2025-03-08"))
+        self.assertEqual(summary.status, "completed")
+
+        # La nota cambia de cita: se recalculan las dos.
+        other = self.book(days=1)
+        note.appointment = other
+        note.save()
+        self.assertEqual(AppointmentSummary.objects.get(pk=other.pk).note_count, 1)
+        MedicalNote.objects.filter(appointment=appointment).delete()
+        summary.refresh_from_db()
+        self.assertEqual((summary.note_count, summary.last_note_date), (0, None))
+
+        self.doctor.last_name = "Wilson"
+        self.doctor.save()
+        self.assertEqual(
+            set(AppointmentSummary.objects.values_list('doctor_name', flat=True)),
+            {"Gregory Wilson"}
+        )
+
+        other.delete()
+        self.assertEqual(list(AppointmentSummary.objects.values_list('pk', flat=True)), [appointment.pk])
+
+    def test_rebuild_matches_incremental(self):
+        for days in range(3):
+            appointment = self.book(days=days)
+            MedicalNote.objects.create(appointment=appointment, note="Nota", date=appointment.appointment_date)
+        expected = self.summaries()
+        AppointmentSummary.objects.all().delete()
+        call_command('rebuild_appointment_summaries', stdout=io.StringIO())
+        self.assertEqual(self.summaries(), expected)
+
+    def test_refresh_after_bulk_create(self):
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient=self.patient, doctor=self.doctor, appointment_date=self.today,
+                appointment_time=f"{hour}:00", notes="Importada", status="scheduled"
+            )
+            for hour in (9, 10)
+        ])
+        self.assertFalse(AppointmentSummary.objects.exists())
+        ids = list(Appointment.objects.values_list('pk', flat=True))
+        # Agregado + upsert, más el SAVEPOINT de la transacción anidada.
+        with self.assertNumQueries(4):
+            refresh_appointment_summaries(ids)
+        self.assertEqual(AppointmentSummary.objects.count(), 2)
+
+    def test_dashboard_is_scoped_and_filtered(self):
+        other_doctor = self.create_doctor("doctor2")
+        mine = [self.book(days=1), self.book(days=3)]
+        self.book(days=2, doctor=other_doctor)
+        self.book(days=-1)
+        self.authenticate(User.objects.get(pk=self.doctor.user_id))
+
+        # El perfil del doctor (alcance) y la página: sin JOINs ni agregados.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/bookings/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['appointment'] for item in response.data['results']], [a.id for a in mine])
+        self.assertEqual(response.data['results'][0]['patient_name'], "John Doe")
+
+        date_to = (self.today + datetime.timedelta(days=2)).isoformat()
+        response = self.client.get(f'/api/bookings/dashboard/?date_to={date_to}')
+        self.assertEqual([item['appointment'] for item in response.data['results']], [mine[0].id])
+        response = self.client.get('/api/bookings/dashboard/?date_from=2000-01-01&page_size=1')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+        response = self.client.get(f'/api/bookings/dashboard/?date_from={date_to}&date_to=2000-01-01')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_dashboard_uses_index_without_sorting(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("El plan sólo se verifica en SQLite.")
+        self.book()
+        self.authenticate(User.objects.get(pk=self.doctor.user_id))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/bookings/dashboard/?status=scheduled')
+        [sql] = [q['sql'] for q in ctx.captured_queries if 'bookings_appointmentsummary' in q['sql']]
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('summary_doctor_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotIn('JOIN', sql)
+
+
+
+class AppointmentCalendarTestCase(BookingsTestMixin, APITestCase):
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.other_doctor = self.create_doctor("doctor2")
+        self.patient = self.create_patient()
+        self.monday = datetime.date(2025, 3, 3)
+        for days, time, doctor, state in (
+            (0, "09:00", self.doctor, "scheduled"),
+            (0, "08:30", self.doctor, "canceled"),
+            (2, "10:00", self.doctor, "scheduled"),
+            (2, "10:00", self.other_doctor, "scheduled"),
+            (7, "09:00", self.doctor, "scheduled"),
+        ):
+            Appointment.objects.create(
+                patient=self.patient, doctor=doctor,
+                appointment_date=self.monday + datetime.timedelta(days=days),
+                appointment_time=time, notes="Control", status=state
+            )
+        self.authenticate(User.objects.create_user(username="staff", is_staff=True))
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [item['id'] for item in response.data['results']]
+
+    def test_list_filters(self):
+        week = f'date_from={self.monday}&date_to={self.monday + datetime.timedelta(days=6)}'
+        self.assertEqual(len(self.ids(f'/api/bookings/?{week}')), 4)
+        self.assertEqual(len(self.ids(f'/api/bookings/?{week}&doctor={self.doctor.id}')), 3)
+        self.assertEqual(
+            len(self.ids(f'/api/bookings/?{week}&doctor={self.doctor.id}&status=scheduled')), 2
+        )
+        response = self.client.get('/api/bookings/?date_from=2025-03-10&date_to=2025-03-03')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_calendar_week(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f'/api/bookings/calendar/?doctor={self.doctor.id}&date_from={self.monday}'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        days = response.data['days']
+        self.assertEqual([day['date'] for day in days], [
+            self.monday + datetime.timedelta(days=offset) for offset in range(7)
+        ])
+        self.assertEqual(
+            [[slot[0], slot[-1]] for slot in days[0]['slots']],
+            [["08:30", "canceled"], ["09:00", "scheduled"]]
+        )
+        self.assertEqual(days[2]['slots'][0][2:4], [self.doctor.id, self.patient.id])
+        self.assertEqual(days[1]['slots'], [])
+
+        response = self.client.get('/api/bookings/calendar/?date_from=2025-01-01&date_to=2025-03-01')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_calendar_is_scoped(self):
+        self.authenticate(User.objects.get(pk=self.other_doctor.user_id))
+        response = self.client.get(f'/api/bookings/calendar/?date_to={self.monday + datetime.timedelta(days=6)}')
+        slots = [slot for day in response.data['days'] for slot in day['slots']]
+        self.assertEqual([slot[2] for slot in slots], [self.other_doctor.id])
+
+    def test_calendar_uses_index_without_sorting(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("El plan sólo se verifica en SQLite.")
+        for params, index in (
+            (f'doctor={self.doctor.id}', 'appt_doctor_slot_idx'),
+            (f'doctor={self.doctor.id}&status=scheduled', 'appt_doctor_scheduled_idx'),
+            ('', 'appt_calendar_idx'),
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(f'/api/bookings/calendar/?date_from={self.monday}&{params}')
+            [sql] = [q['sql'] for q in ctx.captured_queries if 'bookings_appointment' in q['sql']]
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            self.assertIn(index, plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+
+class AppointmentStatusTestCase(BookingsTestMixin, APITestCase):
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.patient = self.create_patient()
+
+    def book(self, state, time="10:00"):
+        return Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, appointment_date="2025-01-01",
+            appointment_time=time, notes="Control", status=state
+        )
+
+    def test_database_rejects_unknown_status(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.book("Scheduled")
+
+    def test_api_rejects_unknown_status(self):
+        self.authenticate(User.objects.create_user(username="staff", is_staff=True))
+        response = self.client.get('/api/bookings/?status=done')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/bookings/bulk/', [{
+            "patient": self.patient.id, "doctor": self.doctor.id, "appointment_date": "2025-01-01",
+            "appointment_time": "10:00", "notes": "Control", "status": "done"
+        }], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('status', response.data['errors'][0]['errors'])
+
+    def test_migration_normalizes_free_text(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Los estados inválidos se insertan saltando el CHECK de SQLite.")
+        migration = importlib.import_module('bookings.migrations.0005_appointment_status')
+        legacy = {"Cancelled ": "canceled", "COMPLETED": "completed", "en espera": "pending"}
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA ignore_check_constraints = ON")
+            try:
+                for hour, state in enumerate(legacy, start=9):
+                    appointment = self.book(AppointmentStatus.SCHEDULED, f"{hour}:00")
+                    cursor.execute(
+                        "UPDATE bookings_appointment SET status = %s WHERE id = %s",
+                        [state, appointment.id]
+                    )
+            finally:
+                cursor.execute("PRAGMA ignore_check_constraints = OFF")
+        migration.normalize_statuses(apps, None)
+        self.assertEqual(
+            list(Appointment.objects.order_by('appointment_time').values_list('status', flat=True)),
+            list(legacy.values())
+        )
+
+
+class DoubleBookingTestCase(BookingsTestMixin, APITestCase):
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.patient = self.create_patient()
+        DoctorAvailability.objects.create(
+            doctor=self.doctor, start_date="2025-01-01", end_date="2025-01-31",
+            start_time="09:00", end_time="17:00"
+        )
+        self.authenticate(self.patient.user)
+
+    def post(self, time="10:00", date="2025-01-05"):
+        return self.client.post('/api/bookings/', {
+            "patient": self.patient.id,
+            "doctor": self.doctor.id,
+            "appointment_date": date,
+            "appointment_time": time,
+            "notes": "Consulta",
+            "status": "scheduled"
+        })
+
+    def test_slot_cannot_be_booked_twice(self):
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post().status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_overlapping_slot_conflicts(self):
+        # Citas de 30 minutos: 10:15 y 09:45 pisan la de las 10:00.
+        self.assertEqual(self.post("10:00").status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post("10:15").status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.post("09:45").status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.post("10:30").status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post("09:30").status_code, status.HTTP_201_CREATED)
+
+    def test_outside_availability_rejected(self):
+        self.assertEqual(self.post("08:30").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post("16:45").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post("10:00", "2025-02-03").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post("16:30").status_code, status.HTTP_201_CREATED)
+
+    def test_move_into_taken_slot_conflicts(self):
+        self.post("10:00")
+        moved = self.post("11:00").data['id']
+        url = f'/api/bookings/{moved}/'
+        response = self.client.patch(url, {"appointment_time": "10:15"})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        # Cambiar sólo las notas no vuelve a comprobar la agenda.
+        response = self.client.patch(url, {"notes": "Traer exámenes"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_canceled_slot_can_be_rebooked(self):
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        Appointment.objects.update(status="canceled")
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+
+    def test_migration_cancels_existing_double_bookings(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Las citas duplicadas se insertan quitando el índice único en SQLite.")
+        migration = importlib.import_module('bookings.migrations.0003_appointment_indexes')
+        with connection.cursor() as cursor:
+            # Datos previos a la restricción; el rollback del test la restaura.
+            cursor.execute('DROP INDEX "unique_active_doctor_slot"')
+        clashing = [
+            Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor, appointment_date="2025-01-05",
+                appointment_time="10:00", notes="Duplicada", status=state
+            ).id
+            for state in ("scheduled", "completed", "canceled", "scheduled")
+        ]
+        migration.cancel_double_bookings(apps, None)
+        self.assertEqual(
+            list(Appointment.objects.order_by('id').values_list('id', 'status')),
+            [(clashing[0], "scheduled")] + [(pk, "canceled") for pk in clashing[1:]]
+        )
+
+
+class AppointmentBulkTestCase(BookingsTestMixin, APITestCase):
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.patient = self.create_patient()
+        self.create_availability(self.doctor)
+        self.admin = User.objects.create_user(username="admin", is_staff=True)
+        self.authenticate(self.admin)
+
+    def create_availability(self, doctor):
+        DoctorAvailability.objects.create(
+            doctor=doctor, start_date="2025-03-01", end_date="2025-03-31",
+            start_time="09:00", end_time="17:00"
+        )
+
+    def item(self, day, time="10:00", **extra):
+        return {
+            "patient": self.patient.id,
+            "doctor": self.doctor.id,
+            "appointment_date": f"2025-03-{day:02d}",
+            "appointment_time": time,
+            "notes": "Importada",
+            "status": "scheduled",
+            **extra
+        }
+
+    def bulk(self, method, data):
+        return getattr(self.client, method)('/api/bookings/bulk/', data, format='json')
+
+    def test_create_batch_in_constant_queries(self):
+        items = [self.item(day, f"{hour:02d}:00") for day in range(1, 29) for hour in (9, 10, 11)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk('post', items)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['count'], 84)
+        self.assertEqual(Appointment.objects.count(), 84)
+        self.assertEqual(self.relationship().appointment_count, 84)
+
+        # Mismo número de consultas con un lote diez veces más pequeño.
+        Appointment.objects.all().delete()
+        with CaptureQueriesContext(connection) as small:
+            self.bulk('post', items[:8])
+        self.assertEqual(len(small), len(ctx))
+
+    def relationship(self):
+        return CareRelationship.objects.get(doctor=self.doctor, patient=self.patient)
+
+    def test_errors_are_reported_per_item_and_nothing_is_written(self):
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, appointment_date="2025-03-01",
+            appointment_time="10:00", notes="Existente", status="scheduled"
+        )
+        response = self.bulk('post', [
+            self.item(2),
+            self.item(1),                         # choca con la base de datos
+            self.item(2),                         # choca con el elemento 0
+            self.item(3, doctor=999),             # doctor inexistente
+            self.item(4, appointment_date="x"),   # fecha inválida
+            self.item(1, status="canceled"),      # cancelada: no ocupa hueco
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2, 3, 4])
+        self.assertIn('doctor', response.data['errors'][2]['errors'])
+        self.assertIn('appointment_date', response.data['errors'][3]['errors'])
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_overlaps_and_availability_are_checked(self):
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, appointment_date="2025-03-01",
+            appointment_time="10:00", notes="Existente", status="scheduled"
+        )
+        response = self.bulk('post', [
+            self.item(2, "09:00"),
+            self.item(2, "09:15"),                # se solapa con el elemento 0
+            self.item(1, "10:15"),                # se solapa con la base de datos
+            self.item(1, "16:45"),                # termina fuera de la ventana
+            self.item(1, "23:50"),                # pasaría de medianoche
+            self.item(1, "10:00", appointment_date="2025-04-01"),  # sin disponibilidad
+            self.item(2, "09:30"),
+            self.item(1, "10:15", status="canceled"),
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2, 3, 4, 5])
+        self.assertIn("elemento 0", str(response.data['errors'][0]['errors']))
+        self.assertEqual(Appointment.objects.count(), 1)
+
+        response = self.bulk('post', [self.item(2, "09:00"), self.item(2, "09:30")])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        # Mover una cita encima de otra tampoco vale en PATCH.
+        response = self.bulk('patch', [{"id": response.data['ids'][1], "appointment_time": "09:20"}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_and_delete(self):
+        ids = self.bulk('post', [self.item(1), self.item(2)]).data['ids']
+        other = self.create_doctor("doctor2")
+        self.create_availability(other)
+
+        response = self.bulk('patch', [
+            {"id": ids[0], "doctor": other.id},
+            {"id": ids[1], "status": "completed"},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(Appointment.objects.get(pk=ids[0]).doctor_id, other.id)
+        self.assertEqual(Appointment.objects.get(pk=ids[1]).status, "completed")
+        self.assertEqual(self.relationship().appointment_count, 1)
+        self.assertTrue(CareRelationship.objects.filter(doctor=other).exists())
+
+        response = self.bulk('patch', [{"id": ids[1], "doctor": other.id, "appointment_date": "2025-03-01"}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.bulk('delete', ids + [12345])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['index'], 2)
+
+        response = self.bulk('delete', ids)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Appointment.objects.exists())
+        self.assertFalse(CareRelationship.objects.exists())
+
+    def test_admin_only(self):
+        self.authenticate(self.patient.user)
+        self.assertEqual(self.bulk('post', [self.item(1)]).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DatasetGeneratorTestCase(TestCase):
+    def appointments(self, seed):
+        generator = DatasetGenerator(seed=seed, start_date=datetime.date(2025, 1, 1), days=28)
+        return [
+            (a.doctor_id, a.patient_id, a.appointment_date, a.appointment_time, a.status)
+            for a in generator.iter_appointments([1, 2, 3], list(range(10, 60)), 600)
+        ]
+
+    def test_appointments_are_reproducible_and_never_overlap(self):
+        appointments = self.appointments(seed=7)
+        self.assertEqual(appointments, self.appointments(seed=7))
+        self.assertNotEqual(appointments, self.appointments(seed=8))
+        self.assertEqual(len(appointments), 600)
+        slots = {(doctor, date, time) for doctor, _, date, time, _ in appointments}
+        self.assertEqual(len(slots), 600)
+        # Los domingos no se atiende.
+        self.assertFalse([a for a in appointments if a[2].weekday() == 6])
+
+    def test_allocate_respects_capacity(self):
+        counts = allocate(100, [10, 1, 1], capacity=40)
+        self.assertEqual(sum(counts), 100)
+        self.assertEqual(counts[0], 40)
+        self.assertEqual(allocate(500, [1, 1], capacity=40), [40, 40])
+
+    def test_populate_db_generates_dataset(self):
+        call_command(
+            'populate_db', doctors=3, patients=20, appointments=150, seed=1,
+            stdout=io.StringIO()
+        )
+        self.assertEqual(Doctor.objects.count(), 3)
+        self.assertEqual(Patient.objects.count(), 20)
+        self.assertEqual(Appointment.objects.count(), 150)
+        self.assertEqual(User.objects.filter(groups__name="patient").count(), 20)
+        self.assertEqual(
+            sum(CareRelationship.objects.values_list('appointment_count', flat=True)), 150
+        )
+
+    def test_populate_db_sample_can_be_rerun(self):
+        # El paciente de cada cita es aleatorio; repetir no debe chocar con
+        # los huecos ya ocupados.
+        for _ in range(3):
+            call_command('populate_db', stdout=io.StringIO())
+        self.assertEqual(
+            Appointment.objects.values('doctor', 'appointment_date', 'appointment_time')
+            .distinct().count(),
+            Appointment.objects.count()
+        )
+
+
+class AppointmentExportTestCase(BookingsTestMixin, APITestCase):
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.patient = self.create_patient()
+        self.other = self.create_patient("other")
+        for day, patient in enumerate([self.patient, self.other, self.patient], start=1):
+            Appointment.objects.create(
+                patient=patient, doctor=self.doctor, appointment_date=f"2025-01-0{day}",
+                appointment_time="10:00", notes="Control, anual", status="scheduled"
+            )
+
+    def export(self, user, output=None):
+        self.authenticate(user)
+        url = '/api/bookings/export/' + (f'?output={output}' if output else '')
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_is_streamed_in_keyset_order(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        response, body = self.export(admin)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['appointment_date'] for row in rows],
+                         ["2025-01-01", "2025-01-02", "2025-01-03"])
+        self.assertEqual(rows[0]['appointment_time'], "10:00:00")
+        self.assertEqual(rows[0]['patient_id'], self.patient.id)
+
+    def test_csv_respects_role_scoping(self):
+        response, body = self.export(self.patient.user, 'csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('appointments.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][:3], ['id', 'patient_id', 'doctor_id'])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[1] for row in rows[1:]}, {str(self.patient.id)})
+        self.assertEqual(rows[1][-1], "Control, anual")
+
+    def test_unknown_output(self):
+        self.authenticate(self.patient.user)
+        response = self.client.get('/api/bookings/export/?output=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConcurrentBookingTestCase(BookingsTestMixin, APITransactionTestCase):
+    """
+    Muchas reservas simultáneas sobre la misma agenda: ninguna pareja de
+    citas activas puede quedar solapada.
+    """
+    THREADS = 16
+    REQUESTS_PER_THREAD = 15
+
+    def setUp(self):
+        self.doctor = self.create_doctor()
+        self.staff = User.objects.create_user(username="staff", is_staff=True)
+        DoctorAvailability.objects.create(
+            doctor=self.doctor, start_date="2025-01-06", end_date="2025-01-06",
+            start_time="09:00", end_time="12:00"
+        )
+        self.patients = [self.create_patient(f"patient{i}") for i in range(self.THREADS)]
+
+    def book(self, worker, barrier, results):
+        client = APIClient()
+        client.force_authenticate(user=self.staff)
+        rng = random.Random(worker)
+        barrier.wait()
+        try:
+            for _ in range(self.REQUESTS_PER_THREAD):
+                # Horas cada 15 minutos: la mitad de los intentos se solapan.
+                minute = rng.randrange(0, 165, 15)
+                response = client.post('/api/bookings/', {
+                    "patient": self.patients[worker].id,
+                    "doctor": self.doctor.id,
+                    "appointment_date": "2025-01-06",
+                    "appointment_time": f"{9 + minute // 60:02d}:{minute % 60:02d}",
+                    "notes": "Carga",
+                    "status": "scheduled"
+                })
+                results.append(response.status_code)
+        finally:
+            connection.close()
+
+    def test_no_double_booking_under_concurrency(self):
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        with mock.patch.object(APIView, 'get_throttles', return_value=[]):
+            threads = [
+                threading.Thread(target=self.book, args=(i, barrier, results))
+                for i in range(self.THREADS)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
 
-# Create your tests here.
+        self.assertEqual(len(results), self.THREADS * self.REQUESTS_PER_THREAD)
+        self.assertEqual(set(results) - {201, 409}, set())
+        booked = sorted(
+            Appointment.objects.exclude(status="canceled").values_list('appointment_time', flat=True)
+        )
+        self.assertEqual(results.count(201), len(booked))
+        minutes = [t.hour * 60 + t.minute for t in booked]
+        for earlier, later in zip(minutes, minutes[1:]):
+            self.assertGreaterEqual(later - earlier, 30)
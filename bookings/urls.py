@@ -2,7 +2,7 @@
 
 from rest_framework.routers import DefaultRouter
 
-from .views import AppointmentViewSet, MedicalNoteViewSet
+from .views import AppointmentSummaryViewSet, AppointmentViewSet, MedicalNoteViewSet
 
 router = DefaultRouter()
 
@@ -15,6 +15,12 @@ router = DefaultRouter()
 router.register(r'notes', MedicalNoteViewSet, basename='appointmentnote')
 
 
+# Panel de citas (resúmenes desnormalizados, sólo lectura):
+#   GET    /api/bookings/dashboard/
+#   GET    /api/bookings/dashboard/{appointment_id}/
+router.register(r'dashboard', AppointmentSummaryViewSet, basename='appointmentsummary')
+
+
 # Raíz:  GET /api/bookings/          → lista y crea citas
 #         GET /api/bookings/{pk}/    → detalle, update, destroy
 router.register(r'', AppointmentViewSet, basename='appointment')
@@ -1,16 +1,37 @@
 #/booking/views.py
 
+import datetime
+
+from django_filters.utils import translate_validation
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Appointment, MedicalNote
-from .serializers import AppointmentSerializer, MedicalNoteSerializer
-from .permissions import IsBookingOrReadOnly, IsBookingOwnerOrAdmin
+from doctorapp.bulk import BulkModelMixin
+from doctorapp.exports import ExportMixin
+from doctorapp.instrumentation import InstrumentedViewMixin
+from doctorapp.lean import LeanReadMixin
+from doctorapp.permissions import IsAdminUser
+
+from .care import deferred_care_refresh, refresh_care_relationships
+from .filters import AppointmentFilter, CalendarFilter
+from .models import Appointment, AppointmentSummary, MedicalNote
+from .serializers import (
+    AppointmentSerializer, AppointmentBulkSerializer, AppointmentSummarySerializer,
+    DashboardQuerySerializer, MedicalNoteSerializer
+)
+from .permissions import IsBookingOrReadOnly, IsBookingOwnerOrAdmin, IsNoteDoctorOrAdmin
+from .services import (
+    book_appointment, doctor_schedule_locks, scope_appointments, slot_conflicts
+)
+from .summaries import refresh_appointment_summaries
 
 
 # 📅 ViewSet para gestionar citas médicas
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(
+    InstrumentedViewMixin, LeanReadMixin, ExportMixin, BulkModelMixin, viewsets.ModelViewSet
+):
     """
     API para gestionar citas médicas.
 
@@ -18,14 +39,42 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         Sólo lectura para usuarios autenticados (IsBookingOrReadOnly).
     - create:
         El paciente propietario o un admin pueden agendar una cita (IsBookingOwnerOrAdmin).
+        La cita debe caber en la disponibilidad del doctor (400) y no solaparse
+        con otra activa suya (409); ver `book_appointment`.
     - update, partial_update, destroy:
         El paciente o el doctor asignado, o un admin pueden modificar o cancelar la cita (IsBookingOwnerOrAdmin).
+        Mover la cita aplica las mismas comprobaciones que crearla.
     - medical_notes (GET @ /appointments/{pk}/medical-notes):
         El paciente o doctor propietario, o un admin pueden consultar las notas asociadas (IsBookingOwnerOrAdmin).
+    - bulk (POST/PATCH/DELETE @ /appointments/bulk/):
+        Importación masiva de citas en una transacción, sólo admin (ver doctorapp.bulk).
+    - export (GET @ /appointments/export/?output=ndjson|csv):
+        Exportación completa en streaming de las citas que el usuario puede ver
+        (todas para admin, las propias para doctor o paciente).
+    - calendar (GET @ /appointments/calendar/?doctor=&date_from=&date_to=&status=):
+        Semana de calendario compacta de las citas que el usuario puede ver:
+        un elemento por día con sus citas como arrays (ver CalendarFilter).
+
+    list y export aceptan `date_from`, `date_to`, `doctor` y `status`
+    (ver bookings/filters.py).
     """
-    queryset = Appointment.objects.all()
+    # `medical_notes` muestra el doctor y el paciente de la cita.
+    queryset = Appointment.objects.select_related('patient', 'doctor')
     serializer_class = AppointmentSerializer
+    bulk_serializer_class = AppointmentBulkSerializer
     permission_classes = [IsBookingOrReadOnly]
+    # Tasas `bookings` y `bookings.write` (ver doctorapp/throttling.py).
+    throttle_scope = 'bookings'
+    filterset_class = AppointmentFilter
+    # Orden del cursor de paginación (keyset); `id` desempata.
+    ordering = ('appointment_date', 'appointment_time', 'id')
+    # Columnas de cada cita en `calendar`.
+    calendar_fields = ('time', 'id', 'doctor', 'patient', 'status')
+    export_fields = (
+        'id', 'patient_id', 'doctor_id', 'appointment_date', 'appointment_time',
+        'status', 'notes'
+    )
+    export_filename = 'appointments'
 
     def get_permissions(self):
         protected = [
@@ -35,8 +84,76 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         ]
         if self.action in protected:
             return [IsBookingOwnerOrAdmin()]
+        if self.action == 'bulk':
+            return [IsAuthenticated(), IsAdminUser()]
         return super().get_permissions()
 
+    def perform_create(self, serializer):
+        book_appointment(serializer)
+
+    def perform_update(self, serializer):
+        book_appointment(serializer)
+
+    def get_export_queryset(self):
+        return scope_appointments(super().get_export_queryset(), self.request.user)
+
+    def bulk_lock(self, objects):
+        return doctor_schedule_locks(a.doctor_id for a in objects.values())
+
+    def validate_bulk(self, objects):
+        return slot_conflicts(objects)
+
+    # bulk_create/bulk_update no emiten señales: CareRelationship y
+    # AppointmentSummary se recalculan aquí, una vez por lote.
+    def perform_bulk_create(self, objs):
+        super().perform_bulk_create(objs)
+        refresh_care_relationships({(a.doctor_id, a.patient_id) for a in objs})
+        refresh_appointment_summaries(a.pk for a in objs)
+
+    def perform_bulk_update(self, objs, fields):
+        super().perform_bulk_update(objs, fields)
+        pairs = {(a.doctor_id, a.patient_id) for a in objs}
+        pairs.update(a._care_pair for a in objs)
+        refresh_care_relationships(pairs)
+        refresh_appointment_summaries(a.pk for a in objs)
+
+    def perform_bulk_destroy(self, objs):
+        # delete() sí emite una señal por cita; se agrupan en un recálculo.
+        with deferred_care_refresh():
+            super().perform_bulk_destroy(objs)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Citas de una ventana (una semana por defecto) agrupadas por día. Una
+        única consulta indexada que sólo lee las columnas del calendario:
+
+            {"date_from": ..., "date_to": ..., "fields": [...],
+             "days": [{"date": "2025-01-06", "slots": [["09:00", 7, 1, 42, "scheduled"], ...]}, ...]}
+        """
+        queryset = scope_appointments(self.get_queryset(), request.user)
+        filterset = CalendarFilter(request.query_params, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        rows = filterset.qs.order_by(*self.ordering).values_list(
+            'appointment_date', 'appointment_time', 'id', 'doctor_id', 'patient_id', 'status'
+        )
+        date_from, date_to = filterset.window
+
+        slots = {}
+        for day, time, *rest in rows:
+            slots.setdefault(day, []).append([time.isoformat('minutes'), *rest])
+        days = []
+        for offset in range((date_to - date_from).days + 1):
+            day = date_from + datetime.timedelta(days=offset)
+            days.append({"date": day, "slots": slots.get(day, [])})
+        return Response({
+            "date_from": date_from,
+            "date_to":   date_to,
+            "fields":    self.calendar_fields,
+            "days":      days,
+        })
+
     @action(detail=True, methods=['get'], url_path='medical-notes')
     def medical_notes(self, request, pk=None):
         """
@@ -58,21 +175,58 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         })
 
 
+# 📋 Panel de citas de doctores y pacientes
+class AppointmentSummaryViewSet(InstrumentedViewMixin, LeanReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Panel de citas a partir de AppointmentSummary (ver bookings/summaries.py).
+
+    - list (GET /api/bookings/dashboard/?date_from=&date_to=&status=):
+        Citas desde `date_from` (hoy por defecto) con nombres de doctor y
+        paciente, estado y número de notas. Un doctor o un paciente ven las
+        suyas; staff, todas. Un único recorrido de índice por página, sin
+        JOINs ni agregados.
+    - retrieve (GET /api/bookings/dashboard/{appointment_id}/):
+        Resumen de una cita, con el mismo alcance.
+    """
+    queryset = AppointmentSummary.objects.all()
+    serializer_class = AppointmentSummarySerializer
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bookings'
+    # Orden del cursor: `pk` es el id de la cita.
+    ordering = ('appointment_date', 'appointment_time', 'pk')
+
+    def get_queryset(self):
+        queryset = scope_appointments(super().get_queryset(), self.request.user)
+        if self.action != 'list':
+            return queryset
+        params = DashboardQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        queryset = queryset.filter(appointment_date__gte=query['date_from'])
+        if query.get('date_to'):
+            queryset = queryset.filter(appointment_date__lte=query['date_to'])
+        if query.get('status'):
+            queryset = queryset.filter(status=query['status'])
+        return queryset
+
+
 # 📝 ViewSet para gestionar notas médicas asociadas a citas
-class MedicalNoteViewSet(viewsets.ModelViewSet):
+class MedicalNoteViewSet(InstrumentedViewMixin, LeanReadMixin, viewsets.ModelViewSet):
     """
     API para gestionar notas médicas de citas.
 
     - list, retrieve:
         Sólo lectura para usuarios autenticados (IsBookingOrReadOnly).
     - create, update, partial_update, destroy:
-        Sólo el doctor autor de la nota o un admin pueden operar (IsBookingOwnerOrAdmin).
+        Sólo el doctor de la cita o un admin pueden operar (IsNoteDoctorOrAdmin);
+        el paciente sólo lee.
     """
-    queryset = MedicalNote.objects.all()
+    # Los permisos por objeto se resuelven contra la cita de la nota.
+    queryset = MedicalNote.objects.select_related('appointment')
     serializer_class = MedicalNoteSerializer
     permission_classes = [IsBookingOrReadOnly]
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
-            return [IsBookingOwnerOrAdmin()]
+            return [IsNoteDoctorOrAdmin()]
         return super().get_permissions()
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Detector de N+1: fixture `querywatch` y opción `--querywatch=report|fail`.
+pytest_plugins = ['doctorapp.pytest_querywatch']
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Roles cacheados y contadores de throttling viven en la caché local del
+    proceso; se vacía entre tests para que no se filtren de uno a otro.
+    """
+    cache.clear()
+    yield
+
+
+@pytest.fixture
+def query_budget(db):
+    """
+    Context manager que falla si el bloque ejecuta más de `max_queries`
+    consultas; el mensaje incluye el SQL capturado. Devuelve el contexto
+    para poder comparar conteos entre ejecuciones:
+
+        with query_budget(5) as ctx:
+            client.get('/api/doctors/')
+        assert len(ctx) == ...
+    """
+    @contextmanager
+    def budget(max_queries):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        executed = len(ctx)
+        if executed > max_queries:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(ctx.captured_queries, 1)
+            )
+            pytest.fail(
+                f'{executed} consultas ejecutadas, presupuesto {max_queries}:\n{queries}',
+                pytrace=False
+            )
+    return budget
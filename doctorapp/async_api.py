@@ -0,0 +1,111 @@
+#/doctorapp/async_api.py
+
+"""
+Soporte para endpoints de lectura asíncronos (`/api/async/...`).
+
+DRF no ejecuta vistas `async def`; bajo ASGI cada petición a un ViewSet ocupa
+un hilo mientras espera a la base de datos. Estas vistas son funciones
+asíncronas de Django que usan el ORM asíncrono y reproducen lo que el API
+síncrono hace alrededor de la vista, para que las respuestas sean las mismas:
+
+- autenticación por sesión (`request.auser()`) o por token firmado,
+- throttling con las clases y tasas de `REST_FRAMEWORK`,
+- paginación por cursor de `KeysetCursorPagination`,
+- errores `{"detail": ...}` con los códigos de estado de DRF,
+- JSON con `FastJSONRenderer`.
+"""
+
+import functools
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import SignedTokenAuthentication
+from .pagination import KeysetCursorPagination
+from .renderers import FastJSONRenderer
+
+
+def render(data, status=200):
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status, content_type='application/json'
+    )
+
+
+def check_throttles(request, view=None):
+    """
+    Aplica los throttles por defecto. Sólo usan la caché (no el ORM), así
+    que pueden llamarse desde código asíncrono.
+    """
+    for throttle in (cls() for cls in api_settings.DEFAULT_THROTTLE_CLASSES):
+        if not throttle.allow_request(request, view):
+            raise exceptions.Throttled(throttle.wait())
+
+
+async def authenticate(request):
+    """
+    Usuario de la petición: el del token si trae `Authorization`, si no el
+    de la sesión. Con la identidad del token en caché no hay consultas, pero
+    si falta se carga con el ORM síncrono.
+    """
+    if get_authorization_header(request):
+        result = await sync_to_async(SignedTokenAuthentication().authenticate)(request)
+        if result is not None:
+            return result[0]
+    return await request.auser()
+
+
+def async_api_view(view=None, *, throttle_scope=None):
+    """
+    Decorador para vistas `async def view(request, ...)` de sólo lectura.
+    `@async_api_view(throttle_scope='directory')` aplica además la tasa de
+    ese scope, como `throttle_scope` en un ViewSet.
+    """
+    if view is None:
+        return functools.partial(async_api_view, throttle_scope=throttle_scope)
+    throttle_view = SimpleNamespace(throttle_scope=throttle_scope)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            response = render(
+                {"detail": exceptions.MethodNotAllowed(request.method).detail}, status=405
+            )
+            response['Allow'] = 'GET'
+            return response
+        try:
+            request.user = await authenticate(request)
+            check_throttles(request, throttle_view)
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            status = exc.status_code
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                # Como DRF con SessionAuthentication: sin WWW-Authenticate es 403.
+                status = 403
+            response = render(
+                exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail},
+                status=status
+            )
+            if isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+                response['Retry-After'] = str(int(exc.wait))
+            return response
+    return wrapper
+
+
+async def paginate(request, queryset, serializer_class, ordering=None):
+    """
+    Página de `queryset` con el mismo cursor y formato que los listados
+    síncronos. `serializer_class` debe ser un `lean_serializer`: las filas
+    se leen con `.values()` y `async for`.
+    """
+    paginator = KeysetCursorPagination()
+    view = type('AsyncView', (), {'ordering': ordering})
+    page = paginator.get_page_queryset(
+        queryset.values(*serializer_class.value_keys()), Request(request), view
+    )
+    rows = paginator.set_page([row async for row in page])
+    return paginator.get_paginated_response(serializer_class(rows, many=True).data).data
@@ -0,0 +1,156 @@
+#/doctorapp/authentication.py
+
+"""
+Autenticación por token firmado para clientes máquina (integraciones,
+scripts, otros servicios).
+
+El token es `signing.dumps` del id del usuario y una huella de su
+contraseña, firmado con `SECRET_KEY`: no se guarda en la base de datos y
+validarlo es sólo comprobar la firma y la caducidad (`API_TOKEN_MAX_AGE`).
+Se envía en la cabecera `Authorization: Token <token>` y no usa sesión ni
+CSRF.
+
+La identidad validada (campos del usuario, roles y ids de los perfiles de
+doctor/paciente) se guarda en la caché de Django durante
+`API_TOKEN_IDENTITY_TIMEOUT` segundos; con la caché caliente una petición
+autenticada no hace ninguna consulta de autenticación. Las señales de
+doctorapp/signals.py la invalidan al cambiar el usuario, sus grupos o sus
+perfiles. Cambiar la contraseña revoca todos los tokens emitidos.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.db import router
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from .permissions import get_user_roles
+
+TOKEN_SALT = 'doctorapp.authentication.token'
+IDENTITY_CACHE_KEY = 'api-identity:{}'
+
+# Campos del usuario que viajan en la identidad cacheada; el resto quedan
+# diferidos y se cargarían bajo demanda.
+USER_FIELDS = ('id', 'username', 'is_superuser', 'is_staff', 'is_active')
+PROFILES = ('doctor', 'patient')
+
+
+def password_fingerprint(user):
+    return salted_hmac(TOKEN_SALT, user.password).hexdigest()[:16]
+
+
+def issue_token(user):
+    """
+    Token firmado para `user`. Caduca a los `API_TOKEN_MAX_AGE` segundos.
+    """
+    return signing.dumps({'u': user.pk, 'p': password_fingerprint(user)}, salt=TOKEN_SALT)
+
+
+def invalidate_identities(user_ids):
+    """
+    Descarta las identidades cacheadas de los usuarios dados.
+    """
+    cache.delete_many([IDENTITY_CACHE_KEY.format(pk) for pk in user_ids])
+
+
+def _build_identity(user):
+    identity = {name: getattr(user, name) for name in USER_FIELDS}
+    identity['fingerprint'] = password_fingerprint(user)
+    identity['roles'] = get_user_roles(user)
+    for name in PROFILES:
+        profile = getattr(user, name, None)
+        identity[name] = profile.pk if profile is not None else None
+    return identity
+
+
+def _partial_instance(model, db, values):
+    """
+    Instancia de `model` con sólo los campos de `values` cargados, como la
+    que devuelve `.only(...)`.
+    """
+    names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+    return model.from_db(db, names, [values[name] for name in names])
+
+
+def _identity_user(identity):
+    """
+    Reconstruye el usuario de una identidad cacheada sin tocar la base de
+    datos: roles memoizados y relaciones `user.doctor`/`user.patient`
+    resueltas de antemano, así `hasattr(user, 'doctor')` y
+    `filter(doctor=user.doctor)` tampoco consultan.
+    """
+    db = router.db_for_read(User)
+    user = _partial_instance(User, db, identity)
+    user._cached_roles = identity['roles']
+    for name in PROFILES:
+        relation = User._meta.get_field(name)
+        profile = None
+        if identity[name] is not None:
+            profile = _partial_instance(
+                relation.related_model, db, {'id': identity[name], 'user_id': user.pk}
+            )
+            relation.field.set_cached_value(profile, user)
+        relation.set_cached_value(user, profile)
+    return user
+
+
+def get_identity(user_id):
+    """
+    `(usuario, huella de contraseña)` del usuario `user_id`, desde la caché
+    o, si no está, con una consulta para el usuario y sus perfiles y otra
+    para los roles. `(None, None)` si el usuario no existe.
+    """
+    key = IDENTITY_CACHE_KEY.format(user_id)
+    identity = cache.get(key)
+    if identity is not None:
+        return _identity_user(identity), identity['fingerprint']
+
+    user = User.objects.select_related(*PROFILES).filter(pk=user_id).first()
+    if user is None:
+        return None, None
+    identity = _build_identity(user)
+    cache.set(key, identity, getattr(settings, 'API_TOKEN_IDENTITY_TIMEOUT', 300))
+    return user, identity['fingerprint']
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    `Authorization: Token <token>` con un token de `issue_token`.
+    """
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed("Cabecera de token inválida.")
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed("Cabecera de token inválida.")
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        try:
+            payload = signing.loads(
+                token, salt=TOKEN_SALT, max_age=getattr(settings, 'API_TOKEN_MAX_AGE', None)
+            )
+        except signing.SignatureExpired:
+            raise AuthenticationFailed("Token caducado.")
+        except signing.BadSignature:
+            raise AuthenticationFailed("Token inválido.")
+
+        user, fingerprint = get_identity(payload['u'])
+        if user is None or not constant_time_compare(payload['p'], fingerprint):
+            raise AuthenticationFailed("Token inválido.")
+        if not user.is_active:
+            raise AuthenticationFailed("Usuario inactivo.")
+        return user, token
+
+    def authenticate_header(self, request):
+        return self.keyword
+
@@ -0,0 +1,814 @@
+#/doctorapp/benchmarks.py
+
+"""
+Escenarios de benchmark ejecutables con `python manage.py benchmark <escenario>`.
+
+Cada escenario corre sobre una base de datos de pruebas desechable (la misma
+que usan los tests), la llena con `DatasetGenerator` y compara estrategias.
+Para registrar uno nuevo basta con decorarlo con `@scenario(...)`.
+"""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from django.test.utils import setup_databases, teardown_databases
+
+from bookings.generators import DatasetGenerator
+
+SCENARIOS = {}
+
+
+def scenario(name, help):
+    def decorator(func):
+        SCENARIOS[name] = (func, help)
+        return func
+    return decorator
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """
+    Crea la base de datos de pruebas y la destruye al terminar, para no
+    tocar los datos reales.
+    """
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+
+
+def measure(func, repeat):
+    """
+    Ejecuta `func` `repeat` veces; devuelve la mediana en milisegundos.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def report(command, title, rows):
+    """
+    Imprime una tabla sencilla: una fila por estrategia.
+    """
+    command.stdout.write(f"\n{title}")
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        command.stdout.write(f"  {name.ljust(width)}  {value}")
+
+
+def percentile(samples, p):
+    """
+    Percentil `p` (0–100) por interpolación lineal entre muestras.
+    """
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def make_client(user):
+    """
+    Cliente HTTP de Django autenticado como `user`, para medir la vista
+    completa (middleware, autenticación, permisos, serialización).
+    """
+    from django.test import Client
+
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(user)
+    return client
+
+
+@contextmanager
+def no_throttling():
+    """
+    Desactiva el throttling de DRF: un benchmark hace miles de peticiones
+    con el mismo usuario.
+    """
+    from rest_framework.views import APIView
+
+    from . import async_api
+
+    with mock.patch.object(APIView, 'get_throttles', return_value=[]), \
+            mock.patch.object(async_api, 'check_throttles'):
+        yield
+
+
+@contextmanager
+def api_client(**user_fields):
+    """
+    Cliente autenticado con un usuario nuevo y sin throttling.
+    """
+    from django.contrib.auth.models import User
+
+    user = User.objects.create_user(username=f"bench{time.monotonic_ns()}", **user_fields)
+    with no_throttling():
+        yield make_client(user)
+
+
+def generate(command, options):
+    command.stdout.write(
+        f"🔄 Generando {options['doctors']} doctores, {options['patients']} "
+        f"pacientes y {options['appointments']} citas…"
+    )
+    return DatasetGenerator(
+        seed=options['seed'], log=command.stdout.write
+    ).run(options['doctors'], options['patients'], options['appointments'])
+
+
+@scenario('patient-scoping', "Estrategias para listar los pacientes de un doctor.")
+def patient_scoping(command, options):
+    from django.db.models import Count, Exists, OuterRef
+
+    from bookings.models import Appointment
+    from doctors.models import Doctor
+    from patients.models import Patient
+    from patients.scoping import scope_to_user
+
+    generate(command, options)
+    doctor = (
+        Doctor.objects.annotate(total=Count('appointments'))
+        .order_by('-total').select_related('user').first()
+    )
+    strategies = {
+        "join citas + distinct": lambda: (
+            Patient.objects.filter(appointments__doctor=doctor).distinct()
+        ),
+        "exists sobre citas": lambda: Patient.objects.filter(Exists(
+            Appointment.objects.filter(doctor=doctor, patient=OuterRef('pk'))
+        )),
+        "care relationship": lambda: scope_to_user(Patient.objects.all(), doctor.user),
+    }
+    rows = []
+    for name, build in strategies.items():
+        first_page = measure(
+            lambda: list(build().order_by('id')[:options['page_size']]),
+            options['repeat']
+        )
+        count = measure(lambda: build().count(), options['repeat'])
+        rows.append((name, f"primera página {first_page:8.2f} ms   count {count:8.2f} ms"))
+    report(command, f"Pacientes visibles para un doctor con {doctor.total} citas:", rows)
+
+
+@scenario('bulk-import', "Importar citas: un POST por cita frente al endpoint masivo.")
+def bulk_import(command, options):
+    import datetime
+
+    from django.db.models import Max
+
+    from bookings.generators import SLOT_TIMES
+    from bookings.models import Appointment
+    from doctors.availability import appointment_minutes
+    from doctors.models import DoctorAvailability
+
+    doctor_ids, patient_ids = generate(command, options)
+    rng = random.Random(options['seed'])
+    # Las citas importadas van después de las generadas: no hay choques.
+    start = Appointment.objects.aggregate(last=Max('appointment_date'))['last']
+    start = (start or datetime.date.today()) + datetime.timedelta(days=1)
+    batch, sample = options['batch'], min(options['batch'], 500)
+    per_day = len(doctor_ids) * len(SLOT_TIMES)
+
+    # Ventanas que cubren todos los huecos de los días importados.
+    last_slot = datetime.datetime.combine(start, SLOT_TIMES[-1])
+    DoctorAvailability.objects.bulk_create(
+        DoctorAvailability(
+            doctor_id=doctor_id,
+            start_date=start,
+            end_date=start + datetime.timedelta(days=(sample + batch) // per_day),
+            start_time=SLOT_TIMES[0],
+            end_time=(last_slot + datetime.timedelta(minutes=appointment_minutes())).time(),
+        )
+        for doctor_id in doctor_ids
+    )
+
+    def items(count, offset):
+        for i in range(offset, offset + count):
+            day, slot = divmod(i, per_day)
+            yield {
+                "doctor": doctor_ids[slot % len(doctor_ids)],
+                "patient": rng.choice(patient_ids),
+                "appointment_date": str(start + datetime.timedelta(days=day)),
+                "appointment_time": SLOT_TIMES[slot // len(doctor_ids)].strftime('%H:%M'),
+                "notes": "Importada",
+                "status": "scheduled",
+            }
+
+    with api_client(is_staff=True) as client:
+        started = time.perf_counter()
+        for item in items(sample, 0):
+            response = client.post('/api/bookings/', item, content_type='application/json')
+            assert response.status_code == 201, response.content
+        single = (time.perf_counter() - started) / sample
+
+        started = time.perf_counter()
+        response = client.post(
+            '/api/bookings/bulk/', list(items(batch, sample)), content_type='application/json'
+        )
+        assert response.status_code == 201, response.content
+        bulk = time.perf_counter() - started
+
+    report(command, f"Importación de {batch} citas:", [
+        ("POST por cita", f"{single * 1000:8.2f} ms/cita   ≈ {single * batch:8.2f} s en total "
+                          f"(medido sobre {sample})"),
+        ("POST /bulk/", f"{bulk * 1000 / batch:8.2f} ms/cita   {bulk:8.2f} s en total"),
+    ])
+
+
+@scenario('api', "Latencia p50/p95/p99 y consultas por petición de los endpoints principales.")
+def api(command, options):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.db.models import Count
+    from django.test.utils import CaptureQueriesContext
+
+    from bookings.models import Appointment
+    from doctors.models import Doctor
+
+    generate(command, options)
+    # El doctor con más citas y su paciente más frecuente: el peor caso
+    # habitual para listas y permisos.
+    doctor = (
+        Doctor.objects.annotate(total=Count('appointments'))
+        .order_by('-total').select_related('user').first()
+    )
+    appointment = (
+        Appointment.objects.filter(doctor=doctor)
+        .values('patient').annotate(total=Count('id')).order_by('-total').first()
+    )
+    appointment = Appointment.objects.filter(
+        doctor=doctor, patient_id=appointment['patient']
+    ).select_related('patient__user').first()
+    patient = appointment.patient
+    clients = {
+        'staff': make_client(User.objects.create_user(username="bench-staff", is_staff=True)),
+        'doctor': make_client(doctor.user),
+        'patient': make_client(patient.user),
+    }
+
+    with no_throttling():
+        # Página profunda del listado de citas, siguiendo el cursor.
+        deep = '/api/bookings/'
+        for _ in range(20):
+            deep = clients['staff'].get(deep).json()['next'] or deep
+
+        endpoints = [
+            ('staff',   "citas (primera página)", '/api/bookings/'),
+            ('staff',   "citas (página 21)", deep),
+            ('staff',   "pacientes", '/api/patients/'),
+            ('doctor',  "pacientes del doctor", '/api/patients/'),
+            ('patient', "doctores", '/api/doctors/'),
+            ('patient', "disponibilidades", '/api/doctors/availabilities/'),
+            ('patient', "detalle de cita", f'/api/bookings/{appointment.id}/'),
+            ('patient', "detalle de paciente", f'/api/patients/{patient.id}/'),
+            ('patient', "historia clínica", f'/api/patients/{patient.id}/clinical-history/'),
+            ('doctor',  "paciente (como doctor)", f'/api/patients/{patient.id}/'),
+            ('patient', "huecos libres (7 días)", f'/api/doctors/{doctor.id}/free-slots/'),
+            ('patient', "primer hueco del depto.",
+             f'/api/doctors/departments/{doctor.department_id}/first-free-slot/'),
+        ]
+
+        rows = []
+        for role, name, url in endpoints:
+            client = clients[role]
+            client.get(url)  # calentamiento
+            latencies, queries = [], []
+            for _ in range(options['requests']):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, (url, response.status_code)
+                queries.append(len(ctx))
+            rows.append((
+                f"{name} [{role}]",
+                f"p50 {percentile(latencies, 50):7.2f}  p95 {percentile(latencies, 95):7.2f}  "
+                f"p99 {percentile(latencies, 99):7.2f} ms   "
+                f"consultas {min(queries)}–{max(queries)}"
+            ))
+    report(command, f"{options['requests']} peticiones por endpoint:", rows)
+
+
+@scenario('export', "Exportar todas las citas: streaming NDJSON/CSV frente a serializar la lista.")
+def export(command, options):
+    import tracemalloc
+
+    from rest_framework.renderers import JSONRenderer
+
+    from bookings.models import Appointment
+    from bookings.serializers import AppointmentSerializer
+
+    generate(command, options)
+
+    def traced(func):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak / 2 ** 20
+
+    def consume(response):
+        for _ in response.streaming_content:
+            pass
+
+    with api_client(is_staff=True) as client:
+        strategies = {
+            "serializar todo en memoria": lambda: JSONRenderer().render(
+                AppointmentSerializer(Appointment.objects.all(), many=True).data
+            ),
+            "export NDJSON": lambda: consume(client.get('/api/bookings/export/')),
+            "export CSV": lambda: consume(client.get('/api/bookings/export/?output=csv')),
+        }
+        rows = []
+        for name, func in strategies.items():
+            elapsed, peak = traced(func)
+            rows.append((name, f"{elapsed:8.2f} s   pico de memoria {peak:8.1f} MiB"))
+    report(command, f"Exportación de {Appointment.objects.count()} citas:", rows)
+
+
+@scenario('conditional-get', "Sondeo de lecturas públicas con y sin If-None-Match (304).")
+def conditional_get(command, options):
+    from doctors.models import Doctor
+
+    generate(command, options)
+    doctor = Doctor.objects.first()
+    endpoints = [
+        ("doctores", '/api/doctors/'),
+        ("departamentos", '/api/doctors/departments/'),
+        ("disponibilidades", '/api/doctors/availabilities/'),
+        ("detalle de doctor", f'/api/doctors/{doctor.id}/'),
+    ]
+
+    rows = []
+    with api_client() as client:
+        for name, url in endpoints:
+            first = client.get(url)
+            etag = first['ETag']
+            full = measure(lambda: client.get(url), options['requests'])
+            cached = measure(lambda: client.get(url, HTTP_IF_NONE_MATCH=etag), options['requests'])
+            not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert not_modified.status_code == 304, (url, not_modified.status_code)
+            rows.append((
+                name,
+                f"200 {full:7.2f} ms / {len(first.content):7d} B   "
+                f"304 {cached:7.2f} ms / {len(not_modified.content):3d} B"
+            ))
+    report(command, f"Mediana de {options['requests']} sondeos por endpoint:", rows)
+
+
+@scenario('response-cache', "Directorio público: listados sin caché frente a la caché de respuestas.")
+def response_cache(command, options):
+    from doctors.signals import DIRECTORY_CACHE
+    from doctorapp.response_cache import invalidate_response_cache, response_cache_stats
+
+    generate(command, options)
+    endpoints = [
+        ("doctores", '/api/doctors/'),
+        ("departamentos", '/api/doctors/departments/'),
+        ("disponibilidades", '/api/doctors/availabilities/'),
+    ]
+
+    rows = []
+    with api_client() as client:
+        for name, url in endpoints:
+            def cold():
+                # Lo mismo que provoca una escritura en el directorio.
+                invalidate_response_cache(DIRECTORY_CACHE)
+                client.get(url)
+            cold_ms = measure(cold, options['requests'])
+            client.get(url)
+            warm_ms = measure(lambda: client.get(url), options['requests'])
+            rows.append((name, f"sin caché {cold_ms:7.2f} ms   con caché {warm_ms:7.2f} ms"))
+    report(command, f"Mediana de {options['requests']} peticiones por endpoint:", rows)
+    stats = response_cache_stats(DIRECTORY_CACHE)
+    command.stdout.write(
+        f"  aciertos {stats['hits']}  fallos {stats['misses']}  "
+        f"ahorro acumulado {stats['saved_ms']} ms"
+    )
+
+
+@scenario('serializers', "Filas por segundo: ModelSerializer frente al serializer compilado (lean).")
+def serializer_throughput(command, options):
+    from bookings.models import Appointment
+    from bookings.serializers import AppointmentSerializer
+    from doctorapp.lean import lean_serializer
+    from patients.models import Patient
+    from patients.serializers import PatientSerializer
+
+    generate(command, options)
+    rows = []
+    for model, serializer_class in ((Appointment, AppointmentSerializer), (Patient, PatientSerializer)):
+        lean = lean_serializer(serializer_class)
+        queryset = model.objects.order_by('pk')[:options['batch']]
+        instances = list(queryset)
+        values = list(queryset.values(*lean.value_keys()))
+        strategies = {
+            "ModelSerializer": lambda: serializer_class(instances, many=True).data,
+            "lean (instancias)": lambda: lean(instances, many=True).data,
+            "lean (.values())": lambda: lean(values, many=True).data,
+            "ModelSerializer + consulta": lambda: serializer_class(list(queryset), many=True).data,
+            "lean .values() + consulta": lambda: lean(
+                list(queryset.values(*lean.value_keys())), many=True
+            ).data,
+        }
+        for name, func in strategies.items():
+            elapsed = measure(func, options['repeat'])
+            rows.append((
+                f"{model.__name__}: {name}",
+                f"{len(instances) / elapsed * 1000:12,.0f} filas/s"
+            ))
+    report(command, f"Serialización de hasta {options['batch']} filas (mediana de {options['repeat']}):", rows)
+
+
+@scenario('json', "Codificar/decodificar respuestas reales del API: JSONRenderer de DRF frente a orjson.")
+def json_codecs(command, options):
+    import io
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from doctorapp import renderers
+    from doctorapp.renderers import FastJSONParser, FastJSONRenderer
+
+    generate(command, options)
+    if renderers.orjson is None:
+        command.stdout.write("⚠️  orjson no está instalado: FastJSONRenderer usa el encoder estándar.")
+
+    page_size = options['page_size']
+    rows = []
+    with api_client(is_staff=True) as client:
+        for name, url in (
+            ("citas", f'/api/bookings/?page_size={page_size}'),
+            ("disponibilidades", f'/api/doctors/availabilities/?page_size={page_size}'),
+            ("registros médicos", f'/api/patients/medicalrecords/?page_size={page_size}'),
+        ):
+            data = client.get(url, HTTP_ACCEPT='application/json').data
+            body = JSONRenderer().render(data)
+            for label, renderer, parser in (
+                ("DRF", JSONRenderer(), JSONParser()),
+                ("rápido", FastJSONRenderer(), FastJSONParser()),
+            ):
+                encode = measure(lambda: renderer.render(data), options['repeat'])
+                decode = measure(lambda: parser.parse(io.BytesIO(body)), options['repeat'])
+                rows.append((
+                    f"{name} [{label}]",
+                    f"codificar {encode:8.3f} ms   decodificar {decode:8.3f} ms   {len(body):9d} B"
+                ))
+    report(command, f"Páginas de {page_size} filas (mediana de {options['repeat']}):", rows)
+
+
+@scenario('asgi', "Throughput con peticiones concurrentes: DRF bajo WSGI y ASGI frente a las vistas async.")
+def asgi(command, options):
+    import asyncio
+    import datetime
+    from concurrent.futures import ThreadPoolExecutor
+
+    from asgiref.sync import async_to_sync
+    from django.contrib.auth.models import User
+    from django.db import connections
+    from django.test import AsyncClient, override_settings
+
+    from patients.models import Patient
+
+    generate(command, options)
+    patient = Patient.objects.filter(appointments__isnull=False).select_related('user').first()
+    doctor_id = patient.appointments.values_list('doctor_id', flat=True).first()
+    day = datetime.date.today()
+    concurrency = 32
+    total = options['requests']
+    user = User.objects.get(pk=patient.user_id)
+
+    # (nombre, ruta DRF, ruta async). La lista de citas del paciente en DRF
+    # es /api/bookings/ (ve todas); se compara igual como lectura paginada.
+    endpoints = [
+        ("doctores", '/api/doctors/', '/api/async/doctors/'),
+        ("huecos libres",
+         f'/api/doctors/{doctor_id}/free-slots/?date_from={day}',
+         f'/api/async/doctors/{doctor_id}/free-slots/?date_from={day}'),
+        ("citas del paciente", '/api/bookings/', '/api/async/bookings/mine/'),
+    ]
+
+    def wsgi(url):
+        clients = [make_client(user) for _ in range(concurrency)]
+
+        def worker(i):
+            client = clients[i]
+            for _ in range(total // concurrency):
+                assert client.get(url).status_code == 200
+            connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        return (total // concurrency) * concurrency / (time.perf_counter() - start)
+
+    def asgi_run(url):
+        async def run():
+            client = AsyncClient()
+            await client.aforce_login(user)
+
+            async def worker():
+                for _ in range(total // concurrency):
+                    assert (await client.get(url)).status_code == 200
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return (total // concurrency) * concurrency / (time.perf_counter() - start)
+        return async_to_sync(run)()
+
+    rows = []
+    # AsyncClient siempre envía Host: testserver.
+    with no_throttling(), override_settings(ALLOWED_HOSTS=['localhost', 'testserver']):
+        for name, sync_url, async_url in endpoints:
+            rows.append((f"{name}: DRF bajo WSGI (hilos)", f"{wsgi(sync_url):8.0f} req/s"))
+            rows.append((f"{name}: DRF bajo ASGI", f"{asgi_run(sync_url):8.0f} req/s"))
+            rows.append((f"{name}: vista async bajo ASGI", f"{asgi_run(async_url):8.0f} req/s"))
+    report(command, f"{total} peticiones, {concurrency} concurrentes:", rows)
+
+
+@scenario('auth', "Coste de autenticación por petición: sesión frente a token firmado (caché fría y caliente).")
+def auth(command, options):
+    from django.conf import settings
+    from django.contrib.auth.middleware import AuthenticationMiddleware
+    from django.contrib.sessions.middleware import SessionMiddleware
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client, RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.authentication import SessionAuthentication
+    from rest_framework.request import Request
+
+    from doctorapp.authentication import IDENTITY_CACHE_KEY, SignedTokenAuthentication, issue_token
+    from doctorapp.permissions import get_user_roles
+    from patients.models import Patient
+
+    generate(command, options)
+    user = Patient.objects.select_related('user').first().user
+    session_client = make_client(user)
+    cookie = session_client.cookies[settings.SESSION_COOKIE_NAME].value
+    token = issue_token(user)
+    token_client = Client(SERVER_NAME='localhost', HTTP_AUTHORIZATION=f'Token {token}')
+    factory = RequestFactory()
+
+    def resolve(request, authenticator):
+        user = Request(request, authenticators=[authenticator]).user
+        # Lo que consultan los permisos y el scoping en cada petición.
+        get_user_roles(user)
+        hasattr(user, 'doctor'), hasattr(user, 'patient')
+
+    def session():
+        request = factory.get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = cookie
+        SessionMiddleware(lambda r: None).process_request(request)
+        AuthenticationMiddleware(lambda r: None).process_request(request)
+        resolve(request, SessionAuthentication())
+
+    def token_cold():
+        cache.delete(IDENTITY_CACHE_KEY.format(user.pk))
+        token_warm()
+
+    def token_warm():
+        resolve(factory.get('/', HTTP_AUTHORIZATION=f'Token {token}'), SignedTokenAuthentication())
+
+    modes = [
+        ("sesión (cookie)", session),
+        ("token, identidad sin caché", token_cold),
+        ("token, identidad en caché", token_warm),
+    ]
+    # Las consultas se cuentan antes de medir: el registro de consultas de
+    # la conexión es circular y se llena durante las mediciones.
+    queries = {}
+    for name, func in modes:
+        func()
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        queries[name] = len(ctx)
+    rows = []
+    for name, func in modes:
+        elapsed = measure(func, options['requests'])
+        rows.append((name, f"{elapsed * 1000:8.1f} µs   consultas {queries[name]}"))
+    report(command, f"Usuario + roles + perfiles (mediana de {options['requests']}):", rows)
+
+    rows = []
+    with no_throttling():
+        for name, client in (("sesión (cookie)", session_client), ("token", token_client)):
+            client.get('/api/doctors/')  # calentamiento
+            latencies = []
+            for _ in range(options['requests']):
+                start = time.perf_counter()
+                assert client.get('/api/doctors/').status_code == 200
+                latencies.append((time.perf_counter() - start) * 1000)
+            rows.append((name, f"p50 {percentile(latencies, 50):7.2f}  p95 {percentile(latencies, 95):7.2f} ms"))
+    report(command, "GET /api/doctors/ completo (respuesta cacheada):", rows)
+
+
+@scenario('throttling', "Coste por petición de los throttles de DRF frente a la ventana deslizante, según el historial.")
+def throttling(command, options):
+    import tempfile
+
+    from django.core.cache.backends.filebased import FileBasedCache
+    from django.core.cache.backends.locmem import LocMemCache
+    from rest_framework.throttling import UserRateThrottle
+
+    from doctorapp.throttling import SlidingWindowThrottle, UserSlidingWindowThrottle
+
+    rates = {'user': '1000000/day'}
+    request = mock.Mock(user=mock.Mock(pk=1, is_authenticated=True))
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        backends = [
+            ("locmem", LocMemCache('throttle-bench', {})),
+            ("file", FileBasedCache(directory, {})),
+        ]
+        for backend, store in backends:
+            for history in (10, 1000, 10000):
+                for name, cls, target in (
+                    ("DRF", UserRateThrottle, UserRateThrottle),
+                    ("ventana deslizante", UserSlidingWindowThrottle, SlidingWindowThrottle),
+                ):
+                    store.clear()
+                    with mock.patch.object(cls, 'THROTTLE_RATES', rates), \
+                            mock.patch.object(target, 'cache', store):
+                        for _ in range(history):
+                            cls().allow_request(request, None)
+                        elapsed = measure(lambda: cls().allow_request(request, None), options['requests'])
+                    rows.append((
+                        f"{backend}, {history} peticiones en la ventana: {name}",
+                        f"{elapsed * 1000:9.1f} µs"
+                    ))
+    report(command, f"allow_request por usuario (mediana de {options['requests']}):", rows)
+
+
+@scenario('dashboard', "Panel de un doctor: JOIN con agregado de notas frente al resumen desnormalizado.")
+def dashboard(command, options):
+    import datetime
+
+    from django.db.models import Count, Max, Value
+    from django.db.models.functions import Concat
+
+    from bookings.models import Appointment, AppointmentSummary, MedicalNote
+    from bookings.summaries import rebuild_appointment_summaries
+    from doctors.models import Doctor
+
+    generate(command, options)
+    rng = random.Random(options['seed'])
+    appointments = Appointment.objects.values_list('id', 'appointment_date')
+    MedicalNote.objects.bulk_create(
+        (
+            MedicalNote(appointment_id=pk, note="Evolución", date=day)
+            for pk, day in appointments.iterator() for _ in range(rng.choice((0, 0, 1, 2)))
+        ),
+        batch_size=options['batch']
+    )
+    rebuild_appointment_summaries()
+
+    doctor = Doctor.objects.annotate(total=Count('appointments')).order_by('-total').first()
+    today = datetime.date.today()
+    ordering = ('appointment_date', 'appointment_time', 'pk')
+    strategies = {
+        "JOIN + Count/Max de notas": lambda since: list(
+            Appointment.objects.filter(doctor=doctor, appointment_date__gte=since)
+            .values('id', 'appointment_date', 'appointment_time', 'status')
+            .annotate(
+                doctor_name=Concat('doctor__first_name', Value(' '), 'doctor__last_name'),
+                patient_name=Concat('patient__first_name', Value(' '), 'patient__last_name'),
+                note_count=Count('medical_notes'),
+                last_note_date=Max('medical_notes__date'),
+            )
+            .order_by(*ordering)[:options['page_size']]
+        ),
+        "AppointmentSummary": lambda since: list(
+            AppointmentSummary.objects.filter(doctor=doctor, appointment_date__gte=since)
+            .values().order_by(*ordering)[:options['page_size']]
+        ),
+    }
+    rows = []
+    for name, page in strategies.items():
+        first = measure(lambda: page(today), options['repeat'])
+        later = measure(lambda: page(today + datetime.timedelta(days=30)), options['repeat'])
+        rows.append((name, f"desde hoy {first:8.2f} ms   desde +30 días {later:8.2f} ms"))
+    report(command, f"Primera página del panel de un doctor con {doctor.total} citas:", rows)
+
+
+@scenario('calendar', "Semana de un doctor: recorrer el listado completo frente a filtros y la vista de calendario.")
+def calendar(command, options):
+    import datetime
+
+    from django.db import connection
+    from django.db.models import Count
+    from django.test.utils import CaptureQueriesContext
+
+    from doctors.models import Doctor
+
+    generate(command, options)
+    doctor = Doctor.objects.annotate(total=Count('appointments')).order_by('-total').first()
+    today = datetime.date.today()
+    monday = today - datetime.timedelta(days=today.weekday())
+    week = f'doctor={doctor.id}&date_from={monday}&date_to={monday + datetime.timedelta(days=6)}'
+
+    def walk(url):
+        # Sigue `next` como haría un cliente; devuelve (bytes, consultas).
+        size = queries = 0
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+            size += len(response.content)
+            queries += len(ctx)
+            url = response.json().get('next')
+        return size, queries
+
+    strategies = [
+        ("sin filtros: todas las citas", '/api/bookings/?page_size=500'),
+        ("filtros de la lista", f'/api/bookings/?page_size=500&{week}'),
+        ("calendario", f'/api/bookings/calendar/?{week}'),
+    ]
+    rows = []
+    with api_client(is_staff=True) as client:
+        for name, url in strategies:
+            size, queries = walk(url)
+            repeat = 1 if 'sin filtros' in name else options['repeat']
+            elapsed = measure(lambda: walk(url), repeat)
+            rows.append((name, f"{elapsed:9.2f} ms   {size / 1024:9.1f} KiB   {queries} consultas"))
+    report(command, f"Semana actual de un doctor con {doctor.total} citas (como staff):", rows)
+
+
+
+@scenario('status-index', "Citas programadas: índice completo sobre `status` frente a los índices parciales.")
+def status_index(command, options):
+    import datetime
+
+    from django.db import connection, models
+    from django.db.models import Count
+
+    from bookings.models import Appointment, AppointmentStatus
+    from doctors.models import Doctor
+
+    generate(command, options)
+    doctor = Doctor.objects.annotate(total=Count('appointments')).order_by('-total').first()
+    today = datetime.date.today()
+    scheduled = Appointment.objects.filter(status=AppointmentStatus.SCHEDULED)
+    queries = {
+        "recordatorios de mañana": lambda: list(
+            scheduled.filter(appointment_date=today + datetime.timedelta(days=1))
+            .values_list('id', 'doctor_id', 'patient_id', 'appointment_time')
+        ),
+        "próximos 7 días (página)": lambda: list(
+            scheduled.filter(appointment_date__range=(today, today + datetime.timedelta(days=6)))
+            .order_by('appointment_date', 'appointment_time')[:options['page_size']]
+        ),
+        "agenda programada del doctor": lambda: list(
+            scheduled.filter(doctor=doctor, appointment_date__gte=today)
+            .order_by('appointment_date', 'appointment_time')[:options['page_size']]
+        ),
+        "total programadas": lambda: scheduled.count(),
+    }
+    partial = [index for index in Appointment._meta.indexes if index.condition is not None]
+    # El esquema anterior: un índice sobre toda la columna `status`.
+    full = models.Index(fields=['status'], name='appt_status_idx')
+
+    def run(indexes):
+        timings = {name: measure(query, options['repeat']) for name, query in queries.items()}
+        if connection.vendor != 'sqlite':
+            return timings, None
+        names = [index.name for index in indexes]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT SUM(pgsize) FROM dbstat WHERE name IN ({', '.join(['%s'] * len(names))})",
+                names
+            )
+            return timings, cursor.fetchone()[0] / 1024
+
+    after, after_size = run(partial)
+    with connection.schema_editor() as editor:
+        for index in partial:
+            editor.remove_index(Appointment, index)
+        editor.add_index(Appointment, full)
+    try:
+        before, before_size = run([full])
+    finally:
+        with connection.schema_editor() as editor:
+            editor.remove_index(Appointment, full)
+            for index in partial:
+                editor.add_index(Appointment, index)
+
+    rows = [
+        (name, f"antes {before[name]:8.2f} ms   después {after[name]:8.2f} ms")
+        for name in queries
+    ]
+    if after_size is not None:
+        rows.append(("tamaño de los índices", f"antes {before_size:8.0f} KiB  después {after_size:8.0f} KiB"))
+    report(
+        command,
+        f"{scheduled.count()} de {Appointment.objects.count()} citas programadas "
+        f"(doctor con {doctor.total} citas):",
+        rows
+    )
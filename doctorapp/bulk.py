@@ -0,0 +1,262 @@
+#/doctorapp/bulk.py
+
+"""
+Endpoints masivos para importar o corregir lotes de objetos en una sola
+petición, en lugar de miles de POST/PATCH/DELETE individuales.
+
+`BulkModelMixin` añade la acción `bulk` (`/<recurso>/bulk/`) a un ViewSet:
+
+- POST   lista de objetos                 → bulk_create
+- PATCH  lista de objetos con su `id`     → bulk_update (parcial)
+- DELETE lista de ids                     → borrado en una consulta
+
+El lote se valida completo antes de escribir: cada elemento con el
+serializer de `bulk_serializer_class`, las claves foráneas con una consulta
+por campo (no por elemento) y las reglas de negocio con `validate_bulk`.
+Si algún elemento falla no se escribe nada y la respuesta es 400 con
+`{"errors": [{"index": i, "errors": {...}}]}`. `validate_bulk` y la
+escritura ocurren dentro de `bulk_lock`; la escritura, en una única
+transacción.
+"""
+
+from contextlib import nullcontext
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, transaction
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class BulkModelMixin:
+    bulk_serializer_class = None
+    bulk_max_items = 10000
+    bulk_batch_size = 1000
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        handler = {
+            'POST': self.bulk_create,
+            'PATCH': self.bulk_update,
+            'DELETE': self.bulk_destroy,
+        }[request.method]
+        return handler(request)
+
+    # -- Acciones -----------------------------------------------------------
+
+    def bulk_create(self, request):
+        items = self.get_bulk_items(request)
+        errors = {}
+        validated = self.validate_bulk_items(items, errors)
+        model = self.get_queryset().model
+        objects = {i: model(**data) for i, data in validated.items()}
+        with self.bulk_lock(objects):
+            self._merge_errors(errors, self.validate_bulk(objects))
+            if errors:
+                return self.bulk_error_response(errors)
+
+            objs = [objects[i] for i in sorted(objects)]
+            self._write(self.perform_bulk_create, objs)
+        return Response(
+            {"count": len(objs), "ids": [obj.pk for obj in objs]},
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, request):
+        items = self.get_bulk_items(request)
+        errors = {}
+        instances = self.get_bulk_instances(
+            [item.get('id') if isinstance(item, dict) else None for item in items],
+            errors
+        )
+        validated = self.validate_bulk_items(
+            {i: items[i] for i in instances}, errors, partial=True
+        )
+
+        objects, fields = {}, set()
+        for i, data in validated.items():
+            obj = instances[i]
+            for name, value in data.items():
+                setattr(obj, name, value)
+            fields.update(data)
+            objects[i] = obj
+        with self.bulk_lock(objects):
+            self._merge_errors(errors, self.validate_bulk(objects))
+            if errors:
+                return self.bulk_error_response(errors)
+
+            objs = [objects[i] for i in sorted(objects)]
+            if fields:
+                self._write(self.perform_bulk_update, objs, sorted(fields))
+        return Response({"count": len(objs), "ids": [obj.pk for obj in objs]})
+
+    def bulk_destroy(self, request):
+        items = self.get_bulk_items(request)
+        errors = {}
+        instances = self.get_bulk_instances(items, errors)
+        if errors:
+            return self.bulk_error_response(errors)
+
+        self._write(self.perform_bulk_destroy, [instances[i] for i in sorted(instances)])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    # -- Ganchos ------------------------------------------------------------
+
+    def validate_bulk(self, objects):
+        """
+        Reglas que dependen del lote completo o de la base de datos (p. ej.
+        conflictos de horario). Recibe {índice: instancia sin guardar o ya
+        modificada} y devuelve {índice: errores}. Debe costar un número fijo
+        de consultas.
+        """
+        return {}
+
+    def bulk_lock(self, objects):
+        """
+        Contexto que envuelve `validate_bulk` y la escritura, para que nadie
+        invalide lo comprobado antes de guardar (p. ej. bloquear agendas).
+        """
+        return nullcontext()
+
+    def perform_bulk_create(self, objs):
+        type(objs[0]).objects.bulk_create(objs, batch_size=self.bulk_batch_size)
+
+    def perform_bulk_update(self, objs, fields):
+        model = type(objs[0])
+        # bulk_update no aplica auto_now; sin esto los ETag no cambiarían.
+        auto_now = [
+            field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ]
+        for field in auto_now:
+            for obj in objs:
+                field.pre_save(obj, add=False)
+        fields = list(fields) + [field.name for field in auto_now if field.name not in fields]
+        model.objects.bulk_update(objs, fields, batch_size=self.bulk_batch_size)
+
+    def perform_bulk_destroy(self, objs):
+        type(objs[0]).objects.filter(pk__in=[obj.pk for obj in objs]).delete()
+
+    # -- Validación ---------------------------------------------------------
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"detail": "Se esperaba una lista no vacía."})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({
+                "detail": f"El lote no puede superar {self.bulk_max_items} elementos."
+            })
+        return items
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        kwargs.setdefault('context', self.get_serializer_context())
+        return self.bulk_serializer_class(*args, **kwargs)
+
+    def validate_bulk_items(self, items, errors, partial=False):
+        """
+        Valida cada elemento con el serializer del lote y comprueba sus
+        claves foráneas en bloque. Devuelve {índice: datos validados}; los
+        fallos se acumulan en `errors`.
+        """
+        if isinstance(items, list):
+            items = dict(enumerate(items))
+        # Un único ListSerializer: los campos se construyen una sola vez.
+        child = self.get_bulk_serializer(data=[], many=True, partial=partial).child
+
+        validated = {}
+        for i, item in items.items():
+            try:
+                validated[i] = child.run_validation(item)
+            except ValidationError as exc:
+                errors[i] = exc.detail
+        self.check_bulk_foreign_keys(child, validated, errors)
+        return validated
+
+    def check_bulk_foreign_keys(self, child, validated, errors):
+        """
+        Las FKs del serializer de lote se declaran como enteros (p. ej.
+        `IntegerField(source='doctor_id')`); aquí se verifica que existan
+        con una consulta por campo.
+        """
+        model = self.get_queryset().model
+        message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+        for name, field in child.fields.items():
+            if field.read_only:
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if not model_field.many_to_one:
+                continue
+            source = field.source
+            ids = {data[source] for data in validated.values() if source in data}
+            if not ids:
+                continue
+            found = set(
+                model_field.related_model._default_manager
+                .filter(pk__in=ids).values_list('pk', flat=True)
+            )
+            for i, data in list(validated.items()):
+                if source in data and data[source] not in found:
+                    del validated[i]
+                    errors[i] = {name: [message.format(pk_value=data[source])]}
+
+    def get_bulk_instances(self, ids, errors):
+        """
+        Carga con una consulta los objetos del lote, restringidos al
+        queryset de la vista, y comprueba los permisos por objeto (que no
+        deben hacer consultas por objeto). Devuelve {índice: instancia}.
+        """
+        wanted, seen = {}, set()
+        for i, pk in enumerate(ids):
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                errors[i] = {"id": ["Se requiere un id entero."]}
+            elif pk in seen:
+                errors[i] = {"id": ["Id repetido en el lote."]}
+            else:
+                wanted[i] = pk
+                seen.add(pk)
+
+        found = self.filter_queryset(self.get_queryset()).in_bulk(list(wanted.values()))
+        instances = {}
+        for i, pk in wanted.items():
+            obj = found.get(pk)
+            if obj is None:
+                errors[i] = {"id": ["No encontrado."]}
+            elif not self.has_bulk_object_permission(obj):
+                errors[i] = {"id": ["No tienes permiso para modificar este objeto."]}
+            else:
+                instances[i] = obj
+        return instances
+
+    def has_bulk_object_permission(self, obj):
+        return all(
+            permission.has_object_permission(self.request, self, obj)
+            for permission in self.get_permissions()
+        )
+
+    def bulk_error_response(self, errors):
+        return Response(
+            {"errors": [{"index": i, "errors": errors[i]} for i in sorted(errors)]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def _merge_errors(self, errors, extra):
+        for i, detail in extra.items():
+            if isinstance(detail, str):
+                detail = {api_settings.NON_FIELD_ERRORS_KEY: [detail]}
+            errors.setdefault(i, {}).update(detail)
+
+    def _write(self, perform, *args):
+        try:
+            with transaction.atomic():
+                perform(*args)
+        except IntegrityError:
+            # Otra petición escribió entre la validación y la escritura.
+            raise ValidationError({
+                "detail": "El lote entra en conflicto con datos existentes; no se guardó nada."
+            })
@@ -0,0 +1,71 @@
+#/doctorapp/conditional.py
+
+"""
+GET condicional (ETag / Last-Modified) para lecturas muy consultadas.
+
+`ConditionalGetMixin` calcula el validador antes de serializar:
+
+- list: `max(updated_at)` y `count` del queryset filtrado, en una consulta
+  agregada. Un alta, una modificación o un borrado cambian alguno de los dos.
+  Sólo se envía ETag: `max(updated_at)` no cambia con un borrado y tiene
+  resolución de segundos, así que un `If-Modified-Since` daría 304 obsoletos.
+- retrieve: el `updated_at` del objeto, ya cargado por `get_object()`; ETag
+  y Last-Modified.
+
+Si el cliente envía `If-None-Match` (o, en retrieve, `If-Modified-Since`)
+vigentes se responde 304 sin serializar ni paginar. El ETag también incluye la ruta
+completa (cursor, filtros) y el tipo de contenido negociado, de modo que
+páginas o formatos distintos nunca comparten validador.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    updated_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        stamp = self.filter_queryset(self.get_queryset()).aggregate(
+            last=Max(self.updated_field), count=Count('pk')
+        )
+        return self.conditional_response(
+            request, stamp['last'], f"{stamp['count']}",
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            send_last_modified=False
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response(
+            request, getattr(instance, self.updated_field), f"{instance.pk}",
+            lambda: self.retrieve_instance(instance)
+        )
+
+    def retrieve_instance(self, instance):
+        return Response(self.get_serializer(instance).data)
+
+    def conditional_response(self, request, last_modified, token, build, send_last_modified=True):
+        """
+        304 si el validador del cliente coincide; si no, `build()` con el
+        encabezado ETag y, con `send_last_modified`, Last-Modified.
+        """
+        stamp = last_modified.isoformat() if last_modified else '-'
+        key = f"{request.get_full_path()}|{request.accepted_media_type}|{token}|{stamp}"
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        timestamp = (
+            int(last_modified.timestamp()) if last_modified and send_last_modified else None
+        )
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = build()
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Accept',))
+        return response
@@ -0,0 +1,88 @@
+#/doctorapp/exports.py
+
+"""
+Exportaciones completas en streaming (NDJSON o CSV).
+
+`ExportMixin` añade la acción `export` (`GET /<recurso>/export/`) a un
+ViewSet. Las filas se leen con `values_list(...).iterator(chunk_size=...)`
+(cursor del lado del servidor donde la base de datos lo soporta) y se
+escriben una a una en un `StreamingHttpResponse`, así que la memoria del
+proceso no depende del número de filas exportadas.
+
+El formato se elige con `?output=ndjson` (por defecto) u `?output=csv`;
+`format` está reservado por DRF para la negociación de contenido.
+"""
+
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+
+class Echo:
+    """
+    Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(fields, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def iter_csv(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', iter_ndjson),
+    'csv': ('text/csv', iter_csv),
+}
+
+
+class ExportMixin:
+    """
+    - export_fields: columnas exportadas, en orden (nombres de `values_list`).
+    - export_chunk_size: filas que se leen de la base de datos por lote.
+    - export_filename: nombre base del archivo descargado.
+    """
+    export_fields = ()
+    export_chunk_size = 2000
+    export_filename = 'export'
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({
+                "output": [f"Formato no soportado; use uno de: {', '.join(EXPORT_FORMATS)}."]
+            })
+        content_type, render = EXPORT_FORMATS[output]
+
+        rows = (
+            self.get_export_queryset()
+            .values_list(*self.export_fields)
+            .iterator(chunk_size=self.export_chunk_size)
+        )
+        response = StreamingHttpResponse(
+            render(self.export_fields, rows), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.export_filename}.{output}"'
+        )
+        return response
+
+    def get_export_queryset(self):
+        """
+        Mismo alcance por rol y filtros que el listado, en orden estable.
+        """
+        ordering = getattr(self, 'ordering', None) or ('pk',)
+        return self.filter_queryset(self.get_queryset()).order_by(*ordering)
@@ -0,0 +1,285 @@
+#/doctorapp/instrumentation.py
+
+"""
+Tiempos por petición: consultas y tiempo de base de datos, permisos,
+serializers y render.
+
+- `ServerTimingMiddleware` abre una medición por petición, la devuelve en la
+  cabecera `Server-Timing` (la muestran las DevTools del navegador) y la suma
+  al histograma del proceso bajo la etiqueta de la vista, p. ej.
+  `AppointmentViewSet.list` o `doctors.async_views.doctor_list`.
+- Las consultas pasan por un `execute_wrapper` que se instala en cada
+  conexión al crearse (ver `install_query_recorder`), así que también se
+  cuentan las del ORM asíncrono, que corre en otros hilos.
+- `InstrumentedViewMixin` mide en los ViewSets las clases de permisos
+  (`check_permissions` / `check_object_permissions`) y los serializers
+  (`is_valid` y `to_representation`); `FastJSONRenderer` mide el render.
+  Las consultas hechas dentro de permisos o serializers cuentan también en
+  `db`: las métricas se solapan y no suman `total`.
+
+El histograma vive en memoria del proceso. Con `PERF_STATS_DIR` definido,
+cada proceso vuelca su copia a `<PERF_STATS_DIR>/<pid>.json` como mucho cada
+`PERF_STATS_FLUSH_SECONDS`; `python manage.py perf_report` las combina.
+"""
+
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Límites superiores (ms, o número de consultas) de los cubos del histograma.
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+METRICS = ('total', 'db', 'perm', 'ser', 'render')
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Milisegundos acumulados por métrica y número de consultas de una petición.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.label = None
+        self.queries = 0
+        self.ms = dict.fromkeys(METRICS, 0.0)
+
+    def add(self, metric, seconds):
+        self.ms[metric] += seconds * 1000
+
+    def header(self):
+        parts = [f'db;dur={self.ms["db"]:.2f};desc="{self.queries} queries"']
+        parts += [f'{metric};dur={self.ms[metric]:.2f}' for metric in ('perm', 'ser', 'render')]
+        parts.append(f'total;dur={self.ms["total"]:.2f}')
+        return ', '.join(parts)
+
+
+def timed(metric, func=None):
+    """
+    `func` envuelta para sumar su duración a `metric` de la petición en
+    curso. Sin `func`, decorador: `@timed('render')`.
+    """
+    if func is None:
+        return functools.partial(timed, metric)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.add(metric, time.perf_counter() - start)
+    return wrapper
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add('db', time.perf_counter() - start)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Receptor de `connection_created`: una vez por conexión (se dispara de
+    nuevo al reconectar).
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def as_dict(self):
+        return {'counts': self.counts, 'count': self.count, 'sum': self.sum, 'max': self.max}
+
+
+class _Stats:
+    """
+    Histogramas del proceso: etiqueta -> métrica -> `Histogram`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(lambda: defaultdict(Histogram))
+        self.flushed_at = time.monotonic()
+
+    def add(self, timings):
+        with self.lock:
+            histograms = self.histograms[timings.label]
+            for metric, value in timings.ms.items():
+                histograms[metric].add(value)
+            histograms['queries'].add(timings.queries)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                label: {metric: histogram.as_dict() for metric, histogram in metrics.items()}
+                for label, metrics in self.histograms.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def maybe_flush(self):
+        directory = getattr(settings, 'PERF_STATS_DIR', None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self.flushed_at < getattr(settings, 'PERF_STATS_FLUSH_SECONDS', 10):
+            return
+        self.flushed_at = now
+        flush(directory)
+
+
+stats = _Stats()
+
+
+def flush(directory):
+    """
+    Escribe el histograma de este proceso en `<directory>/<pid>.json`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with open(f'{path}.tmp', 'w') as handle:
+        json.dump(stats.snapshot(), handle)
+    os.replace(f'{path}.tmp', path)
+
+
+def merge(snapshots):
+    """
+    Suma varios volcados (de distintos procesos) en uno.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for label, metrics in snapshot.items():
+            target = merged.setdefault(label, {})
+            for metric, data in metrics.items():
+                current = target.setdefault(
+                    metric, {'counts': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0, 'max': 0.0}
+                )
+                current['counts'] = [a + b for a, b in zip(current['counts'], data['counts'])]
+                current['count'] += data['count']
+                current['sum'] += data['sum']
+                current['max'] = max(current['max'], data['max'])
+    return merged
+
+
+def bucket_percentile(data, p):
+    """
+    Percentil `p` aproximado por el límite superior de su cubo (el máximo
+    observado para el último).
+    """
+    if not data['count']:
+        return 0.0
+    rank = data['count'] * p / 100
+    seen = 0
+    for limit, count in zip(BUCKETS, data['counts']):
+        seen += count
+        if seen >= rank:
+            return min(limit, data['max'])
+    return data['max']
+
+
+def view_label(view_func, method):
+    """
+    `ViewSet.accion` para vistas de DRF y `modulo.funcion` para el resto.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+class ServerTimingMiddleware:
+    """
+    Primer middleware de la lista: mide la petición completa.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.label = view_label(view_func, request.method.lower())
+
+    def finish(self, request, response, timings):
+        timings.ms['total'] = (time.perf_counter() - timings.start) * 1000
+        response['Server-Timing'] = timings.header()
+        if timings.label is not None:
+            stats.add(timings)
+            stats.maybe_flush()
+        return response
+
+
+class InstrumentedViewMixin:
+    """
+    Mide permisos y serializers de un ViewSet en la petición en curso.
+    """
+
+    def check_permissions(self, request):
+        return timed('perm', super().check_permissions)(request)
+
+    def check_object_permissions(self, request, obj):
+        return timed('perm', super().check_object_permissions)(request, obj)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if _current.get() is not None:
+            serializer.is_valid = timed('ser', serializer.is_valid)
+            serializer.to_representation = timed('ser', serializer.to_representation)
+        return serializer
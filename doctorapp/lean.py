@@ -0,0 +1,123 @@
+#/doctorapp/lean.py
+
+"""
+Ruta de lectura rápida para listados y detalles.
+
+Los serializers de la app son `ModelSerializer` con `fields = '__all__'`. En
+listas grandes el coste está en DRF: por cada fila y campo se resuelve el
+atributo, se comprueba None y se llama a `to_representation`, aunque casi
+todos los campos devuelvan el valor tal cual.
+
+`lean_serializer(ModelSerializerClass)` compila una sola vez, a partir de los
+campos del serializer original, una tabla (nombre de salida, columna,
+conversión). Los campos que DRF devuelve sin cambios (texto, enteros,
+booleanos, claves primarias de FKs) se copian; fechas y horas ISO 8601 se
+convierten con `isoformat()`; el resto delega en el propio campo de DRF, de
+modo que el JSON es idéntico. Acepta instancias o dicts de `.values()`.
+
+`LeanReadMixin` usa ese serializer en `list` y `retrieve`, y en `list`
+además pide a la base de datos sólo las columnas con `.values()`, sin
+construir instancias del modelo. Escrituras, formularios del API navegable y
+el esquema OpenAPI siguen usando el serializer completo.
+"""
+
+import functools
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# Campos cuyo to_representation devuelve el valor leído de la base de datos
+# sin cambios.
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+)
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def compile_field(field, model):
+    """
+    (columna, conversión o None) para un campo de un ModelSerializer.
+    """
+    if field.source == '*' or '.' in field.source:
+        raise ImproperlyConfigured(
+            f"lean_serializer no soporta el campo `{field.field_name}` (source={field.source!r})."
+        )
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return model._meta.get_field(field.source).attname, None
+    if isinstance(field, serializers.RelatedField) or isinstance(field, serializers.ManyRelatedField):
+        raise ImproperlyConfigured(
+            f"lean_serializer no soporta el campo relacionado `{field.field_name}`."
+        )
+    if type(field) is serializers.DateField and _format(field, api_settings.DATE_FORMAT) == ISO_8601:
+        return field.source, _isoformat
+    if type(field) is serializers.TimeField and _format(field, api_settings.TIME_FORMAT) == ISO_8601:
+        return field.source, _isoformat
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return field.source, None
+    return field.source, field.to_representation
+
+
+def _format(field, default):
+    output_format = getattr(field, 'format', default)
+    return output_format.lower() if isinstance(output_format, str) else output_format
+
+
+class LeanSerializer(serializers.BaseSerializer):
+    """
+    Serializer de sólo lectura generado por `lean_serializer()`.
+    """
+    columns = ()
+
+    @classmethod
+    def value_keys(cls):
+        return [key for _, key, _ in cls.columns]
+
+    def to_representation(self, instance):
+        if isinstance(instance, dict):
+            row = instance
+        else:
+            row = {key: getattr(instance, key) for _, key, _ in self.columns}
+        data = {}
+        for name, key, convert in self.columns:
+            value = row[key]
+            data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+
+@functools.cache
+def lean_serializer(serializer_class):
+    """
+    Clase LeanSerializer equivalente (en lectura) a `serializer_class`.
+    """
+    model = serializer_class.Meta.model
+    columns = tuple(
+        (name, *compile_field(field, model))
+        for name, field in serializer_class().fields.items()
+        if not field.write_only
+    )
+    return type(
+        f"Lean{serializer_class.__name__}", (LeanSerializer,), {"columns": columns}
+    )
+
+
+class LeanReadMixin:
+    lean_actions = ('list', 'retrieve')
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        if self.action in self.lean_actions and not getattr(self, 'swagger_fake_view', False):
+            return lean_serializer(serializer_class)
+        return serializer_class
+
+    def paginate_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        if self.action == 'list' and issubclass(serializer_class, LeanSerializer):
+            queryset = queryset.values(*serializer_class.value_keys())
+        return super().paginate_queryset(queryset)
@@ -0,0 +1,31 @@
+# doctorapp/management/commands/benchmark.py
+
+from django.core.management.base import BaseCommand
+
+from doctorapp.benchmarks import SCENARIOS, benchmark_database
+
+
+class Command(BaseCommand):
+    help = "Ejecuta un escenario de benchmark sobre una base de datos desechable."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenario', choices=sorted(SCENARIOS),
+            help="; ".join(f"{name}: {text}" for name, (_, text) in sorted(SCENARIOS.items()))
+        )
+        parser.add_argument('--doctors', type=int, default=50)
+        parser.add_argument('--patients', type=int, default=5000)
+        parser.add_argument('--appointments', type=int, default=200000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--batch', type=int, default=10000,
+                            help="Tamaño del lote en bulk-import.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Peticiones por endpoint en el escenario api.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        func, _ = SCENARIOS[options['scenario']]
+        with benchmark_database():
+            func(self, options)
+        self.stdout.write(self.style.SUCCESS("\n✅ Benchmark terminado."))
@@ -0,0 +1,75 @@
+# doctorapp/management/commands/perf_report.py
+
+import glob
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from doctorapp.instrumentation import METRICS, bucket_percentile, merge, stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Resume los tiempos por vista (ViewSet.acción) que registra "
+        "ServerTimingMiddleware en los volcados de PERF_STATS_DIR."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None,
+                            help="Directorio de volcados (por defecto PERF_STATS_DIR).")
+        parser.add_argument('--sort', choices=METRICS + ('queries', 'count'), default='total',
+                            help="Ordena por tiempo acumulado de la métrica o por peticiones.")
+        parser.add_argument('--json', action='store_true',
+                            help="Imprime los histogramas combinados en JSON.")
+        parser.add_argument('--reset', action='store_true',
+                            help="Borra los volcados después de leerlos.")
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or getattr(settings, 'PERF_STATS_DIR', None)
+        paths = glob.glob(os.path.join(directory, '*.json')) if directory else []
+        snapshots = []
+        for path in paths:
+            with open(path) as handle:
+                snapshots.append(json.load(handle))
+        # Sin volcados, el histograma de este mismo proceso.
+        merged = merge(snapshots or [stats.snapshot()])
+
+        if options['json']:
+            self.stdout.write(json.dumps(merged, indent=2))
+        else:
+            self.write_table(merged, options['sort'])
+
+        if options['reset']:
+            for path in paths:
+                os.remove(path)
+
+    def write_table(self, merged, sort):
+        key = 'total' if sort == 'count' else sort
+        rows = sorted(
+            merged.items(),
+            key=lambda item: item[1][key]['count' if sort == 'count' else 'sum'],
+            reverse=True
+        )
+        if not rows:
+            self.stdout.write("Sin peticiones registradas.")
+            return
+        width = max(len(label) for label, _ in rows)
+        self.stdout.write(
+            f"{'vista'.ljust(width)}  {'peticiones':>10}  {'p50 ms':>8}  {'p95 ms':>8}  "
+            f"{'consultas':>9}  {'db ms':>7}  {'perm ms':>7}  {'ser ms':>7}  {'render ms':>9}"
+        )
+        for label, metrics in rows:
+            count = metrics['total']['count']
+
+            def mean(metric):
+                return metrics[metric]['sum'] / count if count else 0.0
+
+            self.stdout.write(
+                f"{label.ljust(width)}  {count:>10}  "
+                f"{bucket_percentile(metrics['total'], 50):>8.1f}  "
+                f"{bucket_percentile(metrics['total'], 95):>8.1f}  "
+                f"{mean('queries'):>9.1f}  {mean('db'):>7.2f}  {mean('perm'):>7.2f}  "
+                f"{mean('ser'):>7.2f}  {mean('render'):>9.2f}"
+            )
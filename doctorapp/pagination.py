@@ -0,0 +1,163 @@
+#/doctorapp/pagination.py
+
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Construye el filtro lexicográfico "(a, b, id) > (x, y, z)" para una
+    ordenación dada, de modo que la base de datos salte directamente a la
+    página pedida usando el índice en lugar de recorrer un OFFSET.
+
+    `ordering` admite el prefijo '-' por campo; `reverse` invierte el sentido
+    (para la página anterior).
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) compartida por todos los ViewSets.
+
+    A diferencia de `CursorPagination`, el cursor guarda la tupla completa de
+    la ordenación y no un offset, así que cualquier página cuesta una única
+    consulta indexada sin importar lo profundo que navegue el cliente.
+
+    La ordenación se toma de `view.ordering`; si no la define se usa `id`.
+    El último campo debe ser único (normalmente `id`) para desempatar.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Consulta (sin evaluar) de la página pedida, con un registro extra
+        para saber si hay más. Separada de `set_page` para que las vistas
+        asíncronas la evalúen con `async for`.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        if reverse:
+            order_by = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in self.ordering
+            ]
+        else:
+            order_by = list(self.ordering)
+        queryset = queryset.order_by(*order_by)
+
+        if self.cursor is not None:
+            values = self._decode_position(self.cursor.position)
+            queryset = queryset.filter(
+                keyset_filter(self.ordering, values, reverse=reverse)
+            )
+
+        # Pedimos un registro extra para saber si hay más páginas.
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        reverse = bool(self.cursor and self.cursor.reverse)
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        assert ordering[-1].lstrip('-') in ('id', 'pk'), (
+            'La ordenación de KeysetCursorPagination debe terminar en `id` '
+            'para que el cursor sea único.'
+        )
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                # Filas de `.values()`: `pk` llega con el nombre de su columna.
+                if name == 'pk':
+                    name = self.model._meta.pk.attname
+                values.append(instance[name])
+            else:
+                values.append(getattr(instance, name))
+        return json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+    def _decode_position(self, position):
+        try:
+            values = json.loads(position)
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self._get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            # to_python lanza ValidationError ante cursores manipulados.
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_field(self, name):
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
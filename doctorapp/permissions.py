@@ -1,18 +1,61 @@
 #/doctorapp/permissions.py
 
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+ROLE_CACHE_KEY = 'user-roles:{}'
+
+
+def get_user_roles(user):
+    """
+    Conjunto de roles (nombres de grupo) del usuario.
+
+    Se resuelve con una sola consulta y se memoiza sobre el propio `user`, que
+    es el mismo objeto durante toda la petición; así las comprobaciones de rol
+    repetidas (por petición y por objeto) no vuelven a la base de datos.
+    Si `ROLE_CACHE_TIMEOUT` está definido, además se comparte entre peticiones
+    en la caché de Django (invalidada por señales, ver doctorapp/signals.py).
+    """
+    if not (user and user.is_authenticated):
+        return frozenset()
+
+    roles = getattr(user, '_cached_roles', None)
+    if roles is not None:
+        return roles
+
+    timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', None)
+    key = ROLE_CACHE_KEY.format(user.pk)
+    if timeout:
+        roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        if timeout:
+            cache.set(key, roles, timeout)
+
+    user._cached_roles = roles
+    return roles
+
+
+def invalidate_user_roles(user_ids):
+    """
+    Descarta los roles cacheados entre peticiones de los usuarios dados.
+    """
+    if getattr(settings, 'ROLE_CACHE_TIMEOUT', None):
+        cache.delete_many([ROLE_CACHE_KEY.format(pk) for pk in user_ids])
+
+
 class IsAdminUser(BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.is_staff
 
 class IsDoctorUser(BasePermission):
     def has_permission(self, request, view):
-        return request.user and request.user.groups.filter(name="doctor").exists()
+        return bool(request.user and "doctor" in get_user_roles(request.user))
 
 class IsPatientUser(BasePermission):
     def has_permission(self, request, view):
-        return request.user and request.user.groups.filter(name="patient").exists()
+        return bool(request.user and "patient" in get_user_roles(request.user))
 
 class IsOwnerOrAdmin(BasePermission):
     """
@@ -22,4 +65,4 @@ class IsOwnerOrAdmin(BasePermission):
         if request.user.is_staff:
             return True
         # obj.user es el OneToOneField en Doctor/Patient
-        return hasattr(obj, "user") and obj.user == request.user
\ No newline at end of file
+        return hasattr(obj, "user") and obj.user == request.user
@@ -0,0 +1,110 @@
+#/doctorapp/pytest_querywatch.py
+
+"""
+Plugin de pytest del detector de N+1 (doctorapp/querywatch.py). Se carga
+desde el conftest raíz; fuera de este repo, con `-p doctorapp.pytest_querywatch`.
+
+- `pytest --querywatch=report`: activa `QueryWatchMiddleware` en todas las
+  peticiones de los tests y, al final, resume los problemas por vista
+  (`ViewSet.acción`) con el frame de `doctors`, `patients` o `bookings` que
+  los lanzó.
+- `pytest --querywatch=fail`: además, falla cada test cuyas peticiones
+  tengan problemas.
+- Fixture `querywatch` para vigilar un bloque concreto:
+
+      with querywatch(repeats=3):
+          client.get('/api/bookings/')
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+import pytest
+
+from . import querywatch as qw
+
+MIDDLEWARE = 'doctorapp.querywatch.QueryWatchMiddleware'
+
+# Problemas por vista durante la sesión: etiqueta -> [(test, [Problem, ...])].
+_findings_key = pytest.StashKey()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--querywatch', choices=('report', 'fail'), default=None,
+        help="Detecta consultas N+1, duplicadas y lentas en las peticiones de los tests."
+    )
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _querywatch_middleware(request):
+    if not request.config.getoption('querywatch'):
+        yield
+        return
+    from django.conf import settings
+    from django.test import override_settings
+
+    qw.collecting = True
+    try:
+        with override_settings(
+            MIDDLEWARE=[MIDDLEWARE, *settings.MIDDLEWARE], QUERYWATCH_MODE='log'
+        ):
+            yield
+    finally:
+        qw.collecting = False
+
+
+def pytest_runtest_setup(item):
+    qw.recorded.clear()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    mode = item.config.getoption('querywatch')
+    if not mode or report.when != 'call' or not qw.recorded:
+        return
+    findings = item.config.stash.setdefault(_findings_key, defaultdict(list))
+    for label, problems in qw.recorded:
+        findings[label].append((item.nodeid, problems))
+    if mode == 'fail' and report.passed:
+        report.outcome = 'failed'
+        report.longrepr = '\n'.join(
+            qw.format_problems(label, problems) for label, problems in qw.recorded
+        )
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    findings = config.stash.get(_findings_key, None)
+    if not config.getoption('querywatch') or not findings:
+        return
+    terminalreporter.section('querywatch')
+    for label, occurrences in sorted(findings.items(), key=lambda item: -len(item[1])):
+        seen = {}
+        for _, problems in occurrences:
+            for problem in problems:
+                seen.setdefault((problem.kind, problem.fingerprint), problem)
+        terminalreporter.write_line(f'{label} ({len(occurrences)} peticiones, p. ej. {occurrences[0][0]})')
+        for problem in seen.values():
+            terminalreporter.write_line(
+                f'  [{problem.kind}] {problem.count}x: {problem.fingerprint[:160]}'
+            )
+            for frame in problem.frames:
+                terminalreporter.write_line(f'      {frame}')
+
+
+@pytest.fixture
+def querywatch(db):
+    """
+    Context manager que falla si el bloque tiene consultas N+1, duplicadas
+    o lentas; acepta `repeats` y `slow_ms`. Devuelve el `QueryWatch`.
+    """
+    @contextmanager
+    def watch(**limits):
+        with qw.QueryWatch() as watcher:
+            yield watcher
+        problems = watcher.problems(**limits)
+        if problems:
+            pytest.fail(watcher.report(problems), pytrace=False)
+    return watch
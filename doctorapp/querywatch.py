@@ -0,0 +1,243 @@
+#/doctorapp/querywatch.py
+
+"""
+Detector de consultas N+1, duplicadas y lentas.
+
+`QueryWatch` registra las consultas de un bloque con su huella (el SQL con
+los literales y las listas `IN (...)` normalizados) y el código del proyecto
+que las lanzó: los frames más internos de las apps de `QUERYWATCH_APPS`
+(`doctors`, `patients`, `bookings`, `doctorapp`), sin contar los tests ni
+este módulo. Al terminar, `problems()` señala:
+
+- `n+1`: la misma huella `QUERYWATCH_REPEATS` veces o más con distintos
+  parámetros (p. ej. `auth_user_groups` una vez por objeto en un permiso),
+- `duplicate`: exactamente la misma consulta, con los mismos parámetros,
+  más de una vez,
+- `slow`: consultas de `QUERYWATCH_SLOW_MS` milisegundos o más.
+
+Se usa de tres formas:
+
+- en código o tests: `with QueryWatch() as watch: ...; watch.problems()`,
+- como middleware opcional (`QueryWatchMiddleware`, fuera de `MIDDLEWARE`
+  por defecto), que revisa cada petición y, según `QUERYWATCH_MODE`,
+  registra un aviso (`log`) o lanza `QueryWatchError` (`raise`),
+- como plugin de pytest (doctorapp/pytest_querywatch.py).
+"""
+
+import contextvars
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+
+from .instrumentation import view_label
+
+logger = logging.getLogger(__name__)
+
+Query = namedtuple('Query', 'fingerprint sql params ms frames')
+Problem = namedtuple('Problem', 'kind count ms fingerprint sql frames')
+
+_active = contextvars.ContextVar('querywatch', default=())
+
+# Listas `IN (%s, %s, ...)`, cadenas y números literales.
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|[-\d.]+|\'(?:[^\']|\'\')*\')\s*,?)+\)', re.I)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+class QueryWatchError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """
+    Huella de una consulta: igual para las que sólo cambian en los valores.
+    """
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACES.sub(' ', sql.replace('%s', '?')).strip()
+
+
+def _app_paths():
+    labels = getattr(settings, 'QUERYWATCH_APPS', ('doctors', 'patients', 'bookings', 'doctorapp'))
+    return tuple(apps.get_app_config(label).path + os.sep for label in labels)
+
+
+def _is_own(filename):
+    name = os.path.basename(filename)
+    return (
+        f'{os.sep}tests{os.sep}' in filename or name == 'tests.py' or name == 'conftest.py'
+        or name in ('querywatch.py', 'pytest_querywatch.py', 'instrumentation.py')
+    )
+
+
+def app_frames(limit=3):
+    """
+    Los `limit` frames más internos del código de las apps vigiladas, como
+    `ruta:línea en función`.
+    """
+    paths = _app_paths()
+    root = f'{settings.BASE_DIR}{os.sep}'
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < limit:
+        filename = frame.f_code.co_filename
+        if filename.startswith(paths) and not _is_own(filename):
+            frames.append(
+                f'{filename.removeprefix(root)}:{frame.f_lineno} en {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return tuple(frames)
+
+
+def watch_query(execute, sql, params, many, context):
+    watches = _active.get()
+    if not watches:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        frames = app_frames()
+        for watch in watches:
+            watch.record(sql, params, elapsed, frames)
+
+
+def install_query_watcher(sender, connection, **kwargs):
+    """
+    Receptor de `connection_created`, como `install_query_recorder`.
+    """
+    if watch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(watch_query)
+
+
+def frames_of(queries):
+    """
+    Frames del origen más frecuente y el frame más interno de los demás.
+    """
+    stacks = [stack for stack, _ in Counter(query.frames for query in queries).most_common()]
+    return stacks[0] + tuple(f'(también) {stack[0]}' for stack in stacks[1:] if stack)
+
+
+class QueryWatch:
+
+    def __init__(self, label=None):
+        self.label = label
+        self.queries = []
+
+    def __enter__(self):
+        self._token = _active.set(_active.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.reset(self._token)
+
+    def record(self, sql, params, ms, frames):
+        try:
+            key = repr(params)
+        except Exception:  # pragma: no cover - parámetros exóticos
+            key = id(params)
+        self.queries.append(Query(fingerprint(sql), sql, key, ms, frames))
+
+    def problems(self, repeats=None, slow_ms=None):
+        if repeats is None:
+            repeats = getattr(settings, 'QUERYWATCH_REPEATS', 5)
+        if slow_ms is None:
+            slow_ms = getattr(settings, 'QUERYWATCH_SLOW_MS', 200)
+
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[query.fingerprint].append(query)
+
+        problems = []
+        for fingerprint_, queries in groups.items():
+            ms = sum(query.ms for query in queries)
+            frames = frames_of(queries)
+            distinct = Counter((query.sql, query.params) for query in queries)
+            if len(queries) >= repeats and len(distinct) > 1:
+                problems.append(Problem('n+1', len(queries), ms, fingerprint_, queries[0].sql, frames))
+            else:
+                for (sql, _), count in distinct.items():
+                    if count > 1:
+                        problems.append(Problem('duplicate', count, ms, fingerprint_, sql, frames))
+            problems.extend(
+                Problem('slow', 1, query.ms, fingerprint_, query.sql, query.frames)
+                for query in queries if query.ms >= slow_ms
+            )
+        return problems
+
+    def report(self, problems=None):
+        problems = self.problems() if problems is None else problems
+        return format_problems(self.label, problems)
+
+
+def format_problems(label, problems):
+    lines = [f'{label or "consultas"}: {len(problems)} problema(s)']
+    for problem in problems:
+        lines.append(
+            f'  [{problem.kind}] {problem.count}x, {problem.ms:.1f} ms: {problem.fingerprint[:200]}'
+        )
+        lines.extend(f'      {frame}' for frame in problem.frames or ('(sin frame de las apps)',))
+    return '\n'.join(lines)
+
+
+# Problemas detectados por el middleware: (etiqueta, [Problem, ...]). Sólo
+# se acumulan con `collecting` activo, que pone el plugin de pytest, que
+# además los lee y los vacía; en un servidor sólo se registran en el log.
+collecting = False
+recorded = []
+
+
+class QueryWatchMiddleware:
+    """
+    Revisa las consultas de cada petición. No está en `MIDDLEWARE` por
+    defecto; el plugin de pytest lo activa con `--querywatch`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryWatch(request.path) as watch:
+            request._querywatch = watch
+            response = self.get_response(request)
+        self.check(watch)
+        return response
+
+    async def __acall__(self, request):
+        with QueryWatch(request.path) as watch:
+            request._querywatch = watch
+            response = await self.get_response(request)
+        self.check(watch)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        watch = getattr(request, '_querywatch', None)
+        if watch is not None:
+            watch.label = view_label(view_func, request.method.lower())
+
+    def check(self, watch):
+        problems = watch.problems()
+        if not problems:
+            return
+        if collecting:
+            recorded.append((watch.label, problems))
+        message = watch.report(problems)
+        if getattr(settings, 'QUERYWATCH_MODE', 'log') == 'raise':
+            raise QueryWatchError(message)
+        logger.warning(message)
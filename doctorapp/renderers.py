@@ -0,0 +1,65 @@
+#/doctorapp/renderers.py
+
+"""
+Renderer y parser JSON con `orjson` cuando está instalado.
+
+`FastJSONRenderer` y `FastJSONParser` sustituyen a los de DRF en
+`REST_FRAMEWORK`. Si `orjson` no está disponible (es opcional, ver README)
+o la petición necesita algo que orjson no hace igual (sangría pedida con
+`Accept: application/json; indent=4`, otra codificación, enteros de más de
+64 bits), usan la implementación estándar de DRF.
+
+La salida es la misma que la de `JSONRenderer` con la configuración por
+defecto (compacta, UTF-8 sin escapar, U+2028/U+2029 escapados). `date` y
+`time` se codifican de forma nativa en ISO 8601; los tipos que orjson no
+conoce (textos perezosos, Decimal, UUID, generadores...) pasan por el
+encoder de DRF.
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z) if orjson else 0
+
+
+def _default(obj):
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que DRF: separadores de línea válidos en JSON pero no en JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,124 @@
+#/doctorapp/response_cache.py
+
+"""
+Caché de lectura (read-through) para listados públicos que casi no cambian.
+
+`CachedResponseMixin` guarda en la caché de Django los datos ya serializados
+de `list` junto con sus validadores (ETag / Last-Modified). Una petición
+repetida se responde sin consultar la base de datos; si además trae un
+`If-None-Match` vigente, con 304.
+
+La clave incluye la URL absoluta (query params, cursor), el tipo de contenido
+negociado y la versión del espacio de nombres (`response_cache_namespace`).
+Invalidar es cambiar la versión con `invalidate_response_cache()`: las
+entradas viejas dejan de encontrarse y caducan solas, así que funciona igual
+con la caché en memoria local que con una en archivos (no hace falta borrar
+por patrón).
+
+Los contadores de aciertos, fallos y tiempo de construcción ahorrado viven
+en la misma caché; con backends sin `incr` atómico (archivos) son
+aproximados.
+"""
+
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+RESPONSE_CACHE_KEY = 'response-cache:{}:{}'
+STATS = ('hits', 'misses', 'saved_us')
+
+
+def response_cache_timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 60)
+
+
+def cache_version(namespace):
+    return cache.get_or_set(RESPONSE_CACHE_KEY.format(namespace, 'version'), uuid.uuid4().hex, None)
+
+
+def invalidate_response_cache(namespace):
+    """
+    Descarta todas las respuestas cacheadas de `namespace`. Se repite al
+    confirmar la transacción: una lectura concurrente pudo cachear los datos
+    anteriores entre la escritura y el commit.
+    """
+    def bump():
+        cache.set(RESPONSE_CACHE_KEY.format(namespace, 'version'), uuid.uuid4().hex, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def count(namespace, stat, amount=1):
+    key = RESPONSE_CACHE_KEY.format(namespace, stat)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # La entrada desapareció entre add e incr (p. ej. cache.clear()).
+        cache.set(key, amount, None)
+
+
+def response_cache_stats(namespace):
+    values = cache.get_many([RESPONSE_CACHE_KEY.format(namespace, stat) for stat in STATS])
+    hits, misses, saved_us = (
+        values.get(RESPONSE_CACHE_KEY.format(namespace, stat), 0) for stat in STATS
+    )
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else None,
+        "saved_ms": round(saved_us / 1000, 1),
+    }
+
+
+class CachedResponseMixin:
+    """
+    - response_cache_namespace: grupo de vistas que se invalidan juntas.
+    """
+    response_cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        namespace = self.response_cache_namespace
+        key = self.get_response_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            count(namespace, 'hits')
+            count(namespace, 'saved_us', entry['build_us'])
+            response = get_conditional_response(
+                request,
+                etag=entry['headers'].get('ETag'),
+                last_modified=parse_http_date_safe(entry['headers'].get('Last-Modified', '')),
+            ) or Response(entry['data'])
+            for header, value in entry['headers'].items():
+                response[header] = value
+            return response
+
+        count(namespace, 'misses')
+        start = time.perf_counter()
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, {
+                "data": response.data,
+                "headers": {
+                    header: response[header]
+                    for header in ('ETag', 'Last-Modified', 'Vary') if header in response
+                },
+                # Microsegundos enteros: los contadores se suman con incr.
+                "build_us": round((time.perf_counter() - start) * 1_000_000),
+            }, response_cache_timeout())
+        return response
+
+    def get_response_cache_key(self, request):
+        raw = f"{request.build_absolute_uri()}|{request.accepted_media_type}"
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        namespace = self.response_cache_namespace
+        return RESPONSE_CACHE_KEY.format(namespace, f"{cache_version(namespace)}:{digest}")
@@ -42,6 +42,8 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django_extensions',
     'rest_framework',
+    'django_filters',
+    'doctorapp',
     'patients',
     'doctors',
     'bookings',
@@ -50,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir la petición completa (cabecera Server-Timing).
+    'doctorapp.instrumentation.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -136,15 +140,37 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
+        # Clientes máquina: `Authorization: Token <token>` (ver doctorapp/authentication.py).
+        'doctorapp.authentication.SignedTokenAuthentication',
     ),
+    # JSON con orjson si está instalado; si no, el encoder estándar de DRF.
+    'DEFAULT_RENDERER_CLASSES': [
+        'doctorapp.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'doctorapp.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'doctorapp.pagination.KeysetCursorPagination',
+    # Cada ViewSet declara su `filterset_class` (p. ej. bookings/filters.py).
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'PAGE_SIZE': 50,
+    # Ventana deslizante con dos contadores por clave (ver doctorapp/throttling.py).
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'doctorapp.throttling.AnonSlidingWindowThrottle',
+        'doctorapp.throttling.UserSlidingWindowThrottle',
+        'doctorapp.throttling.ScopedSlidingWindowThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '5/minute',
-        'user': '1000/day'
-    }    
+        'user': '1000/day',
+        # Por vista (`throttle_scope`); `<scope>.write` limita POST/PUT/PATCH/DELETE.
+        'directory': '600/minute',
+        'bookings': '300/minute',
+        'bookings.write': '30/minute',
+    }
 }
 
 SPECTACULAR_SETTINGS = {
@@ -152,4 +178,44 @@ SPECTACULAR_SETTINGS = {
     'DESCRIPTION': 'API para gestión de pacientes, doctores y reservas',
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': True,
-}
\ No newline at end of file
+}
+
+# Duración (en minutos) que ocupa cada cita en la agenda del doctor.
+APPOINTMENT_DURATION_MINUTES = 30
+
+# Segundos que se comparten entre peticiones los roles (grupos) de un usuario.
+# None desactiva la caché compartida; dentro de una petición siempre se memoizan.
+ROLE_CACHE_TIMEOUT = None
+
+# Segundos que se guarda la historia clínica precalculada de cada paciente.
+# Las señales la invalidan al cambiar; el límite sólo acota datos olvidados.
+CLINICAL_HISTORY_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Segundos que se guardan las respuestas cacheadas del directorio público.
+# Las señales cambian la versión al escribir; el límite sólo acota la memoria.
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Alias de CACHES donde viven los contadores de throttling. Con varios workers
+# debe ser un backend compartido con incr atómico (Redis o memcached) para que
+# cuenten juntos; con FileBasedCache la cuenta entre procesos es aproximada.
+THROTTLE_CACHE = 'default'
+
+# Directorio donde cada proceso vuelca su histograma de tiempos por vista para
+# `manage.py perf_report`. None: sólo en memoria del proceso.
+PERF_STATS_DIR = None
+PERF_STATS_FLUSH_SECONDS = 10
+
+# Detector de N+1 (doctorapp/querywatch.py). Para revisar cada petición, añadir
+# 'doctorapp.querywatch.QueryWatchMiddleware' a MIDDLEWARE; en tests:
+# `pytest --querywatch=report` o `--querywatch=fail`.
+QUERYWATCH_MODE = 'log'  # 'log' registra un aviso; 'raise' lanza QueryWatchError
+QUERYWATCH_REPEATS = 5
+QUERYWATCH_SLOW_MS = 200
+QUERYWATCH_APPS = ('doctors', 'patients', 'bookings', 'doctorapp')
+
+# Segundos de validez de los tokens firmados de POST /api/auth/token/.
+API_TOKEN_MAX_AGE = 30 * 24 * 60 * 60
+
+# Segundos que se cachea la identidad (usuario, roles, perfiles) de un token.
+# Las señales la invalidan al cambiar; el límite sólo acota datos olvidados.
+API_TOKEN_IDENTITY_TIMEOUT = 5 * 60
@@ -0,0 +1,65 @@
+#/doctorapp/signals.py
+
+from django.contrib.auth.models import Group, User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_identities
+from .instrumentation import install_query_recorder
+from .querywatch import install_query_watcher
+from .permissions import invalidate_user_roles
+
+
+def invalidate_users(user_ids):
+    user_ids = list(user_ids)
+    invalidate_user_roles(user_ids)
+    invalidate_identities(user_ids)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalida los roles cacheados cuando cambian los grupos de un usuario,
+    ya sea desde el usuario (user.groups.add) o desde el grupo
+    (group.user_set.add).
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.__dict__.pop('_cached_roles', None)
+            invalidate_users([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_users(pk_set)
+    elif action == 'pre_clear':
+        # Tras vaciar el grupo ya no sabríamos qué usuarios tenía.
+        invalidate_users(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Group)
+def group_renamed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_users(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_lifecycle(sender, instance, **kwargs):
+    # Un id reutilizado no debe heredar los roles de un usuario anterior.
+    if kwargs.get('created', True):
+        invalidate_user_roles([instance.pk])
+    # La identidad de los tokens incluye is_active, is_staff y la contraseña.
+    invalidate_identities([instance.pk])
+
+
+@receiver(post_save, sender='doctors.Doctor')
+@receiver(post_delete, sender='doctors.Doctor')
+@receiver(post_save, sender='patients.Patient')
+@receiver(post_delete, sender='patients.Patient')
+def profile_lifecycle(sender, instance, **kwargs):
+    invalidate_identities([instance.user_id])
+
+
+# Cuenta consultas y tiempo de base de datos por petición (Server-Timing).
+connection_created.connect(install_query_recorder, dispatch_uid='doctorapp-query-recorder')
+# Sólo hace algo dentro de un QueryWatch (tests, QueryWatchMiddleware).
+connection_created.connect(install_query_watcher, dispatch_uid='doctorapp-query-watcher')
@@ -0,0 +1,84 @@
+"""
+Endpoints asíncronos (/api/async/...): mismas respuestas que los síncronos.
+"""
+import datetime
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient, Client
+
+from bookings.generators import DatasetGenerator
+from bookings.models import Appointment
+from doctors.models import Doctor
+from patients.models import Patient
+
+
+@pytest.fixture
+def dataset(db):
+    DatasetGenerator(seed=3).run(doctors=5, patients=15, appointments=120)
+
+
+def logged_in(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def test_doctor_list_matches_sync(dataset):
+    client = logged_in(User.objects.create_user(username="reader"))
+    expected = client.get('/api/doctors/?page_size=3').json()
+    response = client.get('/api/async/doctors/?page_size=3')
+    assert response.status_code == 200
+    assert response.json()['results'] == expected['results']
+
+    # El cursor es el mismo: la segunda página también coincide.
+    cursor = response.json()['next'].split('cursor=')[1]
+    expected = client.get(f'/api/doctors/?page_size=3&cursor={cursor}').json()
+    assert client.get(f'/api/async/doctors/?page_size=3&cursor={cursor}').json()['results'] == expected['results']
+
+
+def test_free_slots_matches_sync(dataset):
+    client = logged_in(User.objects.create_user(username="reader"))
+    doctor = Doctor.objects.filter(is_on_vacation=False).first()
+    day = datetime.date.today() + datetime.timedelta(days=3)
+    query = f'?date_from={day}&date_to={day + datetime.timedelta(days=2)}'
+    expected = client.get(f'/api/doctors/{doctor.id}/free-slots/{query}').json()
+    assert client.get(f'/api/async/doctors/{doctor.id}/free-slots/{query}').json() == expected
+
+    assert client.get('/api/async/doctors/0/free-slots/').status_code == 404
+    response = client.get(f'/api/async/doctors/{doctor.id}/free-slots/?duration=1')
+    assert response.status_code == 400
+    assert 'duration' in response.json()
+
+
+def test_my_appointments(dataset):
+    patient = Patient.objects.filter(appointments__isnull=False).select_related('user').first()
+    client = logged_in(patient.user)
+    rows = client.get('/api/async/bookings/mine/?page_size=500').json()['results']
+    expected = client.get('/api/bookings/?page_size=500').json()['results']
+    assert rows == [row for row in expected if row['patient'] == patient.id]
+    assert len(rows) == Appointment.objects.filter(patient=patient).count()
+
+    assert Client().get('/api/async/bookings/mine/').status_code == 403
+    staff = logged_in(User.objects.create_user(username="staff", is_staff=True))
+    assert staff.get('/api/async/bookings/mine/').status_code == 404
+    assert staff.post('/api/async/bookings/mine/').status_code == 405
+
+
+def test_anonymous_throttling(dataset):
+    client = Client()
+    statuses = [client.get('/api/async/doctors/').status_code for _ in range(6)]
+    assert statuses == [200] * 5 + [429]
+
+
+@pytest.mark.django_db
+def test_runs_under_async_client():
+    Doctor.objects.create(
+        user=User.objects.create_user(username="doctor"), first_name="Gregory",
+        last_name="House", qualification="MD", contact_number="1", email="h@example.com",
+        address="-", biography="-"
+    )
+    response = async_to_sync(AsyncClient().get)('/api/async/doctors/')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 1
@@ -0,0 +1,108 @@
+"""
+Tokens firmados (`Authorization: Token ...`) e identidad cacheada.
+"""
+import pytest
+from django.contrib.auth.models import Group, User
+from django.core import signing
+from django.test import Client, RequestFactory, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+
+from bookings.generators import DatasetGenerator
+from doctorapp.authentication import SignedTokenAuthentication, issue_token
+from doctorapp.permissions import get_user_roles
+from doctors.models import Doctor
+from patients.models import Patient
+
+
+def authenticate(token):
+    request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token}')
+    return SignedTokenAuthentication().authenticate(request)
+
+
+def token_client(token):
+    return Client(HTTP_AUTHORIZATION=f'Token {token}')
+
+
+@pytest.fixture
+def dataset(db):
+    DatasetGenerator(seed=4).run(doctors=3, patients=10, appointments=60)
+
+
+def test_obtain_token(db):
+    user = User.objects.create_user(username="robot", password="s3cret-pass")
+    response = Client().post('/api/auth/token/', {"username": "robot", "password": "s3cret-pass"})
+    assert response.status_code == 200
+    assert authenticate(response.json()['token'])[0] == user
+
+    response = Client().post('/api/auth/token/', {"username": "robot", "password": "nope"})
+    assert response.status_code == 400
+
+
+def test_warm_cache_needs_no_queries(dataset, django_assert_num_queries):
+    doctor = Doctor.objects.select_related('user').first()
+    doctor.user.groups.add(Group.objects.get_or_create(name="doctor")[0])
+    token = issue_token(doctor.user)
+
+    with django_assert_num_queries(2):
+        authenticate(token)
+    with django_assert_num_queries(0):
+        user, _ = authenticate(token)
+        assert user.pk == doctor.user_id
+        assert get_user_roles(user) == {"doctor"}
+        assert hasattr(user, 'doctor') and not hasattr(user, 'patient')
+        assert user.doctor == doctor
+    # El resto de campos se cargan bajo demanda.
+    assert user.doctor.last_name == doctor.last_name
+
+
+def test_same_results_as_session(dataset):
+    patient = Patient.objects.filter(appointments__isnull=False).select_related('user').first()
+    session = Client()
+    session.force_login(patient.user)
+    client = token_client(issue_token(patient.user))
+    for url in (
+        '/api/bookings/', '/api/patients/', f'/api/patients/{patient.id}/',
+        '/api/async/bookings/mine/',
+    ):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert response.json() == session.get(url).json(), url
+
+
+def test_rejected_tokens(db):
+    user = User.objects.create_user(username="robot", password="s3cret-pass")
+    token = issue_token(user)
+    assert token_client(token).get('/api/doctors/').status_code == 200
+
+    for bad in (token[:-1] + ('A' if token[-1] != 'A' else 'B'), signing.dumps({'u': user.pk})):
+        with pytest.raises(AuthenticationFailed):
+            authenticate(bad)
+        assert token_client(bad).get('/api/doctors/').status_code == 403
+
+    with override_settings(API_TOKEN_MAX_AGE=-1), pytest.raises(AuthenticationFailed):
+        authenticate(token)
+
+
+def test_cached_identity_is_invalidated(db):
+    user = User.objects.create_user(username="robot", password="s3cret-pass")
+    token = issue_token(user)
+    assert get_user_roles(authenticate(token)[0]) == frozenset()
+
+    user.groups.add(Group.objects.create(name="patient"))
+    Patient.objects.create(user=user, first_name="Ana", last_name="Ruiz", date_of_birth="1990-01-01")
+    user = authenticate(token)[0]
+    assert get_user_roles(user) == {"patient"} and hasattr(user, 'patient')
+
+    user = User.objects.get(pk=user.pk)
+    user.is_active = False
+    user.save()
+    with pytest.raises(AuthenticationFailed):
+        authenticate(token)
+
+    # Cambiar la contraseña revoca los tokens emitidos.
+    user.is_active = True
+    user.set_password("otra-clave")
+    user.save()
+    with pytest.raises(AuthenticationFailed):
+        authenticate(token)
+    assert authenticate(issue_token(user))[0] == user
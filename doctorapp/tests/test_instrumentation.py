@@ -0,0 +1,86 @@
+"""
+Server-Timing y histograma por vista (doctorapp.instrumentation).
+"""
+import json
+import re
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from bookings.generators import DatasetGenerator
+from doctorapp import instrumentation
+from patients.models import Patient
+
+
+def server_timing(response):
+    return {
+        name: (float(duration), desc)
+        for name, duration, desc in re.findall(
+            r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response['Server-Timing']
+        )
+    }
+
+
+@pytest.fixture
+def dataset(db):
+    DatasetGenerator(seed=5).run(doctors=3, patients=10, appointments=40)
+    instrumentation.stats.reset()
+    yield
+    instrumentation.stats.reset()
+
+
+def test_server_timing_header(dataset):
+    client = Client()
+    client.force_login(User.objects.create_user(username="staff", is_staff=True))
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get('/api/bookings/')
+    timing = server_timing(response)
+    assert set(timing) == {'db', 'perm', 'ser', 'render', 'total'}
+    assert timing['db'][1] == f'{len(ctx)} queries'
+    assert timing['ser'][0] > 0 and timing['render'][0] > 0
+    assert timing['total'][0] >= timing['ser'][0] + timing['render'][0]
+
+    # Las vistas asíncronas también cuentan las consultas del ORM asíncrono.
+    patient = Patient.objects.filter(appointments__isnull=False).select_related('user').first()
+    client.force_login(patient.user)
+    timing = server_timing(client.get('/api/async/bookings/mine/'))
+    assert int(timing['db'][1].split()[0]) > 0
+
+
+def test_histogram_per_action(dataset):
+    client = Client()
+    client.force_login(User.objects.create_user(username="staff", is_staff=True))
+    patient = Patient.objects.first()
+    for _ in range(3):
+        client.get('/api/patients/')
+    client.get(f'/api/patients/{patient.id}/')
+    client.post('/api/bookings/', {}, content_type='application/json')
+
+    snapshot = instrumentation.stats.snapshot()
+    assert snapshot['PatientViewSet.list']['total']['count'] == 3
+    assert snapshot['PatientViewSet.retrieve']['total']['count'] == 1
+    assert snapshot['AppointmentViewSet.create']['ser']['sum'] > 0
+    assert snapshot['PatientViewSet.list']['perm']['sum'] > 0
+
+
+def test_perf_report_merges_processes(dataset, tmp_path, capsys):
+    client = Client()
+    client.force_login(User.objects.create_user(username="staff", is_staff=True))
+    client.get('/api/doctors/')
+    instrumentation.flush(tmp_path)
+    # Otro proceso con el mismo histograma.
+    (tmp_path / '1.json').write_text(json.dumps(instrumentation.stats.snapshot()))
+
+    with override_settings(PERF_STATS_DIR=str(tmp_path)):
+        call_command('perf_report', '--json')
+        merged = json.loads(capsys.readouterr().out)
+        assert merged['DoctorViewSet.list']['total']['count'] == 2
+
+        call_command('perf_report', '--reset')
+        out = capsys.readouterr().out
+        assert 'DoctorViewSet.list' in out
+        assert not list(tmp_path.glob('*.json'))
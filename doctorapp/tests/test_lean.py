@@ -0,0 +1,62 @@
+"""
+La ruta de lectura rápida debe producir exactamente el mismo JSON que los
+serializers completos, tanto desde instancias como desde `.values()`.
+"""
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from bookings.generators import DatasetGenerator
+from bookings.models import Appointment, MedicalNote as AppointmentNote
+from bookings.serializers import AppointmentSerializer, MedicalNoteSerializer as AppointmentNoteSerializer
+from doctorapp.lean import lean_serializer
+from doctors.models import Department, Doctor, DoctorAvailability, MedicalNote
+from doctors.serializers import (
+    DepartmentSerializer,
+    DoctorAvailabilitySerializer,
+    DoctorSerializer,
+    MedicalNoteSerializer,
+)
+from patients.models import Insurance, MedicalRecord, Patient
+from patients.serializers import InsuranceSerializer, MedicalRecordSerializer, PatientSerializer
+
+SERIALIZERS = [
+    (Appointment, AppointmentSerializer),
+    (AppointmentNote, AppointmentNoteSerializer),
+    (Department, DepartmentSerializer),
+    (Doctor, DoctorSerializer),
+    (DoctorAvailability, DoctorAvailabilitySerializer),
+    (MedicalNote, MedicalNoteSerializer),
+    (Patient, PatientSerializer),
+    (Insurance, InsuranceSerializer),
+    (MedicalRecord, MedicalRecordSerializer),
+]
+
+
+@pytest.fixture
+def dataset(db):
+    DatasetGenerator(seed=1).run(doctors=4, patients=20, appointments=60)
+    # Valores nulos: FK opcional.
+    Doctor.objects.filter(pk=Doctor.objects.first().pk).update(department=None)
+    MedicalNote.objects.create(doctor=Doctor.objects.first(), note="-", date="2025-01-02")
+    AppointmentNote.objects.create(
+        appointment=Appointment.objects.first(), note="-", date="2025-01-03"
+    )
+
+
+def render(data):
+    # Bytes, no dicts: el orden de las claves también debe coincidir.
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.parametrize(
+    'model, serializer_class', SERIALIZERS, ids=[model._meta.label for model, _ in SERIALIZERS]
+)
+def test_lean_matches_model_serializer(dataset, model, serializer_class):
+    queryset = model.objects.order_by('pk')
+    assert queryset.exists()
+    expected = render(serializer_class(queryset, many=True).data)
+
+    lean = lean_serializer(serializer_class)
+    assert render(lean(queryset, many=True).data) == expected
+    rows = queryset.values(*lean.value_keys())
+    assert render(lean(rows, many=True).data) == expected
@@ -71,4 +71,39 @@ def test_owner_or_admin_as_admin(admin_user, factory, dummy_obj):
 def test_owner_or_admin_denied(factory, doctor_user, dummy_obj):
     request = factory.get("/")
     request.user = doctor_user
-    assert not IsOwnerOrAdmin().has_object_permission(request, None, dummy_obj)
\ No newline at end of file
+    assert not IsOwnerOrAdmin().has_object_permission(request, None, dummy_obj)
+
+@pytest.mark.django_db
+def test_roles_resolved_once_per_request(doctor_user, factory, django_assert_num_queries):
+    request = factory.get("/")
+    request.user = User.objects.get(pk=doctor_user.pk)
+    with django_assert_num_queries(1):
+        assert IsDoctorUser().has_permission(request, None)
+        assert not IsPatientUser().has_permission(request, None)
+        assert IsDoctorUser().has_permission(request, None)
+
+@pytest.mark.django_db
+def test_role_memo_invalidated_on_group_change(doctor_user, patient_group, factory):
+    request = factory.get("/")
+    request.user = doctor_user
+    assert not IsPatientUser().has_permission(request, None)
+    doctor_user.groups.add(patient_group)
+    assert IsPatientUser().has_permission(request, None)
+
+@pytest.mark.django_db
+def test_role_cache_shared_across_requests(doctor_user, patient_group, factory, settings,
+                                           django_assert_num_queries):
+    settings.ROLE_CACHE_TIMEOUT = 60
+    request = factory.get("/")
+    request.user = User.objects.get(pk=doctor_user.pk)
+    assert IsDoctorUser().has_permission(request, None)
+
+    # Otra petición (otro objeto user) reutiliza los roles sin consultar.
+    request.user = User.objects.get(pk=doctor_user.pk)
+    with django_assert_num_queries(0):
+        assert IsDoctorUser().has_permission(request, None)
+
+    # Añadir el grupo desde el lado del grupo también invalida.
+    patient_group.user_set.add(doctor_user)
+    request.user = User.objects.get(pk=doctor_user.pk)
+    assert IsPatientUser().has_permission(request, None)
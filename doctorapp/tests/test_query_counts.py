@@ -0,0 +1,169 @@
+"""
+Regresión N+1: el número de consultas de cada endpoint de lista y detalle no
+puede crecer con el número de objetos devueltos.
+"""
+import datetime
+
+import pytest
+from django.contrib.auth.models import Group, User
+from rest_framework.test import APIClient
+
+from bookings.models import Appointment, MedicalNote as AppointmentNote
+from doctors.models import Department, Doctor, DoctorAvailability, MedicalNote
+from patients.models import Insurance, MedicalRecord, Patient
+
+
+# Endpoints de lista: (rol, url, presupuesto de consultas). Los presupuestos
+# son los conteos actuales: roles del usuario, perfil doctor/paciente y la
+# página (más el agregado del ETag en las lecturas públicas de doctors);
+# subirlos debe ser una decisión consciente.
+LIST_ENDPOINTS = [
+    ('staff', '/api/patients/', 1),
+    ('staff', '/api/patients/insurances/', 1),
+    ('staff', '/api/patients/medicalrecords/', 1),
+    ('doctor', '/api/patients/', 3),
+    ('patient', '/api/patients/medicalrecords/', 4),
+    ('staff', '/api/doctors/', 2),
+    ('staff', '/api/doctors/departments/', 2),
+    ('staff', '/api/doctors/availabilities/', 2),
+    ('doctor', '/api/doctors/notes/', 1),
+    ('staff', '/api/bookings/', 1),
+    ('patient', '/api/bookings/notes/', 1),
+]
+
+# Endpoints de detalle: (rol, url con {…} a rellenar, presupuesto).
+DETAIL_ENDPOINTS = [
+    ('patient', '/api/patients/{patient}/', 4),
+    ('doctor', '/api/patients/{patient}/', 3),
+    ('patient', '/api/patients/{patient}/clinical-history/', 6),
+    ('patient', '/api/patients/insurances/{insurance}/', 4),
+    ('doctor', '/api/patients/medicalrecords/{record}/', 3),
+    ('patient', '/api/doctors/{doctor}/', 1),
+    ('patient', '/api/doctors/departments/{department}/', 1),
+    ('patient', '/api/doctors/availabilities/{availability}/', 1),
+    ('doctor', '/api/doctors/notes/{note}/', 2),
+    ('patient', '/api/bookings/{appointment}/', 2),
+    ('doctor', '/api/bookings/{appointment}/', 3),
+    ('patient', '/api/bookings/{appointment}/medical-notes/', 3),
+    ('doctor', '/api/bookings/notes/{appointment_note}/', 3),
+]
+
+
+def make_user(username, group=None, **extra):
+    user = User.objects.create_user(username=username, **extra)
+    if group:
+        user.groups.add(Group.objects.get_or_create(name=group)[0])
+    return user
+
+
+def make_doctor(user):
+    return Doctor.objects.create(
+        user=user, first_name="Gregory", last_name="House", qualification="MD",
+        contact_number="987654321", email=f"{user.username}@example.com",
+        address="Hospital General", biography="Especialista en diagnóstico"
+    )
+
+
+def make_patient(user):
+    return Patient.objects.create(
+        user=user, first_name="John", last_name="Doe", date_of_birth="1990-01-01",
+        contact_number="123456789", email=f"{user.username}@example.com",
+        address="Calle 123", medical_history="Sin antecedentes relevantes"
+    )
+
+
+class World:
+    """
+    Un doctor y un paciente con `grow(n)` objetos de cada tipo a su nombre,
+    más doctores y pacientes ajenos para engordar las listas.
+    """
+    def __init__(self):
+        self.users = {
+            'staff': make_user('staff', is_staff=True),
+            'doctor': make_user('doctor', 'doctor'),
+            'patient': make_user('patient', 'patient'),
+        }
+        self.doctor = make_doctor(self.users['doctor'])
+        self.patient = make_patient(self.users['patient'])
+        self.count = 0
+
+    def grow(self, n):
+        for _ in range(n):
+            i = self.count = self.count + 1
+            day = datetime.date(2025, 1, 1) + datetime.timedelta(days=i)
+            department = Department.objects.create(name=f"Dept {i}", description="-")
+            other = make_doctor(make_user(f"doctor{i}"))
+            other.department = department
+            other.save()
+            # Cada paciente extra tiene cita con el doctor: crece su lista.
+            extra = make_patient(make_user(f"patient{i}"))
+            Appointment.objects.create(
+                patient=extra, doctor=self.doctor, appointment_date=day,
+                appointment_time="09:00", notes="-", status="scheduled"
+            )
+            appointment = Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor, appointment_date=day,
+                appointment_time="10:00", notes="-", status="scheduled"
+            )
+            AppointmentNote.objects.create(appointment=appointment, note="-", date=day)
+            Insurance.objects.create(
+                patient=self.patient, provider="SaludTotal",
+                policy_number=f"P{i}", expiration_date=day
+            )
+            MedicalRecord.objects.create(
+                patient=self.patient, date=day, diagnosis="-",
+                treatment="-", follow_up_date=day
+            )
+            DoctorAvailability.objects.create(
+                doctor=self.doctor, start_date=day, end_date=day,
+                start_time="08:00", end_time="12:00"
+            )
+            MedicalNote.objects.create(doctor=self.doctor, note="-", date=day)
+
+    def url(self, template):
+        return template.format(
+            patient=self.patient.pk,
+            doctor=self.doctor.pk,
+            insurance=Insurance.objects.filter(patient=self.patient).first().pk,
+            record=MedicalRecord.objects.filter(patient=self.patient).first().pk,
+            department=Department.objects.first().pk,
+            availability=DoctorAvailability.objects.first().pk,
+            note=MedicalNote.objects.first().pk,
+            appointment=Appointment.objects.filter(patient=self.patient).first().pk,
+            appointment_note=AppointmentNote.objects.first().pk,
+        )
+
+    def client(self, role):
+        client = APIClient()
+        # Usuario recién leído: sin perfiles ni roles memoizados de antes.
+        client.force_authenticate(User.objects.get(pk=self.users[role].pk))
+        return client
+
+
+@pytest.fixture
+def world(db):
+    return World()
+
+
+@pytest.mark.parametrize('role,url,budget', LIST_ENDPOINTS)
+def test_list_queries_do_not_grow(world, query_budget, role, url, budget):
+    counts = []
+    for n in (2, 10):
+        world.grow(n)
+        client = world.client(role)
+        with query_budget(budget) as ctx:
+            response = client.get(url)
+        assert response.status_code == 200, response.data
+        assert len(response.data['results']) >= world.count
+        counts.append(len(ctx))
+    assert counts[0] == counts[1], f'{url}: {counts[0]} consultas con 2 objetos, {counts[1]} con 12'
+
+
+@pytest.mark.parametrize('role,url,budget', DETAIL_ENDPOINTS)
+def test_detail_query_budget(world, query_budget, role, url, budget):
+    world.grow(5)
+    url = world.url(url)
+    client = world.client(role)
+    with query_budget(budget):
+        response = client.get(url)
+    assert response.status_code == 200, response.data
@@ -0,0 +1,97 @@
+"""
+Detector de consultas N+1 / duplicadas (doctorapp.querywatch).
+"""
+import pytest
+from django.contrib.auth.models import Group, User
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+
+from bookings.generators import DatasetGenerator
+from doctorapp import querywatch as qw
+from doctorapp.permissions import get_user_roles
+from doctorapp.querywatch import QueryWatch, QueryWatchError, QueryWatchMiddleware, fingerprint
+from doctors.models import Doctor
+from patients.models import Patient
+
+
+def roles_of_every_user(request=None):
+    # Un User nuevo por fila: los roles no están memoizados.
+    for user in User.objects.all():
+        get_user_roles(user)
+    return HttpResponse()
+
+
+@pytest.fixture
+def users(db):
+    group = Group.objects.create(name="doctor")
+    for i in range(6):
+        User.objects.create_user(username=f"user{i}").groups.add(group)
+
+
+def test_fingerprint():
+    assert fingerprint(
+        'SELECT "a"."id" FROM "t1" "a" WHERE ("a"."id" IN (%s, %s, %s) AND "a"."n" = 42 '
+        "AND \"a\".\"s\" = 'x''y')"
+    ) == 'SELECT "a"."id" FROM "t1" "a" WHERE ("a"."id" IN (...) AND "a"."n" = ? AND "a"."s" = ?)'
+    assert fingerprint('SELECT 1 WHERE x IN (%s)') == fingerprint('SELECT 2 WHERE x IN (%s, %s)')
+
+
+def test_detects_n_plus_one_with_frame(users):
+    with QueryWatch() as watch:
+        roles_of_every_user()
+    [problem] = watch.problems()
+    assert problem.kind == 'n+1' and problem.count == 6
+    assert 'auth_user_groups' in problem.fingerprint
+    assert problem.frames[0].startswith('doctorapp/permissions.py:')
+    assert problem.frames[0].endswith('en get_user_roles')
+
+
+def test_detects_duplicates(users):
+    with QueryWatch() as watch:
+        list(User.objects.filter(username="user1"))
+        list(User.objects.filter(username="user1"))
+        list(User.objects.filter(username="user2"))
+    [problem] = watch.problems()
+    assert (problem.kind, problem.count) == ('duplicate', 2)
+
+
+def test_middleware(users, monkeypatch):
+    request = RequestFactory().get('/roles/')
+    # Sin el plugin no se acumula nada: sólo se registra en el log.
+    monkeypatch.setattr(qw, 'collecting', False)
+    qw.recorded.clear()
+    QueryWatchMiddleware(roles_of_every_user)(request)
+    assert qw.recorded == []
+
+    monkeypatch.setattr(qw, 'collecting', True)
+    with override_settings(QUERYWATCH_MODE='raise'):
+        with pytest.raises(QueryWatchError, match='get_user_roles'):
+            QueryWatchMiddleware(roles_of_every_user)(request)
+        with override_settings(QUERYWATCH_REPEATS=10):
+            assert QueryWatchMiddleware(roles_of_every_user)(request).status_code == 200
+    assert [label for label, _ in qw.recorded] == ['/roles/']
+    # Provocado a propósito: que `--querywatch=fail` no lo cuente.
+    qw.recorded.clear()
+
+
+def test_fixture_fails_on_problems(users, querywatch):
+    with pytest.raises(pytest.fail.Exception, match='n\\+1'):
+        with querywatch():
+            roles_of_every_user()
+
+
+def test_main_endpoints_have_no_n_plus_one(querywatch):
+    DatasetGenerator(seed=6).run(doctors=4, patients=20, appointments=120)
+    doctor = Doctor.objects.select_related('user').first()
+    patient = Patient.objects.filter(appointments__doctor=doctor).select_related('user').first()
+    staff = User.objects.create_user(username="staff", is_staff=True)
+    for user, urls in (
+        (staff, ['/api/bookings/', '/api/patients/', '/api/patients/medicalrecords/']),
+        (doctor.user, ['/api/patients/', f'/api/patients/{patient.id}/']),
+        (patient.user, ['/api/bookings/', '/api/doctors/', f'/api/doctors/{doctor.id}/free-slots/']),
+    ):
+        client = Client()
+        client.force_login(user)
+        for url in urls:
+            with querywatch():
+                assert client.get(url).status_code == 200, url
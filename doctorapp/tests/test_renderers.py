@@ -0,0 +1,73 @@
+"""
+FastJSONRenderer/FastJSONParser: misma salida que los de DRF, con y sin
+orjson instalado.
+"""
+import datetime
+import decimal
+import io
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from bookings.generators import DatasetGenerator
+from doctorapp import renderers
+from doctorapp.renderers import FastJSONParser, FastJSONRenderer
+from doctors.models import Doctor
+from patients.models import Patient
+
+PAYLOAD = {
+    "date": datetime.date(2025, 1, 5),
+    "time": datetime.time(10, 30),
+    "lazy": _("Perfil de paciente no encontrado."),
+    "decimal": decimal.Decimal("1.5"),
+    "separator": "a\u2028b",
+    "nested": [{"id": 1, "ok": True, "none": None}],
+}
+
+
+@pytest.mark.parametrize('installed', [True, False], ids=['orjson', 'stdlib'])
+def test_render_matches_drf(installed):
+    with mock.patch.object(renderers, 'orjson', renderers.orjson if installed else None):
+        assert FastJSONRenderer().render(PAYLOAD) == JSONRenderer().render(PAYLOAD)
+
+
+def test_render_indent_falls_back():
+    media_type = 'application/json; indent=4'
+    assert FastJSONRenderer().render(PAYLOAD, media_type) == JSONRenderer().render(PAYLOAD, media_type)
+
+
+@pytest.mark.parametrize('installed', [True, False], ids=['orjson', 'stdlib'])
+def test_parse(installed):
+    with mock.patch.object(renderers, 'orjson', renderers.orjson if installed else None):
+        parser = FastJSONParser()
+        assert parser.parse(io.BytesIO('{"a": [1, "ñ"]}'.encode())) == {"a": [1, "ñ"]}
+        with pytest.raises(ParseError):
+            parser.parse(io.BytesIO(b'{"a": '))
+
+
+@pytest.mark.django_db
+def test_api_payloads_match_drf():
+    DatasetGenerator(seed=2).run(doctors=3, patients=10, appointments=40)
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username="staff", is_staff=True))
+    doctor = Doctor.objects.first()
+    day = datetime.date.today() + datetime.timedelta(days=7)
+    for url in (
+        '/api/bookings/',
+        '/api/doctors/availabilities/',
+        f'/api/doctors/{doctor.id}/free-slots/?date_from={day}&date_to={day}',
+        f'/api/patients/{Patient.objects.first().id}/clinical-history/',
+    ):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert response.content == JSONRenderer().render(response.data), url
+
+    # El parser también recibe los cuerpos JSON del API.
+    response = client.post('/api/bookings/', b'{"doctor": ', content_type='application/json')
+    assert response.status_code == 400
+    assert response.json()['detail'].startswith('JSON parse error')
@@ -0,0 +1,124 @@
+"""
+Throttles de ventana deslizante: dos contadores por clave, tasas por scope
+y contadores compartidos entre procesos a través de la caché.
+"""
+import threading
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from doctorapp.throttling import (
+    AnonSlidingWindowThrottle, ScopedSlidingWindowThrottle, SlidingWindowThrottle
+)
+
+
+def anon_request():
+    request = Request(RequestFactory().get('/'))
+    request.user = AnonymousUser()
+    return request
+
+
+def allowed(count, now):
+    results = []
+    for _ in range(count):
+        throttle = AnonSlidingWindowThrottle()
+        with mock.patch.object(throttle, 'timer', return_value=now):
+            results.append(throttle.allow_request(anon_request(), None))
+    return results, throttle
+
+
+@pytest.fixture
+def ten_per_minute():
+    with mock.patch.object(AnonSlidingWindowThrottle, 'THROTTLE_RATES', {'anon': '10/min'}):
+        yield
+
+
+def test_sliding_window(ten_per_minute):
+    start = 6000.0  # inicio de una ventana de 60 s
+    results, throttle = allowed(11, start + 30)
+    assert results == [True] * 10 + [False]
+    # A mitad de la ventana siguiente la anterior cuenta por 5.
+    assert throttle.wait() == pytest.approx(30 + 6)
+
+    results, throttle = allowed(6, start + 90)
+    assert results == [True] * 5 + [False]
+    assert throttle.wait() == pytest.approx(6)
+    assert allowed(2, start + 96)[0] == [True, False]
+
+
+def test_state_is_one_counter_per_window():
+    with mock.patch.object(AnonSlidingWindowThrottle, 'THROTTLE_RATES', {'anon': '5000/min'}):
+        allowed(1000, 6000.0)
+        allowed(1000, 6060.0)
+    keys = [key.split(':', 2)[2] for key in cache._cache if 'throttle_anon_' in key]
+    assert len(keys) == 2
+    assert all(cache.get(key) == 1000 for key in keys)
+
+
+class ReadTogether:
+    """
+    La caché de los tests, pero cada lectura espera a que todas las
+    peticiones hayan leído: el peor entrelazado posible.
+    """
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties)
+
+    def __getattr__(self, name):
+        return getattr(cache, name)
+
+    def get(self, *args, **kwargs):
+        value = cache.get(*args, **kwargs)
+        self.barrier.wait()
+        return value
+
+    def get_many(self, *args, **kwargs):
+        values = cache.get_many(*args, **kwargs)
+        self.barrier.wait()
+        return values
+
+
+def test_concurrent_requests_never_exceed_rate(ten_per_minute):
+    results = []
+    threads = [threading.Thread(target=lambda: results.extend(allowed(1, 6000.0)[0]))
+               for _ in range(40)]
+    with mock.patch.object(SlidingWindowThrottle, 'cache', ReadTogether(len(threads))):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert results.count(True) == 10
+    # Las rechazadas deshacen su incremento.
+    key = AnonSlidingWindowThrottle().get_cache_key(anon_request(), None)
+    assert cache.get(f'{key}:{int(6000.0 // 60)}') == 10
+
+
+def test_counters_shared_between_processes(ten_per_minute, tmp_path):
+    # Dos instancias del backend sobre el mismo directorio: dos workers.
+    workers = [FileBasedCache(str(tmp_path), {}) for _ in range(2)]
+    results = []
+    for i in range(12):
+        with mock.patch.object(SlidingWindowThrottle, 'cache', workers[i % 2]):
+            results.extend(allowed(1, 6000.0)[0])
+    assert results == [True] * 10 + [False] * 2
+
+
+@pytest.mark.django_db
+def test_scoped_write_rate():
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username="staff", is_staff=True))
+    rates = {'anon': '5/min', 'user': '1000/day', 'bookings': '10/min', 'bookings.write': '3/min'}
+    with mock.patch.object(ScopedSlidingWindowThrottle, 'THROTTLE_RATES', rates):
+        statuses = [client.post('/api/bookings/', {}).status_code for _ in range(4)]
+        assert statuses == [400] * 3 + [429]
+        # Las lecturas tienen su propio contador.
+        assert client.get('/api/bookings/').status_code == 200
+        # Sin scope en la vista no hay límite por scope.
+        assert all(client.get('/api/patients/').status_code == 200 for _ in range(12))
+        statuses = [client.get('/api/bookings/').status_code for _ in range(10)]
+        assert statuses == [200] * 9 + [429]
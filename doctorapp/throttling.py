@@ -0,0 +1,143 @@
+#/doctorapp/throttling.py
+
+"""
+Throttles de ventana deslizante con estado O(1) por clave.
+
+Los throttles de DRF guardan en la caché la lista de instantes de todas las
+peticiones de la ventana y la reescriben entera en cada petición: con
+`1000/day` eso son hasta mil floats que se deserializan y serializan cada
+vez. Aquí cada clave sólo tiene dos contadores enteros, el de la ventana
+fija actual y el de la anterior, y el número de peticiones en la última
+`duration` se estima ponderando el anterior por la parte que aún se solapa:
+
+    estimado = anterior * (1 - transcurrido / duration) + actual
+
+Cada petición reserva su sitio antes de decidir: `add`/`incr` del contador
+actual y la decisión se toma con el valor que devuelve la caché, no con uno
+leído antes; si se rechaza, un `decr` deshace la reserva. Así, con `incr`
+atómico, peticiones simultáneas nunca superan la tasa (como mucho alguna se
+rechaza de más mientras otra deshace la suya). Más un `get` del contador
+anterior, todo en la caché indicada por `THROTTLE_CACHE` (por defecto
+`default`). Con la caché local cada proceso lleva su cuenta (atómica dentro
+del proceso). Para compartirla entre workers, `THROTTLE_CACHE` debe apuntar
+a un backend compartido con `add` e `incr` atómicos: Redis o memcached.
+`FileBasedCache` también se comparte, pero su `incr` es leer y reescribir el
+fichero: con peticiones concurrentes se pierden incrementos y la cuenta sólo
+es aproximada (ver README).
+
+`ScopedSlidingWindowThrottle` aplica la tasa de `throttle_scope` de la vista
+(o de la acción) y, para métodos de escritura, la de `<scope>.write` si está
+definida en `DEFAULT_THROTTLE_RATES`.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle, UserRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Base: las subclases definen `scope` y `get_cache_key` como en DRF.
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+        self.previous = self.cache.get(previous_key, 0)
+        count = self.increment(current_key)
+        # `current` no incluye esta petición (ver `wait`).
+        self.current = count - 1
+        self.elapsed = (self.now % self.duration) / self.duration
+
+        if self.previous * (1 - self.elapsed) + count > self.num_requests:
+            try:
+                self.cache.decr(current_key)
+            except ValueError:
+                # Expiró entretanto: no queda nada que deshacer.
+                pass
+            return False
+        return True
+
+    def increment(self, key):
+        """
+        Suma uno al contador `key` y devuelve su nuevo valor.
+        """
+        # Los contadores de la ventana anterior se leen durante la siguiente.
+        if self.cache.add(key, 1, self.duration * 2):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expiró entre el add y el incr.
+            self.cache.add(key, 1, self.duration * 2)
+            return 1
+
+    def wait(self):
+        """
+        Segundos hasta que el estimado deje sitio para una petición más.
+        """
+        remaining = 1 - self.elapsed
+        if self.current + 1 > self.num_requests:
+            # Hay que esperar a la ventana siguiente, donde `current` pasa a
+            # ser la anterior y debe haberse solapado lo suficiente.
+            needed = 1 - (self.num_requests - 1) / self.current if self.current else 0
+            return (remaining + max(needed, 0)) * self.duration
+        needed = 1 - (self.num_requests - self.current - 1) / self.previous
+        return max(needed - self.elapsed, 0) * self.duration
+
+
+class AnonSlidingWindowThrottle(SlidingWindowThrottle, AnonRateThrottle):
+    """
+    Como `AnonRateThrottle`: sólo usuarios anónimos, por IP (tasa `anon`).
+    """
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottle, UserRateThrottle):
+    """
+    Como `UserRateThrottle`: por usuario o, si es anónimo, por IP (tasa `user`).
+    """
+
+
+class ScopedSlidingWindowThrottle(SlidingWindowThrottle):
+    """
+    Tasa por vista: `throttle_scope = 'bookings'` en el ViewSet o en
+    `@action(..., throttle_scope=...)`. Las vistas sin scope no se limitan.
+    """
+    scope_attr = 'throttle_scope'
+
+    def __init__(self):
+        # La tasa depende de la vista; se resuelve en allow_request.
+        pass
+
+    def allow_request(self, request, view):
+        scope = getattr(view, self.scope_attr, None)
+        if not scope:
+            return True
+        if request.method not in SAFE_METHODS and f'{scope}.write' in self.THROTTLE_RATES:
+            scope = f'{scope}.write'
+
+        self.scope = scope
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
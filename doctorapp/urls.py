@@ -4,10 +4,16 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from bookings import async_views as bookings_async
+from doctors import async_views as doctors_async
+
+from .views import ObtainTokenView
+
 urlpatterns = [
     # Admin & Auth
     path('admin/', admin.site.urls),
     path('api-auth/', include('rest_framework.urls')),
+    path('api/auth/token/', ObtainTokenView.as_view(), name='api-token'),
 
     # Documentación
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -18,4 +24,13 @@ urlpatterns = [
     path('api/patients/', include('patients.urls')),
     path('api/doctors/', include('doctors.urls')),
     path('api/bookings/', include('bookings.urls')),
+
+    # Lecturas asíncronas (ASGI) de las rutas más consultadas
+    path('api/async/doctors/', doctors_async.doctor_list, name='async-doctor-list'),
+    path(
+        'api/async/doctors/<int:pk>/free-slots/',
+        doctors_async.doctor_free_slots,
+        name='async-doctor-free-slots'
+    ),
+    path('api/async/bookings/mine/', bookings_async.my_appointments, name='async-my-appointments'),
 ]
\ No newline at end of file
@@ -0,0 +1,27 @@
+#/doctorapp/views.py
+
+from django.conf import settings
+from rest_framework.authtoken.serializers import AuthTokenSerializer
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .authentication import issue_token
+
+
+class ObtainTokenView(APIView):
+    """
+    POST con `username` y `password`: devuelve un token firmado.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    serializer_class = AuthTokenSerializer
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        token = issue_token(serializer.validated_data['user'])
+        return Response({
+            'token': token,
+            'expires_in': getattr(settings, 'API_TOKEN_MAX_AGE', None),
+        })
@@ -0,0 +1,51 @@
+#/doctors/async_views.py
+
+"""
+Lecturas asíncronas del directorio (ver doctorapp.async_api): mismas
+respuestas que `GET /api/doctors/` y `GET /api/doctors/{pk}/free-slots/`.
+"""
+
+from rest_framework.exceptions import NotFound, ValidationError
+
+from doctorapp.async_api import async_api_view, paginate, render
+from doctorapp.lean import lean_serializer
+
+from .availability import adoctor_free_slots
+from .models import Doctor
+from .serializers import DoctorSerializer, FreeSlotQuerySerializer
+
+
+@async_api_view(throttle_scope='directory')
+async def doctor_list(request):
+    """
+    Listado público de doctores, paginado por cursor.
+    """
+    return render(await paginate(request, Doctor.objects.all(), lean_serializer(DoctorSerializer)))
+
+
+@async_api_view(throttle_scope='directory')
+async def doctor_free_slots(request, pk):
+    """
+    Huecos libres del doctor entre `date_from` y `date_to`, de `duration`
+    minutos. Público.
+    """
+    params = FreeSlotQuerySerializer(data=request.GET)
+    if not params.is_valid():
+        raise ValidationError(params.errors)
+    query = params.validated_data
+
+    try:
+        doctor = await Doctor.objects.aget(pk=pk)
+    except Doctor.DoesNotExist:
+        raise NotFound()
+    slots = await adoctor_free_slots(
+        doctor, query['date_from'], query['date_to'], query['duration']
+    )
+    return render({
+        "doctor":   doctor.id,
+        "duration": query['duration'],
+        "slots": [
+            {"date": day, "start": start, "end": end}
+            for day, start, end in slots
+        ],
+    })
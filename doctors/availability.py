@@ -0,0 +1,196 @@
+#/doctors/availability.py
+
+"""
+Motor de disponibilidad: calcula los huecos libres de agenda a partir de las
+ventanas de `DoctorAvailability` restando las citas ya reservadas.
+
+Todo el cálculo se hace en memoria con aritmética de intervalos (minutos desde
+medianoche), de modo que cada consulta cuesta un número fijo de queries sin
+importar cuántos días, ventanas o citas estén involucrados.
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+
+from bookings.models import Appointment, AppointmentStatus
+
+from .models import DoctorAvailability
+
+# Rango máximo (en días) que se acepta en una sola consulta.
+MAX_RANGE_DAYS = 62
+
+
+def appointment_minutes():
+    """
+    Duración que ocupa una cita ya reservada en la agenda.
+    """
+    return getattr(settings, 'APPOINTMENT_DURATION_MINUTES', 30)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _time(minutes):
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def _merge(intervals):
+    """
+    Une intervalos solapados o contiguos; devuelve la lista ordenada.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _subtract(windows, busy):
+    """
+    Resta `busy` a `windows` en una sola pasada. Ambas listas deben venir
+    ordenadas y sin solapes (ver `_merge`).
+    """
+    free = []
+    i = 0
+    for start, end in windows:
+        cursor = start
+        while i < len(busy) and busy[i][1] <= cursor:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][0] > cursor:
+                free.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if cursor < end:
+            free.append((cursor, end))
+    return free
+
+
+def iter_free_slots(windows, booked, date_from, date_to, duration):
+    """
+    Genera, en orden cronológico, los huecos libres de `duration` minutos.
+
+    - windows: iterable de (start_date, end_date, start_time, end_time).
+    - booked: iterable de (appointment_date, appointment_time).
+
+    Cada hueco se devuelve como (fecha, hora_inicio, hora_fin). Sólo se
+    ofrecen inicios reservables: con `duration` menor que la de una cita,
+    la cita de `appointment_minutes()` también debe caber en el intervalo.
+    """
+    windows_by_day = defaultdict(list)
+    for start_date, end_date, start_time, end_time in windows:
+        day = max(start_date, date_from)
+        last = min(end_date, date_to)
+        interval = (_minutes(start_time), _minutes(end_time))
+        if interval[0] >= interval[1]:
+            continue
+        while day <= last:
+            windows_by_day[day].append(interval)
+            day += datetime.timedelta(days=1)
+
+    length = appointment_minutes()
+    busy_by_day = defaultdict(list)
+    for day, time_ in booked:
+        start = _minutes(time_)
+        busy_by_day[day].append((start, start + length))
+
+    needed = max(duration, length)
+    for day in sorted(windows_by_day):
+        free = _subtract(
+            _merge(windows_by_day[day]),
+            _merge(busy_by_day.get(day, ()))
+        )
+        for start, end in free:
+            while start + needed <= end:
+                yield day, _time(start), _time(start + duration)
+                start += duration
+
+
+def doctor_free_slots(doctor, date_from, date_to, duration):
+    """
+    Huecos libres de un doctor entre dos fechas (ambas incluidas).
+
+    Cuesta dos consultas: ventanas de disponibilidad y citas reservadas.
+    Un doctor de vacaciones no tiene huecos.
+    """
+    if doctor.is_on_vacation:
+        return []
+    windows, booked = _schedule_querysets(doctor, date_from, date_to)
+    return list(iter_free_slots(windows, booked, date_from, date_to, duration))
+
+
+async def adoctor_free_slots(doctor, date_from, date_to, duration):
+    """
+    Versión asíncrona de `doctor_free_slots`, con las mismas dos consultas.
+    """
+    if doctor.is_on_vacation:
+        return []
+    windows, booked = _schedule_querysets(doctor, date_from, date_to)
+    windows = [window async for window in windows]
+    booked = [slot async for slot in booked]
+    return list(iter_free_slots(windows, booked, date_from, date_to, duration))
+
+
+def _schedule_querysets(doctor, date_from, date_to):
+    """
+    Ventanas de disponibilidad y citas activas del doctor en el rango.
+    """
+    windows = (
+        DoctorAvailability.objects
+        .filter(doctor=doctor, start_date__lte=date_to, end_date__gte=date_from)
+        .values_list('start_date', 'end_date', 'start_time', 'end_time')
+    )
+    booked = (
+        Appointment.objects
+        .filter(doctor=doctor, appointment_date__range=(date_from, date_to))
+        .exclude(status=AppointmentStatus.CANCELED)
+        .values_list('appointment_date', 'appointment_time')
+    )
+    return windows, booked
+
+
+def first_free_slot(doctors, date_from, date_to, duration):
+    """
+    Primer hueco libre entre todos los doctores de `doctors` (un queryset).
+
+    Se excluyen los doctores de vacaciones. Cuesta dos consultas en total,
+    sin importar cuántos doctores haya. Devuelve (doctor_id, fecha, inicio,
+    fin) o None.
+    """
+    doctors = doctors.filter(is_on_vacation=False)
+
+    windows = defaultdict(list)
+    for doctor_id, *window in (
+        DoctorAvailability.objects
+        .filter(doctor__in=doctors, start_date__lte=date_to, end_date__gte=date_from)
+        .values_list('doctor_id', 'start_date', 'end_date', 'start_time', 'end_time')
+    ):
+        windows[doctor_id].append(window)
+    if not windows:
+        return None
+
+    booked = defaultdict(list)
+    for doctor_id, day, time_ in (
+        Appointment.objects
+        .filter(doctor_id__in=list(windows), appointment_date__range=(date_from, date_to))
+        .exclude(status=AppointmentStatus.CANCELED)
+        .values_list('doctor_id', 'appointment_date', 'appointment_time')
+    ):
+        booked[doctor_id].append((day, time_))
+
+    best = None
+    for doctor_id in sorted(windows):
+        slot = next(
+            iter_free_slots(windows[doctor_id], booked[doctor_id], date_from, date_to, duration),
+            None
+        )
+        if slot is not None and (best is None or slot[:2] < best[1:3]):
+            best = (doctor_id, *slot)
+    return best
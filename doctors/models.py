@@ -3,6 +3,13 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+class Department(models.Model):
+    name = models.CharField(max_length=100)
+    description = models.TextField()
+    # Base de los ETag/Last-Modified de las lecturas públicas.
+    updated_at = models.DateTimeField(auto_now=True)
+
+
 class Doctor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='doctor')
     first_name = models.CharField(max_length=100)
@@ -13,11 +20,11 @@ class Doctor(models.Model):
     address = models.TextField()
     biography = models.TextField()
     is_on_vacation = models.BooleanField(default=False)
-
-
-class Department(models.Model):
-    name = models.CharField(max_length=100)
-    description = models.TextField()
+    department = models.ForeignKey(
+        Department, related_name='doctors', on_delete=models.SET_NULL,
+        null=True, blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
 
 
 class DoctorAvailability(models.Model):
@@ -28,6 +35,7 @@ class DoctorAvailability(models.Model):
     end_date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
+    updated_at = models.DateTimeField(auto_now=True)
 
 
 class MedicalNote(models.Model):
@@ -2,6 +2,20 @@
 
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+
+def _is_owner_doctor(user, obj):
+    """
+    True if `user` is the doctor `obj` belongs to: the Doctor itself, or the
+    doctor of an availability or note. Compares ids, so no related rows are
+    loaded per object.
+    """
+    doctor = getattr(user, 'doctor', None)
+    if doctor is None:
+        return False
+    doctor_id = obj.doctor_id if hasattr(obj, 'doctor_id') else obj.pk
+    return doctor_id == doctor.id
+
+
 class IsDoctorOrReadOnly(BasePermission):
     """
     Read-only for any authenticated user.
@@ -30,10 +44,7 @@ class IsDoctorOrReadOnly(BasePermission):
             return True
 
         # Doctors can only modify their own record
-        if hasattr(request.user, 'doctor'):
-            return obj.user == request.user
-
-        return False
+        return _is_owner_doctor(request.user, obj)
 
 
 class IsDoctorOwnerOrAdmin(BasePermission):
@@ -51,7 +62,4 @@ class IsDoctorOwnerOrAdmin(BasePermission):
             return True
 
         # Doctor can if they own the object
-        if hasattr(request.user, 'doctor'):
-            return obj.user == request.user
-
-        return False
\ No newline at end of file
+        return _is_owner_doctor(request.user, obj)
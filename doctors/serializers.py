@@ -1,6 +1,9 @@
 #/doctors/serializers.py
 
+import datetime
+
 from rest_framework import serializers
+from .availability import MAX_RANGE_DAYS, appointment_minutes
 from .models import Doctor, Department, DoctorAvailability, MedicalNote
 
 class DoctorSerializer(serializers.ModelSerializer):
@@ -31,6 +34,28 @@ class DoctorAvailabilitySerializer(serializers.ModelSerializer):
         return value
 
 
+class DoctorAvailabilityBulkSerializer(serializers.ModelSerializer):
+    """
+    Elemento de la carga masiva de disponibilidad: el doctor se valida como
+    entero y su existencia se comprueba en bloque (ver doctorapp.bulk).
+    """
+    doctor = serializers.IntegerField(source='doctor_id')
+
+    class Meta:
+        model = DoctorAvailability
+        fields = '__all__'
+
+    def validate_doctor(self, value):
+        user = self.context['request'].user
+        if user.is_staff:
+            return value
+        if not hasattr(user, 'doctor'):
+            raise serializers.ValidationError("Solo los doctores pueden modificar disponibilidad.")
+        if user.doctor.id != value:
+            raise serializers.ValidationError("No puedes modificar la disponibilidad de otro doctor.")
+        return value
+
+
 class MedicalNoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = MedicalNote
@@ -44,4 +69,28 @@ class MedicalNoteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Solo los doctores pueden crear notas médicas.")
         if user.doctor != value:
             raise serializers.ValidationError("No puedes crear notas médicas en nombre de otro doctor.")
-        return value
\ No newline at end of file
+        return value
+
+
+class FreeSlotQuerySerializer(serializers.Serializer):
+    """
+    Parámetros de consulta de huecos libres.
+    Por defecto: desde hoy, una semana, con la duración estándar de cita.
+    """
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    duration = serializers.IntegerField(required=False, min_value=5, max_value=480)
+
+    def validate(self, attrs):
+        date_from = attrs.get('date_from') or datetime.date.today()
+        date_to = attrs.get('date_to') or date_from + datetime.timedelta(days=6)
+        if date_to < date_from:
+            raise serializers.ValidationError("`date_to` no puede ser anterior a `date_from`.")
+        if (date_to - date_from).days >= MAX_RANGE_DAYS:
+            raise serializers.ValidationError(
+                f"El rango de fechas no puede superar {MAX_RANGE_DAYS} días."
+            )
+        attrs['date_from'] = date_from
+        attrs['date_to'] = date_to
+        attrs['duration'] = attrs.get('duration') or appointment_minutes()
+        return attrs
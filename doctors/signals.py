@@ -0,0 +1,22 @@
+#/doctors/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from doctorapp.response_cache import invalidate_response_cache
+
+from .models import Department, Doctor, DoctorAvailability
+
+# Espacio de nombres de la caché de respuestas del directorio público
+# (doctores, departamentos y disponibilidades).
+DIRECTORY_CACHE = 'doctor-directory'
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=DoctorAvailability)
+@receiver(post_delete, sender=Doctor)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=DoctorAvailability)
+def invalidate_directory(sender, instance, **kwargs):
+    invalidate_response_cache(DIRECTORY_CACHE)
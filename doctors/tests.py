@@ -1,4 +1,10 @@
+import tempfile
+import time
+
 from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils.http import http_date
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
@@ -105,7 +111,7 @@ class DoctorAPITestCase(APITestCase):
         url = '/api/doctors/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 2)
+        self.assertGreaterEqual(len(response.data['results']), 2)
 
     def test_doctor_detail_public(self):
         url = f'/api/doctors/{self.doctor.id}/'
@@ -161,7 +167,7 @@ class DoctorAPITestCase(APITestCase):
         url = '/api/doctors/departments/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_department_create_admin(self):
         self.authenticate(self.admin_user)
@@ -176,7 +182,7 @@ class DoctorAPITestCase(APITestCase):
         url = '/api/doctors/availabilities/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_availability_create_owner(self):
         self.authenticate(self.doctor_user)
@@ -191,6 +197,97 @@ class DoctorAPITestCase(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_availability_bulk_owner(self):
+        self.authenticate(self.doctor_user)
+        url = '/api/doctors/availabilities/bulk/'
+        window = {"start_time": "08:00", "end_time": "12:00"}
+        data = [
+            {"doctor": self.doctor.id, "start_date": f"2025-03-{d:02d}", "end_date": f"2025-03-{d:02d}", **window}
+            for d in range(1, 11)
+        ]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['count'], 10)
+
+        # Otro doctor: ni crear a su nombre ni tocar sus ventanas.
+        data[0]['doctor'] = self.other_doctor.id
+        response = self.client.post(url, data[:2], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['index'], 0)
+        foreign = DoctorAvailability.objects.create(
+            doctor=self.other_doctor, start_date="2025-03-01", end_date="2025-03-01", **window
+        )
+        response = self.client.delete(url, [self.availability.id, foreign.id], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertEqual(DoctorAvailability.objects.count(), 12)
+
+        response = self.client.patch(
+            url, [{"id": self.availability.id, "end_time": "13:00"}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.availability.refresh_from_db()
+        self.assertEqual(str(self.availability.end_time), "13:00:00")
+
+    # --- GET condicional ---
+
+    def test_conditional_list_not_modified(self):
+        url = '/api/doctors/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        # Sin Last-Modified: max(updated_at) no refleja borrados.
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Sin la caché de respuestas, el 304 sólo cuesta el agregado: no se
+        # pagina ni se serializa.
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response['ETag'], etag)
+
+        # Otra página u otro formato tienen su propio validador.
+        response = self.client.get(url + '?format=api', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_conditional_list_changes_on_write(self):
+        url = '/api/doctors/departments/'
+        etag = self.client.get(url)['ETag']
+
+        self.authenticate(self.admin_user)
+        self.client.patch(f'{url}{self.department.id}/', {"description": "Otra"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        # Un borrado no mueve max(updated_at), pero sí el conteo.
+        Department.objects.create(name="Temporal", description="")
+        etag = self.client.get(url)['ETag']
+        Department.objects.filter(name="Temporal").delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_conditional_detail(self):
+        url = f'/api/doctors/availabilities/{self.availability.id}/'
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # bulk_update también debe invalidar el validador.
+        self.authenticate(self.doctor_user)
+        self.client.patch(
+            '/api/doctors/availabilities/bulk/',
+            [{"id": self.availability.id, "end_time": "12:00"}], format='json'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(str(response.data['end_time']), "12:00:00")
+
     # --- MedicalNoteViewSet ---
 
     def test_note_list_owner(self):
@@ -198,7 +295,7 @@ class DoctorAPITestCase(APITestCase):
         url = '/api/doctors/notes/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_note_create_owner(self):
         self.authenticate(self.doctor_user)
@@ -257,4 +354,258 @@ class DoctorAPITestCase(APITestCase):
         self.assertIn(
             "vacaciones",
             response.data.get('detail', '').lower()
-        )
\ No newline at end of file
+        )
+
+class FreeSlotsAPITestCase(APITestCase):
+    def setUp(self):
+        self.department = Department.objects.create(
+            name="Cardiology", description="Heart medicine"
+        )
+        self.doctor = self.create_doctor("doctor", department=self.department)
+        self.other_doctor = self.create_doctor("doctor2", department=self.department)
+        self.patient_user = User.objects.create_user(username="patient", password="patientpass")
+        self.patient = Patient.objects.create(
+            user=self.patient_user,
+            first_name="Ana",
+            last_name="Gómez",
+            date_of_birth="1990-01-01",
+            contact_number="3000000000",
+            email="ana@example.com",
+            address="Dirección genérica",
+            medical_history="Sin antecedentes"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.patient_user)
+
+    def create_doctor(self, username, department=None):
+        user = User.objects.create_user(username=username, password="doctorpass")
+        return Doctor.objects.create(
+            user=user,
+            first_name="Gregory",
+            last_name="House",
+            qualification="MD",
+            contact_number="1234567890",
+            email=f"{username}@example.com",
+            address="Princeton Plainsboro",
+            biography="Diagnostic genius.",
+            is_on_vacation=False,
+            department=department
+        )
+
+    def book(self, doctor, date, time, status="scheduled"):
+        return Appointment.objects.create(
+            patient=self.patient,
+            doctor=doctor,
+            appointment_date=date,
+            appointment_time=time,
+            notes="Consulta",
+            status=status
+        )
+
+    def test_free_slots_subtracts_booked_appointments(self):
+        DoctorAvailability.objects.create(
+            doctor=self.doctor, start_date="2025-03-03", end_date="2025-03-04",
+            start_time="09:00", end_time="12:00"
+        )
+        self.book(self.doctor, "2025-03-03", "10:00")
+        self.book(self.doctor, "2025-03-03", "11:00", status="canceled")
+
+        url = (
+            f'/api/doctors/{self.doctor.id}/free-slots/'
+            '?date_from=2025-03-03&date_to=2025-03-04&duration=60'
+        )
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slots = [
+            (str(slot['date']), str(slot['start']), str(slot['end']))
+            for slot in response.data['slots']
+        ]
+        self.assertEqual(slots, [
+            ("2025-03-03", "09:00:00", "10:00:00"),
+            ("2025-03-03", "10:30:00", "11:30:00"),
+            ("2025-03-04", "09:00:00", "10:00:00"),
+            ("2025-03-04", "10:00:00", "11:00:00"),
+            ("2025-03-04", "11:00:00", "12:00:00"),
+        ])
+
+    def test_short_duration_only_lists_bookable_starts(self):
+        # Citas de 30 minutos: con huecos de 15 no se ofrecen las 09:45 ni
+        # las 11:45, donde la cita ya no cabe.
+        DoctorAvailability.objects.create(
+            doctor=self.doctor, start_date="2025-03-03", end_date="2025-03-03",
+            start_time="09:00", end_time="12:00"
+        )
+        self.book(self.doctor, "2025-03-03", "10:00")
+        url = (
+            f'/api/doctors/{self.doctor.id}/free-slots/'
+            '?date_from=2025-03-03&date_to=2025-03-03&duration=15'
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        starts = [str(slot['start'])[:5] for slot in response.data['slots']]
+        self.assertEqual(starts, [
+            "09:00", "09:15", "09:30",
+            "10:30", "10:45", "11:00", "11:15", "11:30",
+        ])
+
+    def test_free_slots_empty_when_on_vacation(self):
+        DoctorAvailability.objects.create(
+            doctor=self.doctor, start_date="2025-03-03", end_date="2025-03-04",
+            start_time="09:00", end_time="12:00"
+        )
+        self.doctor.is_on_vacation = True
+        self.doctor.save()
+        url = f'/api/doctors/{self.doctor.id}/free-slots/?date_from=2025-03-03'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['slots'], [])
+
+    def test_free_slots_rejects_inverted_range(self):
+        url = (
+            f'/api/doctors/{self.doctor.id}/free-slots/'
+            '?date_from=2025-03-05&date_to=2025-03-01'
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_department_first_free_slot(self):
+        # El primer doctor tiene la agenda llena a primera hora; el segundo no.
+        DoctorAvailability.objects.create(
+            doctor=self.doctor, start_date="2025-03-03", end_date="2025-03-03",
+            start_time="08:00", end_time="09:00"
+        )
+        self.book(self.doctor, "2025-03-03", "08:00")
+        self.book(self.doctor, "2025-03-03", "08:30")
+        DoctorAvailability.objects.create(
+            doctor=self.other_doctor, start_date="2025-03-03", end_date="2025-03-03",
+            start_time="08:30", end_time="10:00"
+        )
+        url = (
+            f'/api/doctors/departments/{self.department.id}/first-free-slot/'
+            '?date_from=2025-03-03&date_to=2025-03-03'
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['slot']['doctor'], self.other_doctor.id)
+        self.assertEqual(str(response.data['slot']['start']), "08:30:00")
+
+    def test_department_first_free_slot_fixed_queries(self):
+        for i in range(5):
+            doctor = self.create_doctor(f"extra{i}", department=self.department)
+            DoctorAvailability.objects.create(
+                doctor=doctor, start_date="2025-03-03", end_date="2025-03-07",
+                start_time="09:00", end_time="17:00"
+            )
+            self.book(doctor, "2025-03-03", "09:00")
+        self.doctor.is_on_vacation = True
+        self.doctor.save()
+        DoctorAvailability.objects.create(
+            doctor=self.doctor, start_date="2025-03-03", end_date="2025-03-03",
+            start_time="07:00", end_time="08:00"
+        )
+        url = (
+            f'/api/doctors/departments/{self.department.id}/first-free-slot/'
+            '?date_from=2025-03-03&date_to=2025-03-07'
+        )
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['slot']['doctor'], self.doctor.id)
+        self.assertEqual(str(response.data['slot']['start']), "09:30:00")
+
+
+class DirectoryCacheTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="readerpass")
+        self.admin_user = User.objects.create_user(
+            username="admin", password="adminpass", is_staff=True
+        )
+        self.department = Department.objects.create(name="Cardiology", description="")
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username="doctor", password="doctorpass"),
+            first_name="Gregory",
+            last_name="House",
+            qualification="MD",
+            contact_number="1234567890",
+            email="house@example.com",
+            address="Princeton Plainsboro",
+            biography="Diagnostic genius.",
+            department=self.department
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_served_from_cache(self):
+        url = '/api/doctors/'
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), first.json())
+        self.assertEqual(response['ETag'], first['ETag'])
+
+        # Revalidación desde la caché, también sin consultas.
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Los query params forman parte de la clave.
+        with self.assertNumQueries(2):
+            self.client.get(url + '?page_size=1')
+
+    def test_write_invalidates(self):
+        for url in ('/api/doctors/', '/api/doctors/departments/', '/api/doctors/availabilities/'):
+            self.client.get(url)
+
+        self.department.name = "Cardiología"
+        self.department.save()
+        response = self.client.get('/api/doctors/departments/')
+        self.assertEqual(response.data['results'][0]['name'], "Cardiología")
+
+        DoctorAvailability.objects.create(
+            doctor=self.doctor, start_date="2025-01-01", end_date="2025-01-10",
+            start_time="09:00", end_time="17:00"
+        )
+        response = self.client.get('/api/doctors/availabilities/')
+        self.assertEqual(len(response.data['results']), 1)
+
+        self.doctor.delete()
+        response = self.client.get('/api/doctors/')
+        self.assertEqual(response.data['results'], [])
+
+    def test_bulk_write_invalidates(self):
+        url = '/api/doctors/availabilities/'
+        self.client.get(url)
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(url + 'bulk/', [{
+            "doctor": self.doctor.id, "start_date": "2025-03-01", "end_date": "2025-03-01",
+            "start_time": "08:00", "end_time": "12:00"
+        }], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+    def test_stats_admin_only(self):
+        url = '/api/doctors/cache-stats/'
+        self.client.get('/api/doctors/')
+        self.client.get('/api/doctors/')
+        self.client.get('/api/doctors/')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        stats = self.client.get(url).data['doctor-directory']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertEqual(stats['hit_rate'], 0.6667)
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}
+            with override_settings(CACHES=caches):
+                self.client.get('/api/doctors/departments/')
+                with self.assertNumQueries(0):
+                    self.client.get('/api/doctors/departments/')
+                Department.objects.create(name="Neurology", description="")
+                response = self.client.get('/api/doctors/departments/')
+                self.assertEqual(len(response.data['results']), 2)
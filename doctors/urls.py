@@ -17,6 +17,7 @@ router = DefaultRouter()
 #   GET    /api/doctors/departments/{pk}/
 #   PUT    /api/doctors/departments/{pk}/    (solo admin)
 #   DELETE /api/doctors/departments/{pk}/    (solo admin)
+#   GET    /api/doctors/departments/{pk}/first-free-slot/  → primer hueco libre del departamento
 router.register(r'departments', DepartmentViewSet, basename='department')
 
 # Endpoints para disponibilidades de doctores:
@@ -41,6 +42,8 @@ router.register(r'notes', MedicalNoteViewSet, basename='doctornote')
 #   GET    /api/doctors/{pk}/      → detalle doctor
 #   PUT    /api/doctors/{pk}/      → actualizar doctor (dueño/admin)
 #   DELETE /api/doctors/{pk}/      → borrar doctor (dueño/admin)
+#   GET    /api/doctors/{pk}/free-slots/?date_from=&date_to=&duration=
+#                                  → huecos libres del doctor
 router.register(r'', DoctorViewSet, basename='doctor')
 
 urlpatterns = router.urls
\ No newline at end of file
@@ -1,10 +1,20 @@
 from django.utils.translation import gettext_lazy as _
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 from bookings.serializers import AppointmentSerializer
+from bookings.services import book_appointment
+from doctorapp.bulk import BulkModelMixin
+from doctorapp.conditional import ConditionalGetMixin
+from doctorapp.instrumentation import InstrumentedViewMixin
+from doctorapp.lean import LeanReadMixin
+from doctorapp.response_cache import (
+    CachedResponseMixin,
+    invalidate_response_cache,
+    response_cache_stats
+)
 from bookings.models import Appointment
 from patients.models import Patient
 
@@ -14,33 +24,57 @@ from .models import (
     DoctorAvailability,
     MedicalNote
 )
+from .availability import doctor_free_slots, first_free_slot
 from .serializers import (
     DoctorSerializer,
     DepartmentSerializer,
     DoctorAvailabilitySerializer,
-    MedicalNoteSerializer
+    DoctorAvailabilityBulkSerializer,
+    MedicalNoteSerializer,
+    FreeSlotQuerySerializer
 )
 from .permissions import (
     IsDoctorOrReadOnly,
     IsDoctorOwnerOrAdmin
 )
+from .signals import DIRECTORY_CACHE
 
 
-class DoctorViewSet(viewsets.ModelViewSet):
+class DoctorViewSet(
+    InstrumentedViewMixin, CachedResponseMixin, ConditionalGetMixin, LeanReadMixin,
+    viewsets.ModelViewSet
+):
     """
     API para gestionar doctores.
-      - list, retrieve: público.
+      - list, retrieve: público, con GET condicional (ETag; Last-Modified sólo en retrieve);
+        list se sirve desde la caché de respuestas.
       - create, update, delete: solo doctor propietario o admin.
+      - cache_stats (GET /doctors/cache-stats/): métricas de la caché de
+        respuestas del directorio, solo admin.
       - appointments: acción custom para GET/POST de citas (solo usuarios autenticados).
+      - free_slots (GET /doctors/{pk}/free-slots/): huecos libres del doctor, público.
     """
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
     permission_classes = [IsDoctorOrReadOnly]
+    response_cache_namespace = DIRECTORY_CACHE
+    # Tasas de DEFAULT_THROTTLE_RATES (ver doctorapp/throttling.py).
+    throttle_scope = 'directory'
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='cache-stats',
+        permission_classes=[IsAuthenticated, IsAdminUser]
+    )
+    def cache_stats(self, request):
+        return Response({DIRECTORY_CACHE: response_cache_stats(DIRECTORY_CACHE)})
 
     @action(
         detail=True,
         methods=['get', 'post'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        throttle_scope='bookings'
     )
     def appointments(self, request, pk=None):
         doctor = self.get_object()
@@ -73,41 +107,114 @@ class DoctorViewSet(viewsets.ModelViewSet):
         data['patient'] = patient.id
         serializer = AppointmentSerializer(data=data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        book_appointment(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['get'], url_path='free-slots')
+    def free_slots(self, request, pk=None):
+        """
+        Huecos libres del doctor entre `date_from` y `date_to` (incluidas),
+        de `duration` minutos. Un doctor de vacaciones no tiene huecos.
+        """
+        params = FreeSlotQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+        doctor = self.get_object()
+        slots = doctor_free_slots(
+            doctor, query['date_from'], query['date_to'], query['duration']
+        )
+        return Response({
+            "doctor":   doctor.id,
+            "duration": query['duration'],
+            "slots": [
+                {"date": day, "start": start, "end": end}
+                for day, start, end in slots
+            ],
+        })
+
+
+class DepartmentViewSet(
+    InstrumentedViewMixin, CachedResponseMixin, ConditionalGetMixin, LeanReadMixin,
+    viewsets.ModelViewSet
+):
     """
     API para departamentos médicos.
-      - list, retrieve: público.
+      - list, retrieve: público, con GET condicional (ETag; Last-Modified sólo en retrieve);
+        list se sirve desde la caché de respuestas.
       - create, update, delete: solo admin.
+      - first_free_slot (GET /doctors/departments/{pk}/first-free-slot/):
+        primer hueco libre entre todos los doctores del departamento, público.
     """
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
+    response_cache_namespace = DIRECTORY_CACHE
+    throttle_scope = 'directory'
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'first_free_slot']:
             return [AllowAny()]
         return [IsAuthenticated()]
 
-
-class DoctorAvailabilityViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'], url_path='first-free-slot')
+    def first_free_slot(self, request, pk=None):
+        """
+        Primer hueco libre entre los doctores del departamento que no están
+        de vacaciones. Número fijo de consultas sin importar cuántos doctores.
+        """
+        params = FreeSlotQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        department = self.get_object()
+        slot = first_free_slot(
+            department.doctors.all(),
+            query['date_from'], query['date_to'], query['duration']
+        )
+        if slot is not None:
+            doctor_id, day, start, end = slot
+            slot = {"doctor": doctor_id, "date": day, "start": start, "end": end}
+        return Response({
+            "department": department.id,
+            "duration":   query['duration'],
+            "slot":       slot,
+        })
+
+
+class DoctorAvailabilityViewSet(
+    InstrumentedViewMixin, CachedResponseMixin, ConditionalGetMixin, LeanReadMixin, BulkModelMixin,
+    viewsets.ModelViewSet
+):
     """
     API para disponibilidad de doctores.
-      - list, retrieve: público.
+      - list, retrieve: público, con GET condicional (ETag; Last-Modified sólo en retrieve);
+        list se sirve desde la caché de respuestas.
       - create, update, delete: solo doctor propietario o admin.
+      - bulk (POST/PATCH/DELETE /doctors/availabilities/bulk/): carga masiva
+        de ventanas en una transacción; solo doctor propietario o admin.
     """
     queryset = DoctorAvailability.objects.all()
     serializer_class = DoctorAvailabilitySerializer
+    bulk_serializer_class = DoctorAvailabilityBulkSerializer
+    response_cache_namespace = DIRECTORY_CACHE
+    throttle_scope = 'directory'
 
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk']:
             return [IsAuthenticated(), IsDoctorOwnerOrAdmin()]
         return [AllowAny()]
 
+    # bulk_create y bulk_update no emiten señales: se invalida a mano.
+    def perform_bulk_create(self, objs):
+        super().perform_bulk_create(objs)
+        invalidate_response_cache(DIRECTORY_CACHE)
+
+    def perform_bulk_update(self, objs, fields):
+        super().perform_bulk_update(objs, fields)
+        invalidate_response_cache(DIRECTORY_CACHE)
+
 
-class MedicalNoteViewSet(viewsets.ModelViewSet):
+class MedicalNoteViewSet(InstrumentedViewMixin, LeanReadMixin, viewsets.ModelViewSet):
     """
     API para notas médicas.
       - list, retrieve, create, update, delete: solo doctor propietario o admin.
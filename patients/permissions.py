@@ -1,13 +1,52 @@
 #/patients/permissions.py
 
 from rest_framework.permissions import BasePermission, SAFE_METHODS
+from bookings.models import CareRelationship
 from doctorapp.permissions import IsAdminUser, IsDoctorUser, IsPatientUser
 
+from .models import Patient
+
+
+def doctor_patient_ids(request):
+    """
+    Ids de los pacientes con los que el doctor autenticado tiene citas.
+    Se carga con una sola consulta indexada y se memoiza en la petición.
+    """
+    ids = getattr(request, '_doctor_patient_ids', None)
+    if ids is None:
+        ids = set(
+            CareRelationship.objects
+            .filter(doctor__user=request.user)
+            .values_list('patient_id', flat=True)
+        )
+        request._doctor_patient_ids = ids
+    return ids
+
+
+def _patient_id(obj):
+    """
+    Id del paciente al que pertenece `obj` (paciente, seguro o registro).
+    """
+    return obj.pk if isinstance(obj, Patient) else obj.patient_id
+
+
+def _is_own_record(user, obj):
+    # Se comparan ids para no cargar el paciente de cada objeto.
+    patient = getattr(user, 'patient', None)
+    return patient is not None and _patient_id(obj) == patient.id
+
+
 class PatientPermission(BasePermission):
     """
     - Admin: todo permitido
     - Doctor: solo ver/listar si tiene cita con el paciente
     - Patient: solo ver/editar su propio registro
+
+    Las vistas cuyo `get_queryset` ya restringe los objetos a los pacientes
+    del doctor declaran `patient_scoped_queryset = True`; en ellas el objeto
+    obtenido por `get_object()` ya implica la relación y no se vuelve a
+    comprobar. En otro caso se consulta el conjunto de pacientes del doctor,
+    una vez por petición.
     """
     def has_permission(self, request, view):
         return (
@@ -28,14 +67,16 @@ class PatientPermission(BasePermission):
         if request.method in SAFE_METHODS:
             if IsDoctorUser().has_permission(request, view):
                 # Ver paciente solo si doctor tiene cita con él
-                return obj.appointments.filter(doctor__user=request.user).exists()
+                if getattr(view, 'patient_scoped_queryset', False):
+                    return True
+                return _patient_id(obj) in doctor_patient_ids(request)
             if IsPatientUser().has_permission(request, view):
                 # Paciente ve su propio perfil
-                return obj.user == request.user
+                return _is_own_record(request.user, obj)
             return False
 
         # Escritura (PUT/PATCH/DELETE) solo paciente dueño o admin
         if IsPatientUser().has_permission(request, view):
-            return obj.user == request.user
+            return _is_own_record(request.user, obj)
 
-        return False
\ No newline at end of file
+        return False
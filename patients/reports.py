@@ -0,0 +1,106 @@
+#/patients/reports.py
+
+"""
+Historia clínica precalculada por paciente.
+
+El reporte (datos personales, seguros y registros médicos) se arma una vez y
+se guarda en la caché de Django junto con su ETag y el usuario dueño; las
+señales de patients/signals.py lo invalidan cuando cambia cualquiera de sus
+partes. Así las lecturas repetidas no consultan las tablas de pacientes y
+una revalidación con If-None-Match puede responder 304 sólo con la caché.
+
+Como en doctorapp/response_cache.py, la clave incluye una versión por
+paciente e invalidar es cambiarla (ahora y otra vez al confirmar la
+transacción). El reporte se guarda bajo la versión leída antes de armarlo:
+si alguien invalida mientras tanto, el reporte viejo queda bajo una versión
+que ya nadie busca, en lugar de pisar la invalidación.
+"""
+
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.http import quote_etag
+
+REPORT_CACHE_KEY = 'clinical-history:{}:{}'
+
+
+def report_timeout():
+    return getattr(settings, 'CLINICAL_HISTORY_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def build_clinical_history(patient):
+    """
+    Arma el reporte de `patient`: dos consultas (seguros y registros).
+    """
+    insurances = patient.insurances.all().values(
+        'provider', 'policy_number', 'expiration_date'
+    )
+    records = patient.medical_records.all().values(
+        'date', 'diagnosis', 'treatment', 'follow_up_date'
+    )
+    return {
+        "patient": {
+            "id": patient.id,
+            "full_name": f"{patient.first_name} {patient.last_name}",
+            "date_of_birth": patient.date_of_birth,
+            "contact_number": patient.contact_number,
+            "email": patient.email,
+            "address": patient.address,
+            "medical_history": patient.medical_history,
+        },
+        "insurances": list(insurances),
+        "medical_records": list(records),
+    }
+
+
+def report_version(patient_id):
+    return cache.get_or_set(REPORT_CACHE_KEY.format(patient_id, 'version'), uuid.uuid4().hex, None)
+
+
+def get_cached_clinical_history(patient_id):
+    """
+    Entrada cacheada del paciente o None. No consulta la base de datos.
+
+    La entrada es un dict con `report`, `etag` y `user_id` (el usuario dueño
+    del perfil, para autorizar sin cargar el paciente).
+    """
+    version = cache.get(REPORT_CACHE_KEY.format(patient_id, 'version'))
+    if version is None:
+        return None
+    return cache.get(REPORT_CACHE_KEY.format(patient_id, version))
+
+
+def cache_clinical_history(patient):
+    """
+    Arma el reporte de `patient`, lo guarda en caché y devuelve la entrada.
+    """
+    version = report_version(patient.pk)
+    report = build_clinical_history(patient)
+    payload = json.dumps(report, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    entry = {
+        "report": report,
+        "etag": quote_etag(hashlib.sha1(payload).hexdigest()),
+        "user_id": patient.user_id,
+    }
+    cache.set(REPORT_CACHE_KEY.format(patient.pk, version), entry, report_timeout())
+    return entry
+
+
+def invalidate_clinical_history(patient_ids):
+    """
+    Descarta el reporte cacheado de los pacientes dados. Se repite al
+    confirmar la transacción: una lectura concurrente pudo cachear los datos
+    anteriores entre la escritura y el commit.
+    """
+    keys = [REPORT_CACHE_KEY.format(pk, 'version') for pk in patient_ids if pk is not None]
+
+    def bump():
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    bump()
+    transaction.on_commit(bump)
@@ -0,0 +1,49 @@
+#/patients/scoping.py
+
+"""
+Capa común de visibilidad por rol para los datos de pacientes.
+
+Un doctor sólo ve los pacientes con los que tiene alguna cita. Esa relación
+está materializada en `bookings.CareRelationship` (un registro único por par
+doctor–paciente), así que el filtro es una búsqueda indexada por doctor que
+no necesita DISTINCT y cuyo coste depende de las filas devueltas, no del
+historial de citas.
+"""
+
+
+def scope_to_user(queryset, user, patient_field=None):
+    """
+    Restringe `queryset` a lo que `user` puede ver según su rol.
+
+    `patient_field` es None cuando el queryset es de pacientes, o el nombre
+    de la FK al paciente (p. ej. 'patient') para seguros, registros, etc.
+    """
+    if user.is_staff:
+        return queryset
+
+    if hasattr(user, 'doctor'):
+        prefix = f'{patient_field}__' if patient_field else ''
+        return queryset.filter(**{f'{prefix}care_relationships__doctor': user.doctor})
+
+    if hasattr(user, 'patient'):
+        if patient_field is None:
+            return queryset.filter(user=user)
+        return queryset.filter(**{patient_field: user.patient})
+
+    return queryset.none()
+
+
+class PatientScopedQuerysetMixin:
+    """
+    Aplica `scope_to_user` al queryset de la vista.
+
+    Declara `patient_scoped_queryset` para que PatientPermission confíe en
+    el queryset y no repita la comprobación por objeto.
+    """
+    patient_field = None
+    patient_scoped_queryset = True
+
+    def get_queryset(self):
+        return scope_to_user(
+            super().get_queryset(), self.request.user, self.patient_field
+        )
@@ -0,0 +1,35 @@
+#/patients/signals.py
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Insurance, MedicalRecord, Patient
+from .reports import invalidate_clinical_history
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def invalidate_patient_report(sender, instance, **kwargs):
+    invalidate_clinical_history([instance.pk])
+
+
+@receiver(post_init, sender=Insurance)
+@receiver(post_init, sender=MedicalRecord)
+def remember_report_patient(sender, instance, **kwargs):
+    # Se lee de __dict__ para no disparar consultas con campos diferidos.
+    instance._report_patient_id = instance.__dict__.get('patient_id')
+
+
+@receiver(post_save, sender=Insurance)
+@receiver(post_save, sender=MedicalRecord)
+@receiver(post_delete, sender=Insurance)
+@receiver(post_delete, sender=MedicalRecord)
+def invalidate_record_report(sender, instance, **kwargs):
+    """
+    Un seguro o registro cambió: se invalida el reporte de su paciente y,
+    si se movió de paciente, también el del anterior.
+    """
+    invalidate_clinical_history(
+        {instance.patient_id, getattr(instance, '_report_patient_id', None)}
+    )
+    instance._report_patient_id = instance.patient_id
@@ -1,8 +1,15 @@
+import json
+from unittest import mock
+
 from django.contrib.auth.models import User, Group
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APITestCase, APIClient, APIRequestFactory
+from bookings.models import Appointment
+from doctors.models import Doctor
+from . import reports
 from .models import Patient, Insurance, MedicalRecord
+from .permissions import PatientPermission
 
 class PatientAPITestCase(APITestCase):
     def setUp(self):
@@ -54,7 +61,7 @@ class PatientAPITestCase(APITestCase):
         url = reverse('patient-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_patient_list_patient(self):
         self.authenticate(self.patient_user)
@@ -62,8 +69,8 @@ class PatientAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Patient should only see their own profile
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['user'], self.patient_user.id)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['user'], self.patient_user.id)
 
     def test_patient_detail_owner(self):
         self.authenticate(self.patient_user)
@@ -72,6 +79,81 @@ class PatientAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['user'], self.patient_user.id)
 
+    def test_patient_detail_doctor_query_count(self):
+        Doctor.objects.create(
+            user=self.doctor_user,
+            first_name="Gregory",
+            last_name="House",
+            qualification="MD",
+            contact_number="0987654321",
+            email="house@example.com",
+            address="Princeton Plainsboro",
+            biography="Diagnostic genius."
+        )
+        Appointment.objects.create(
+            patient=self.patient,
+            doctor=self.doctor_user.doctor,
+            appointment_date="2025-01-05",
+            appointment_time="10:00",
+            notes="Control",
+            status="scheduled"
+        )
+        # Usuario recién cargado, como en una petición real.
+        self.authenticate(User.objects.get(pk=self.doctor_user.pk))
+        url = reverse('patient-detail', args=[self.patient.id])
+        # roles (1) + perfil de doctor (1) + get_object (1)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # clinical-history: lo anterior + seguros (1) + registros (1)
+        self.authenticate(User.objects.get(pk=self.doctor_user.pk))
+        url = reverse('patient-clinical-history', args=[self.patient.id])
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_patient_permission_doctor_patient_set(self):
+        doctor = Doctor.objects.create(
+            user=self.doctor_user,
+            first_name="Gregory",
+            last_name="House",
+            qualification="MD",
+            contact_number="0987654321",
+            email="house@example.com",
+            address="Princeton Plainsboro",
+            biography="Diagnostic genius."
+        )
+        other = Patient.objects.create(
+            user=User.objects.create_user(username="other"),
+            first_name="Jane",
+            last_name="Roe",
+            date_of_birth="1991-01-01",
+            contact_number="5555555555",
+            email="jane@example.com",
+            address="456 Main St",
+            medical_history="None"
+        )
+        Appointment.objects.create(
+            patient=self.patient,
+            doctor=doctor,
+            appointment_date="2025-01-05",
+            appointment_time="10:00",
+            notes="Control",
+            status="scheduled"
+        )
+        request = APIRequestFactory().get('/')
+        request.user = User.objects.get(pk=self.doctor_user.pk)
+        permission = PatientPermission()
+        view = object()  # vista sin queryset restringido
+
+        # Un único viaje para roles y otro para el conjunto de pacientes.
+        with self.assertNumQueries(2):
+            self.assertTrue(permission.has_object_permission(request, view, self.patient))
+            self.assertTrue(permission.has_object_permission(request, view, self.insurance))
+            self.assertTrue(permission.has_object_permission(request, view, self.medical_record))
+            self.assertFalse(permission.has_object_permission(request, view, other))
+
     def test_patient_create_admin(self):
         self.authenticate(self.admin_user)
         url = reverse('patient-list')
@@ -120,7 +202,7 @@ class PatientAPITestCase(APITestCase):
         # url = '/api/patients/insurances/'
         self.assertIn(response.status_code, [status.HTTP_200_OK, status.HTTP_404_NOT_FOUND])
         if response.status_code == status.HTTP_200_OK:
-            self.assertGreaterEqual(len(response.data), 1)
+            self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_medicalrecord_list_owner(self):
         self.authenticate(self.patient_user)
@@ -131,7 +213,7 @@ class PatientAPITestCase(APITestCase):
         # url = '/api/patients/medicalrecords/'
         self.assertIn(response.status_code, [status.HTTP_200_OK, status.HTTP_404_NOT_FOUND])
         if response.status_code == status.HTTP_200_OK:
-            self.assertGreaterEqual(len(response.data), 1)
+            self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_clinical_history_action(self):
         self.authenticate(self.patient_user)
@@ -140,4 +222,161 @@ class PatientAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("patient", response.data)
         self.assertIn("insurances", response.data)
-        self.assertIn("medical_records", response.data)
\ No newline at end of file
+        self.assertIn("medical_records", response.data)
+
+class PatientRecordsMixin:
+    """
+    Paciente con un seguro y un registro médico, más un doctor y un admin.
+    """
+    def setUp(self):
+        self.doctor_user = User.objects.create_user(username="doctor")
+        self.doctor_user.groups.add(Group.objects.create(name="doctor"))
+        self.patient_group = Group.objects.create(name="patient")
+        self.patient_user = User.objects.create_user(username="patient")
+        self.patient_user.groups.add(self.patient_group)
+        self.admin_user = User.objects.create_user(username="admin", is_staff=True)
+        self.patient = Patient.objects.create(
+            user=self.patient_user,
+            first_name="John",
+            last_name="Doe",
+            date_of_birth="1990-01-01",
+            contact_number="1234567890",
+            email="john@example.com",
+            address="123 Main St",
+            medical_history="None"
+        )
+        self.insurance = Insurance.objects.create(
+            patient=self.patient, provider="ProviderX",
+            policy_number="POL123", expiration_date="2030-01-01"
+        )
+        self.medical_record = MedicalRecord.objects.create(
+            patient=self.patient, date="2024-01-01", diagnosis="Healthy",
+            treatment="None", follow_up_date="2025-01-01"
+        )
+
+    def client_for(self, user):
+        # Usuario recién leído en cada petición: sin roles memoizados.
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(pk=user.pk))
+        return client
+
+
+class ClinicalHistoryCacheTestCase(PatientRecordsMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('patient-clinical-history', args=[self.patient.id])
+
+    def get(self, user, **headers):
+        return self.client_for(user).get(self.url, **headers)
+
+    def test_cached_report_skips_patient_tables(self):
+        first = self.get(self.patient_user)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        client = self.client_for(self.patient_user)
+        # Sólo la consulta de roles; nada de pacientes, seguros o registros.
+        with self.assertNumQueries(1):
+            second = client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.get(self.patient_user)['ETag']
+        client = self.client_for(self.patient_user)
+        with self.assertNumQueries(1):
+            response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(
+            self.get(self.patient_user, HTTP_IF_NONE_MATCH='"stale"').status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_changes_invalidate_report(self):
+        etags = {self.get(self.patient_user)['ETag']}
+
+        Insurance.objects.create(
+            patient=self.patient, provider="ProviderY",
+            policy_number="POL456", expiration_date="2031-01-01"
+        )
+        response = self.get(self.patient_user)
+        self.assertEqual(len(response.data['insurances']), 2)
+        etags.add(response['ETag'])
+
+        self.medical_record.diagnosis = "Flu"
+        self.medical_record.save()
+        response = self.get(self.patient_user)
+        self.assertEqual(response.data['medical_records'][0]['diagnosis'], "Flu")
+        etags.add(response['ETag'])
+
+        self.patient.address = "456 Other St"
+        self.patient.save()
+        response = self.get(self.patient_user)
+        self.assertEqual(response.data['patient']['address'], "456 Other St")
+        etags.add(response['ETag'])
+
+        self.insurance.delete()
+        response = self.get(self.patient_user)
+        self.assertEqual(len(response.data['insurances']), 1)
+        etags.add(response['ETag'])
+        self.assertEqual(len(etags), 5)
+
+    def test_invalidation_during_build_is_not_overwritten(self):
+        build = reports.build_clinical_history
+
+        def build_then_change(patient):
+            # Otra petición modifica al paciente mientras se arma el reporte.
+            report = build(patient)
+            Patient.objects.get(pk=patient.pk).save()
+            return report
+
+        with mock.patch.object(reports, 'build_clinical_history', build_then_change):
+            reports.cache_clinical_history(self.patient)
+        self.assertIsNone(reports.get_cached_clinical_history(self.patient.pk))
+
+    def test_invalidation_is_repeated_on_commit(self):
+        reports.cache_clinical_history(self.patient)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.patient.save()
+        # Una lectura concurrente vuelve a cachear antes del commit.
+        reports.cache_clinical_history(self.patient)
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(reports.get_cached_clinical_history(self.patient.pk))
+
+    def test_cached_report_keeps_permissions(self):
+        self.get(self.patient_user)
+        stranger = User.objects.create_user(username="stranger")
+        stranger.groups.add(self.patient_group)
+        self.assertIn(
+            self.get(stranger).status_code,
+            (status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND)
+        )
+        # Un doctor sin citas con el paciente tampoco lo ve desde la caché.
+        self.assertIn(
+            self.get(self.doctor_user).status_code,
+            (status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND)
+        )
+        self.assertEqual(self.get(self.admin_user).status_code, status.HTTP_200_OK)
+
+
+class MedicalRecordExportTestCase(PatientRecordsMixin, APITestCase):
+    def test_ndjson_export_uses_doctor_scope(self):
+        doctor = Doctor.objects.create(
+            user=self.doctor_user, first_name="Gregory", last_name="House",
+            qualification="MD", contact_number="0987654321",
+            email="house@example.com", address="Princeton Plainsboro",
+            biography="Diagnostic genius."
+        )
+        url = reverse('medicalrecord-export')
+        body = b''.join(self.client_for(self.doctor_user).get(url).streaming_content)
+        self.assertEqual(body, b'')
+
+        Appointment.objects.create(
+            patient=self.patient, doctor=doctor, appointment_date="2025-01-05",
+            appointment_time="10:00", notes="Consulta", status="scheduled"
+        )
+        response = self.client_for(self.doctor_user).get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['diagnosis'], "Healthy")
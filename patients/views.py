@@ -1,20 +1,30 @@
 #/patients/views.py
 
-from rest_framework import viewsets
+from django.utils.http import parse_etags
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from doctorapp.exports import ExportMixin
+from doctorapp.instrumentation import InstrumentedViewMixin
+from doctorapp.lean import LeanReadMixin
+from doctorapp.permissions import IsAdminUser, IsDoctorUser, IsPatientUser
+
 from .models import Patient, Insurance, MedicalRecord
 from .serializers import (
     PatientSerializer,
     InsuranceSerializer,
     MedicalRecordSerializer,
 )
-from .permissions import PatientPermission
+from .permissions import PatientPermission, doctor_patient_ids
+from .reports import cache_clinical_history, get_cached_clinical_history
+from .scoping import PatientScopedQuerysetMixin
 
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(
+    InstrumentedViewMixin, LeanReadMixin, PatientScopedQuerysetMixin, viewsets.ModelViewSet
+):
     """
     API para gestionar pacientes y consultar su historia clínica.
 
@@ -34,24 +44,6 @@ class PatientViewSet(viewsets.ModelViewSet):
     serializer_class = PatientSerializer
     permission_classes = [IsAuthenticated, PatientPermission]
 
-    def get_queryset(self):
-        user = self.request.user
-
-        if user.is_staff:
-            return Patient.objects.all()
-
-        if hasattr(user, 'doctor'):
-            return (
-                Patient.objects
-                .filter(appointments__doctor__user=user)
-                .distinct()
-            )
-
-        if hasattr(user, 'patient'):
-            return Patient.objects.filter(user=user)
-
-        return Patient.objects.none()
-
     @action(
         detail=True,
         methods=['get'],
@@ -61,31 +53,42 @@ class PatientViewSet(viewsets.ModelViewSet):
     def clinical_history(self, request, pk=None):
         """
         Devuelve un reporte con datos personales, seguros y registros médicos.
+
+        El reporte se sirve desde la caché (ver patients/reports.py) con su
+        ETag; si el cliente envía `If-None-Match` con el ETag vigente se
+        responde 304 sin consultar las tablas de pacientes.
+        """
+        entry = get_cached_clinical_history(pk)
+        if entry is None or not self.can_read_cached_report(request, pk, entry):
+            # Sin caché (o sin permiso aparente): camino normal, con los
+            # permisos por objeto de siempre.
+            entry = cache_clinical_history(self.get_object())
+
+        headers = {"ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if entry["etag"] in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry["report"], headers=headers)
+
+    def can_read_cached_report(self, request, pk, entry):
         """
-        patient = self.get_object()
-        insurances = patient.insurances.all().values(
-            'provider', 'policy_number', 'expiration_date'
-        )
-        records = patient.medical_records.all().values(
-            'date', 'diagnosis', 'treatment', 'follow_up_date'
-        )
-        report = {
-            "patient": {
-                "id": patient.id,
-                "full_name": f"{patient.first_name} {patient.last_name}",
-                "date_of_birth": patient.date_of_birth,
-                "contact_number": patient.contact_number,
-                "email": patient.email,
-                "address": patient.address,
-                "medical_history": patient.medical_history,
-            },
-            "insurances": list(insurances),
-            "medical_records": list(records),
-        }
-        return Response(report)
-
-
-class InsuranceViewSet(viewsets.ModelViewSet):
+        Equivalente a PatientPermission sobre el paciente, pero sin
+        cargarlo: staff, el paciente dueño o un doctor con citas con él.
+        """
+        user = request.user
+        if IsAdminUser().has_permission(request, self):
+            return True
+        if IsDoctorUser().has_permission(request, self):
+            # La entrada existe, así que `pk` es el id tal cual se cacheó.
+            return int(pk) in doctor_patient_ids(request)
+        if IsPatientUser().has_permission(request, self):
+            return entry["user_id"] == user.id
+        return False
+
+
+class InsuranceViewSet(
+    InstrumentedViewMixin, LeanReadMixin, PatientScopedQuerysetMixin, viewsets.ModelViewSet
+):
     """
     API para gestionar seguros de pacientes.
 
@@ -94,50 +97,29 @@ class InsuranceViewSet(viewsets.ModelViewSet):
     - create, update, partial_update, destroy:
         Solo el paciente dueño o staff.
     """
+    queryset = Insurance.objects.all()
     serializer_class = InsuranceSerializer
     permission_classes = [IsAuthenticated, PatientPermission]
+    patient_field = 'patient'
 
-    def get_queryset(self):
-        user = self.request.user
-
-        if user.is_staff:
-            return Insurance.objects.all()
 
-        if hasattr(user, 'doctor'):
-            return Insurance.objects.filter(
-                patient__appointments__doctor__user=user
-            ).distinct()
-
-        if hasattr(user, 'patient'):
-            return Insurance.objects.filter(patient=user.patient)
-
-        return Insurance.objects.none()
-
-
-class MedicalRecordViewSet(viewsets.ModelViewSet):
+class MedicalRecordViewSet(
+    InstrumentedViewMixin, LeanReadMixin, ExportMixin, PatientScopedQuerysetMixin,
+    viewsets.ModelViewSet
+):
     """
     API para gestionar registros médicos de pacientes.
 
     - list, retrieve:
         Lectura para pacientes dueño, médicos a cargo o staff.
+    - export (GET /patients/medicalrecords/export/?output=ndjson|csv):
+        Exportación completa en streaming con el mismo alcance que el listado.
     - create, update, partial_update, destroy:
         Solo el paciente dueño o staff.
     """
+    queryset = MedicalRecord.objects.all()
     serializer_class = MedicalRecordSerializer
     permission_classes = [IsAuthenticated, PatientPermission]
-
-    def get_queryset(self):
-        user = self.request.user
-
-        if user.is_staff:
-            return MedicalRecord.objects.all()
-
-        if hasattr(user, 'doctor'):
-            return MedicalRecord.objects.filter(
-                patient__appointments__doctor__user=user
-            ).distinct()
-
-        if hasattr(user, 'patient'):
-            return MedicalRecord.objects.filter(patient=user.patient)
-
-        return MedicalRecord.objects.none()
\ No newline at end of file
+    patient_field = 'patient'
+    export_fields = ('id', 'patient_id', 'date', 'diagnosis', 'treatment', 'follow_up_date')
+    export_filename = 'medical_records'